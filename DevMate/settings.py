@@ -13,7 +13,7 @@ from datetime import timedelta
 from pathlib import Path
 import os
 import environ
-from decouple import config
+from decouple import config, Csv
 import dj_database_url
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -81,6 +81,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     
     "allauth.account.middleware.AccountMiddleware",
+    "myapp.middleware.ReplicaStickinessMiddleware",
     "myapp.middleware.UpdateLastSeenMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
 ]
@@ -133,6 +134,57 @@ else:
         'default': dj_database_url.parse(config('DB_DATABASE_URL'))
     }
 
+# Read replicas
+# DB_REPLICA_URLS: comma-separated URLs of streaming replicas of 'default'. Only views
+# and querysets that opt in (myapp.utils.replicas) read from them; writers' browsers
+# stay on the primary for REPLICA_STICKY_SECONDS after a write.
+DATABASE_REPLICAS = []
+for index, url in enumerate(config('DB_REPLICA_URLS', default='', cast=Csv()), start=1):
+    alias = f'replica_{index}'
+    DATABASES[alias] = dj_database_url.parse(url)
+    # Tests run with both aliases pointing at the test database
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['myapp.utils.replicas.ReplicaRouter']
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', cast=int, default=5)
+REPLICA_MAX_LAG_SECONDS = config('REPLICA_MAX_LAG_SECONDS', cast=float, default=30)
+
+# Cache
+# Shared L2 behind the in-process L1 in myapp.utils.cache.
+# CACHE_BACKEND: 'db' (default in production; run `manage.py createcachetable`),
+# 'redis' (needs REDIS_URL and the redis package) or 'locmem' (local fake, per process)
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem' if DEBUG else 'db')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': config('REDIS_URL'),
+        }
+    }
+elif CACHE_BACKEND == 'db':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'devmate_cache',
+            'OPTIONS': {
+                'MAX_ENTRIES': 50000,
+                'CULL_FREQUENCY': 4,
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'devmate-local',
+        }
+    }
+
+CACHE_L1_MAX_ENTRIES = config('CACHE_L1_MAX_ENTRIES', cast=int, default=1000)
+CACHE_L1_TTL = config('CACHE_L1_TTL', cast=int, default=5)  # seconds; bounds cross-worker staleness
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -200,6 +252,11 @@ else:
     MEDIA_URL = '/user-media/'
     MEDIA_ROOT = BASE_DIR /'uploads'
 
+# Background tasks (myapp.utils.tasks)
+# Workers run with `python manage.py run_tasks`; eager mode runs tasks right after
+# commit in the web process, which keeps local development worker-free.
+BACKGROUND_TASKS_EAGER = config('BACKGROUND_TASKS_EAGER', cast=bool, default=DEBUG)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -249,9 +306,12 @@ if not DEBUG and config('REQUIRE_HTTPS', cast=bool):
 if DEBUG:
     EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 else:
-    # Brevo HTTP API Email Backend (Production)
-    EMAIL_BACKEND = 'helpers.brevo.brevo_backend.BrevoEmailBackend'
+    # Brevo HTTP API Email Backend (Production), behind a database outbox
+    # delivered by the background worker (manage.py run_tasks)
+    EMAIL_BACKEND = 'myapp.utils.email_outbox.OutboxEmailBackend'
     BREVO_API_KEY = config('BREVO_API_KEY')
+    BREVO_API_URL = config('BREVO_API_URL', default='https://api.brevo.com/v3/smtp/email')
+    BREVO_MAX_IN_FLIGHT = config('BREVO_MAX_IN_FLIGHT', cast=int, default=8)
     DEFAULT_FROM_EMAIL = "DevMate Space <admin@devmate.space>"
 
 # Logging
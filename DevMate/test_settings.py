@@ -0,0 +1,12 @@
+"""
+Test settings: the regular settings plus a replica alias that mirrors the test
+database, so replica routing is exercised without a real replica.
+
+Usage:
+    python manage.py test --settings=DevMate.test_settings
+"""
+from .settings import *  # noqa: F401,F403
+
+if not DATABASE_REPLICAS:
+    DATABASES['replica_1'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS = ['replica_1']
@@ -17,4 +17,10 @@ npx @tailwindcss/cli -i ./static/styles/input.css -o ./static/styles/output.css
 python manage.py collectstatic --noinput
 
 # Run database migrations (for PostgreSQL)
-python manage.py migrate
\ No newline at end of file
+python manage.py migrate
+
+# Create the shared cache table (no-op if it exists)
+python manage.py createcachetable
+
+# Render stored mention HTML for rows saved before content_html existed (no-op once done)
+python manage.py build_content_html
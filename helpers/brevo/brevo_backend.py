@@ -18,6 +18,8 @@ from django.conf import settings
 from django.core.mail.backends.base import BaseEmailBackend
 from django.core.mail import EmailMessage, EmailMultiAlternatives
 
+from . import client
+
 logger = logging.getLogger(__name__)
 
 # Attempt to import requests, fail gracefully if not available
@@ -139,26 +141,11 @@ class BrevoEmailBackend(BaseEmailBackend):
                 logger.error("Failed to build email payload")
                 return False
             
-            # Make the API request
-            headers = {
-                'api-key': self.api_key,
-                'Content-Type': 'application/json',
-                'Accept': 'application/json',
-            }
-            
-            response = requests.post(
-                self.API_ENDPOINT,
-                headers=headers,
-                json=payload,
-                timeout=10
-            )
-            
-            if response.status_code in (200, 201):
-                try:
-                    message_id = response.json().get('messageId', 'unknown')
-                except Exception:
-                    message_id = 'unknown'
-                    
+            # Pooled session from the shared client (keep-alive across sends)
+            result = client.post(payload, api_key=self.api_key)
+
+            if result.ok:
+                message_id = result.message_ids[0] if result.message_ids else 'unknown'
                 logger.info(
                     f"Email sent successfully via Brevo API: "
                     f"to={message.to}, messageId={message_id}"
@@ -166,20 +153,11 @@ class BrevoEmailBackend(BaseEmailBackend):
                 return True
             else:
                 logger.error(
-                    f"Brevo API error: status={response.status_code}, "
-                    f"response={response.text[:500]}"
+                    f"Brevo API error: status={result.status_code}, "
+                    f"response={result.error}"
                 )
                 return False
-                
-        except requests.Timeout:
-            logger.error("Brevo API request timed out")
-            return False
-        except requests.ConnectionError:
-            logger.error("Brevo API connection error - network issue")
-            return False
-        except requests.RequestException as e:
-            logger.error(f"Brevo API request failed: {e}")
-            return False
+
         except Exception as e:
             logger.error(f"Unexpected error sending email: {e}", exc_info=True)
             return False
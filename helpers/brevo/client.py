@@ -0,0 +1,226 @@
+"""
+Brevo HTTP API Client
+
+Shared transport for the Brevo email backends:
+    - One pooled requests.Session per process (keep-alive, TLS reuse)
+    - Concurrent in-flight requests through a thread pool
+    - Batch sends: payloads that differ only by recipients are merged into a
+      single request using Brevo's `messageVersions`; a batch rejected with a
+      non-retryable error is re-sent message by message, so only the bad
+      message fails
+
+Configuration (settings.py):
+    BREVO_API_KEY: Your Brevo API key
+    BREVO_API_URL: Send endpoint (override to point at helpers.brevo.stub_server)
+    BREVO_MAX_IN_FLIGHT: Concurrent requests per worker (default 8)
+"""
+
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+
+DEFAULT_API_URL = 'https://api.brevo.com/v3/smtp/email'
+DEFAULT_MAX_IN_FLIGHT = 8
+REQUEST_TIMEOUT = 10
+
+# Brevo accepts up to 1000 versions per batch request
+MAX_MESSAGE_VERSIONS = 1000
+
+# Recipient fields that may differ between messages sharing one batch request
+VERSION_FIELDS = ('to', 'cc', 'bcc')
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class SendResult:
+    """Outcome of one Brevo API request"""
+
+    def __init__(self, ok, status_code=None, error='', retryable=False, message_ids=None, elapsed=0.0):
+        self.ok = ok
+        self.status_code = status_code
+        self.error = error
+        self.retryable = retryable
+        self.message_ids = message_ids or []
+        self.elapsed = elapsed
+
+
+def get_api_url():
+    return getattr(settings, 'BREVO_API_URL', None) or DEFAULT_API_URL
+
+
+def get_max_in_flight():
+    return max(1, int(getattr(settings, 'BREVO_MAX_IN_FLIGHT', DEFAULT_MAX_IN_FLIGHT)))
+
+
+def get_session():
+    """
+    Get the process-wide pooled session.
+    The connection pool is sized to the number of concurrent requests.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                pool_size = get_max_in_flight()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update({
+                    'Content-Type': 'application/json',
+                    'Accept': 'application/json',
+                })
+                _session = session
+    return _session
+
+
+def post(payload, api_key=None):
+    """
+    POST one payload to the Brevo send endpoint. Never raises.
+
+    Returns:
+        SendResult; `retryable` is set for network errors, 429 and 5xx responses
+    """
+    if not REQUESTS_AVAILABLE:
+        return SendResult(False, error='requests library is not installed')
+
+    api_key = api_key or getattr(settings, 'BREVO_API_KEY', None)
+    if not api_key:
+        return SendResult(False, error='BREVO_API_KEY is not configured', retryable=True)
+
+    started = time.monotonic()
+    try:
+        response = get_session().post(
+            get_api_url(),
+            headers={'api-key': api_key},
+            json=payload,
+            timeout=REQUEST_TIMEOUT,
+        )
+    except requests.RequestException as e:
+        return SendResult(False, error=f'{type(e).__name__}: {e}', retryable=True,
+                          elapsed=time.monotonic() - started)
+
+    elapsed = time.monotonic() - started
+    if response.status_code in (200, 201, 202):
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        message_ids = body.get('messageIds') or ([body['messageId']] if body.get('messageId') else [])
+        return SendResult(True, response.status_code, message_ids=message_ids, elapsed=elapsed)
+
+    return SendResult(
+        False,
+        response.status_code,
+        error=response.text[:500],
+        retryable=response.status_code == 429 or response.status_code >= 500,
+        elapsed=elapsed,
+    )
+
+
+def build_batches(items):
+    """
+    Group payloads that share content into messageVersions batch requests.
+
+    Args:
+        items: List of (key, payload) tuples; key identifies the caller's record
+
+    Returns:
+        List of (keys, payload) tuples, one per API request
+    """
+    groups = {}
+    for key, payload in items:
+        shared = {k: v for k, v in payload.items() if k not in VERSION_FIELDS}
+        # Per-message cc/bcc can't be expressed on the batch root, but they can per version
+        group_key = json.dumps(shared, sort_keys=True, default=str)
+        groups.setdefault(group_key, (shared, []))[1].append((key, payload))
+
+    batches = []
+    for shared, members in groups.values():
+        for start in range(0, len(members), MAX_MESSAGE_VERSIONS):
+            chunk = members[start:start + MAX_MESSAGE_VERSIONS]
+            if len(chunk) == 1:
+                key, payload = chunk[0]
+                batches.append(([key], payload))
+                continue
+            batch_payload = dict(shared)
+            batch_payload['messageVersions'] = [
+                {field: payload[field] for field in VERSION_FIELDS if payload.get(field)}
+                for _, payload in chunk
+            ]
+            batches.append(([key for key, _ in chunk], batch_payload))
+    return batches
+
+
+def send_batches(batches, api_key=None):
+    """
+    Send batch requests concurrently over the pooled session.
+    Batches rejected with a non-retryable error (e.g. one invalid address) are
+    re-sent as individual messages.
+
+    Args:
+        batches: Output of build_batches()
+
+    Returns:
+        List of (keys, SendResult) tuples; a re-sent batch contributes one
+        entry per message
+    """
+    results = _post_all(batches, api_key)
+
+    rejected = [
+        index for index, ((keys, _), result) in enumerate(zip(batches, results))
+        if len(keys) > 1 and not result.ok and not result.retryable
+    ]
+    if not rejected:
+        return [(keys, result) for (keys, _), result in zip(batches, results)]
+
+    singles = {index: split_batch(*batches[index]) for index in rejected}
+    logger.warning(
+        f'Brevo rejected {len(rejected)} batch request(s), '
+        f're-sending {sum(map(len, singles.values()))} messages individually'
+    )
+    single_results = iter(_post_all([single for index in rejected for single in singles[index]], api_key))
+
+    outcome = []
+    for index, ((keys, _), result) in enumerate(zip(batches, results)):
+        if index in singles:
+            outcome.extend((single_keys, next(single_results)) for single_keys, _ in singles[index])
+        else:
+            outcome.append((keys, result))
+    return outcome
+
+
+def split_batch(keys, payload):
+    """
+    Undo build_batches() for one messageVersions request.
+
+    Returns:
+        List of ([key], payload) tuples, one per message
+    """
+    shared = {k: v for k, v in payload.items() if k != 'messageVersions'}
+    return [([key], {**shared, **version}) for key, version in zip(keys, payload['messageVersions'])]
+
+
+def _post_all(batches, api_key):
+    """post() each (keys, payload), concurrently; results in the same order"""
+    if not batches:
+        return []
+    if len(batches) == 1:
+        return [post(batches[0][1], api_key)]
+
+    with ThreadPoolExecutor(max_workers=min(get_max_in_flight(), len(batches))) as executor:
+        return list(executor.map(lambda batch: post(batch[1], api_key), batches))
@@ -0,0 +1,129 @@
+"""
+Local Brevo API stub for development and tests.
+
+Accepts POSTs to /v3/smtp/email, records every payload and answers like Brevo
+(messageId for single sends, messageIds for messageVersions batches).
+
+Usage:
+    python -m helpers.brevo.stub_server --port 8025 --fail-rate 0.1 --latency 0.05
+
+    # settings / .env
+    BREVO_API_URL=http://127.0.0.1:8025/v3/smtp/email
+
+In-process (e.g. from a test):
+    server = StubServer(port=0).start()
+    ... settings.BREVO_API_URL = server.url ...
+    server.received  # list of payloads
+    server.rejected.add('bad@example.com')  # requests including it get a 400
+    server.stop()
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SEND_PATH = '/v3/smtp/email'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        stub = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length)
+
+        if self.path != SEND_PATH:
+            return self._reply(404, {'code': 'not_found', 'message': 'Unknown endpoint'})
+        if not self.headers.get('api-key'):
+            return self._reply(401, {'code': 'unauthorized', 'message': 'Key not found'})
+        try:
+            payload = json.loads(raw or b'{}')
+        except ValueError:
+            return self._reply(400, {'code': 'bad_request', 'message': 'Invalid JSON'})
+
+        if stub.latency:
+            time.sleep(stub.latency)
+        if stub.fail_rate and random.random() < stub.fail_rate:
+            return self._reply(503, {'code': 'unavailable', 'message': 'Stub failure'})
+
+        if stub.rejected & _addresses(payload):
+            return self._reply(400, {'code': 'invalid_parameter', 'message': 'Invalid email address'})
+
+        with stub.lock:
+            stub.received.append(payload)
+
+        versions = payload.get('messageVersions')
+        if versions:
+            return self._reply(201, {'messageIds': [f'<{uuid.uuid4()}@stub>' for _ in versions]})
+        return self._reply(201, {'messageId': f'<{uuid.uuid4()}@stub>'})
+
+
+def _addresses(payload):
+    """Every 'to' address of a single or messageVersions payload"""
+    versions = payload.get('messageVersions') or [payload]
+    return {recipient.get('email') for version in versions for recipient in version.get('to') or []}
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=8025, fail_rate=0.0, latency=0.0, verbose=False):
+        super().__init__((host, port), _Handler)
+        self.fail_rate = fail_rate
+        self.latency = latency
+        self.verbose = verbose
+        self.received = []
+        self.rejected = set()
+        self.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}{SEND_PATH}'
+
+    def start(self):
+        """Serve from a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local Brevo API stub')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait before answering')
+    args = parser.parse_args()
+
+    server = StubServer(args.host, args.port, args.fail_rate, args.latency, verbose=True)
+    print(f'Brevo stub listening on {server.url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
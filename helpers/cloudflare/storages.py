@@ -1,7 +1,40 @@
+from botocore.exceptions import BotoCoreError, ClientError
 from storages.backends.s3 import S3Storage
+from storages.utils import clean_name
+
+# DeleteObjects accepts at most this many keys per request
+DELETE_BATCH_SIZE = 1000
 
     
 class MediaFileStorage(S3Storage):
     # helpers.cloudflare.storages.MediaFileStorage
     location = "uploads"
-    
\ No newline at end of file
+
+    def delete_many(self, names):
+        """
+        Delete files with DeleteObjects requests of up to DELETE_BATCH_SIZE keys.
+        Missing keys count as deleted, like delete().
+
+        Returns:
+            Dictionary of name -> error message for the files that were not deleted
+        """
+        keys = {}
+        for name in names:
+            keys[self._normalize_name(clean_name(name))] = name
+        client = self.connection.meta.client
+        key_list = list(keys)
+
+        failures = {}
+        for start in range(0, len(key_list), DELETE_BATCH_SIZE):
+            batch = key_list[start:start + DELETE_BATCH_SIZE]
+            try:
+                response = client.delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True},
+                )
+            except (BotoCoreError, ClientError) as e:
+                failures.update({keys[key]: str(e) for key in batch})
+                continue
+            for error in response.get('Errors', []):
+                failures[keys[error['Key']]] = f"{error.get('Code')}: {error.get('Message')}"
+        return failures
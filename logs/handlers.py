@@ -0,0 +1,232 @@
+"""
+Domain event handlers for logs (run by the event dispatcher, see myapp.utils.events)
+
+Events are published by logs/signals.py and myapp/signals.py. Handlers load
+what they need by id and do nothing when the object has been deleted since.
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.utils.dateparse import parse_datetime
+
+from myapp.utils.events import on_event
+from myapp.utils.popular_developers import record_log_created, record_log_deleted
+from myapp.utils.storage_deletion import queue_storage_deletion
+
+from .models import Comment, Log, Notification, Reaction
+from .utils.global_feed import invalidate_global_feed
+from .utils.log_cards import bump_log_version
+from .utils.mentions import find_mentions
+
+
+# ============= COUNTERS, TIMELINE AND CACHES =============
+
+@on_event('log.created')
+def count_log_for_leaderboard(user_id, timestamp, **payload):
+    """Bump the author's popular-developers counters"""
+    record_log_created(user_id, parse_datetime(timestamp))
+
+
+@on_event('log.deleted')
+def uncount_log_for_leaderboard(user_id, timestamp, **payload):
+    record_log_deleted(user_id, parse_datetime(timestamp) if timestamp else None)
+
+
+@on_event('log.created', 'log.deleted')
+def invalidate_global_timeline(**payload):
+    """New and deleted logs change the shared global timeline"""
+    invalidate_global_feed()
+
+
+@on_event('comment.created', 'comment.deleted', 'reaction.created', 'reaction.updated', 'reaction.deleted')
+def bump_log_card_version(log_id, **payload):
+    """Reaction and comment counts are part of the cached log card"""
+    bump_log_version(log_id)
+
+
+@on_event('log.deleted')
+def delete_log_snapshot(files, **payload):
+    """Queue the snapshot file and its renditions for deletion"""
+    queue_storage_deletion(files)
+
+
+# ============= NOTIFICATIONS =============
+
+@on_event('comment.created')
+def create_comment_notification(comment_id, reply_to_user_id=None, **payload):
+    """
+    Notify the log owner of a comment, or the replied-to user of a reply,
+    and anyone mentioned in it
+    """
+    comment = (
+        Comment.objects.select_related('user', 'mindlog__user', 'parent_comment__user')
+        .filter(pk=comment_id).first()
+    )
+    if comment is None:
+        return
+
+    if comment.parent_comment_id or reply_to_user_id:
+        # reply_to_user_id is the user actually replied to when a nested reply was flattened
+        recipient_id = reply_to_user_id or comment.parent_comment.user_id
+        verb = 'replied to your comment'
+        notification_type = 'reply'
+    else:
+        recipient_id = comment.mindlog.user_id
+        verb = 'commented on your log'
+        notification_type = 'comment'
+
+    # No notification for commenting on your own log or replying to yourself
+    if recipient_id != comment.user_id:
+        Notification.objects.create(
+            recipient_id=recipient_id,
+            actor=comment.user,
+            verb=verb,
+            target=comment.mindlog,
+            action_object=comment,
+            notification_type=notification_type
+        )
+
+    # Reply recipients already got a notification
+    exclude_user_id = recipient_id if notification_type == 'reply' else None
+    create_mention_notifications(comment.content, comment.user, comment.mindlog, comment, 'comment_mention', exclude_user_id)
+
+
+@on_event('reaction.created')
+def create_reaction_notification(reaction_id, **payload):
+    """
+    Notify the log owner of a reaction
+    """
+    reaction = Reaction.objects.select_related('user', 'mindlog').filter(pk=reaction_id).first()
+    # Don't notify if user reacts to their own log
+    if reaction is None or reaction.mindlog.user_id == reaction.user_id:
+        return
+
+    Notification.objects.create(
+        recipient_id=reaction.mindlog.user_id,
+        actor=reaction.user,
+        verb=f'reacted {reaction.emoji} to your log',
+        target=reaction.mindlog,
+        action_object=reaction,
+        notification_type='reaction'
+    )
+
+
+@on_event('follow.created')
+def create_follow_notification(follow_id, follower_id, following_id, **payload):
+    """
+    Notify a user of a new follower
+    """
+    from myapp.models import follow, userinfo
+
+    if not follow.objects.filter(pk=follow_id).exists():
+        return
+
+    Notification.objects.create(
+        recipient_id=following_id,
+        actor_id=follower_id,
+        verb='started following you',
+        # Target is the follower's profile
+        target_content_type=ContentType.objects.get_for_model(userinfo),
+        target_object_id=follower_id,
+        notification_type='follow'
+    )
+
+
+@on_event('log.created')
+def create_log_mention_notifications(log_id, **payload):
+    """
+    Notify users @mentioned in a new log
+    """
+    log = Log.objects.select_related('user').filter(pk=log_id).first()
+    if log is not None:
+        create_mention_notifications(log.content, log.user, log, None, 'mention')
+
+
+def create_mention_notifications(content, actor, log, action_object=None, notification_type='mention', exclude_user_id=None):
+    """
+    Create notifications for the existing users @mentioned in content
+
+    Args:
+        content: Text content to parse for mentions
+        actor: userinfo who created the content
+        log: The log being mentioned in
+        action_object: Optional action object (e.g., Comment)
+        notification_type: 'mention' or 'comment_mention'
+        exclude_user_id: Optional userinfo id to skip (e.g., if they already got a reply notification)
+    """
+    from myapp.models import userinfo
+
+    names = find_mentions(content)
+    if not names:
+        return
+
+    mentioned = userinfo.objects.filter(user__username__in=names).exclude(pk=actor.pk)
+    if exclude_user_id:
+        mentioned = mentioned.exclude(pk=exclude_user_id)
+    if action_object is None:
+        # Don't notify the log owner if they're mentioned in their own log
+        mentioned = mentioned.exclude(pk=log.user_id)
+
+    verb = 'mentioned you in a comment' if notification_type == 'comment_mention' else 'mentioned you in a log'
+    target_ct = ContentType.objects.get_for_model(log)
+    action_ct = ContentType.objects.get_for_model(action_object) if action_object is not None else None
+    Notification.objects.bulk_create([
+        Notification(
+            recipient_id=recipient_id,
+            actor=actor,
+            verb=verb,
+            target_content_type=target_ct,
+            target_object_id=log.pk,
+            action_content_type=action_ct,
+            action_object_id=action_object.pk if action_object is not None else None,
+            notification_type=notification_type
+        )
+        for recipient_id in mentioned.values_list('id', flat=True)
+    ])
+
+
+# ============= NOTIFICATION CLEANUP =============
+
+@on_event('comment.deleted')
+def delete_comment_notifications(comment_id, **payload):
+    """
+    Delete the comment, reply and comment mention notifications of a deleted comment
+    """
+    Notification.objects.filter(
+        action_content_type=ContentType.objects.get_for_model(Comment),
+        action_object_id=comment_id
+    ).delete()
+
+
+@on_event('reaction.deleted')
+def delete_reaction_notifications(reaction_id, **payload):
+    """
+    Delete the notification of a removed reaction
+    """
+    Notification.objects.filter(
+        action_content_type=ContentType.objects.get_for_model(Reaction),
+        action_object_id=reaction_id,
+        notification_type='reaction'
+    ).delete()
+
+
+@on_event('follow.deleted')
+def delete_follow_notifications(follower_id, following_id, **payload):
+    """
+    Delete the follow notification when someone unfollows a user
+    """
+    # Matched by recipient, actor and type since follow notifications have no action_object
+    Notification.objects.filter(
+        recipient_id=following_id,
+        actor_id=follower_id,
+        notification_type='follow'
+    ).delete()
+
+
+@on_event('log.deleted')
+def delete_log_notifications(log_id, **payload):
+    """
+    Delete all notifications targeting a deleted log (comments, reactions and mentions on it)
+    """
+    Notification.objects.filter(
+        target_content_type=ContentType.objects.get_for_model(Log),
+        target_object_id=log_id
+    ).delete()
@@ -0,0 +1,79 @@
+"""
+Benchmark log creation throughput and queries per row.
+
+Compares the old exists()-loop signature allocation, Log.save with
+insert-and-retry, and LogManager.bulk_create_with_signatures. Everything
+runs in a transaction that is rolled back.
+
+Usage:
+    python manage.py bench_log_signatures --rows 5000 --username alice
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from logs.models import Log, generate_base62_id
+from myapp.models import userinfo
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _legacy_signature():
+    # Previous behaviour: one SELECT per attempt before every insert
+    while True:
+        sig = f"sig-{generate_base62_id()}"
+        if not Log.objects.filter(sig=sig).exists():
+            return sig
+
+
+class Command(BaseCommand):
+    help = "Benchmark log creation with different signature strategies (rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000, help="Logs created per strategy")
+        parser.add_argument('--batch-size', type=int, default=500, help="Batch size for the bulk path")
+        parser.add_argument('--username', help="Author of the benchmark logs (defaults to the first user)")
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        author = userinfo.objects.filter(user__username=options['username']).first() if options['username'] \
+            else userinfo.objects.order_by('id').first()
+        if author is None:
+            raise CommandError("No user found to author benchmark logs")
+
+        def legacy():
+            for i in range(rows):
+                Log.objects.create(user=author, content=f"bench {i}", sig=_legacy_signature())
+
+        def per_row():
+            for i in range(rows):
+                Log.objects.create(user=author, content=f"bench {i}")
+
+        def bulk():
+            Log.objects.bulk_create_with_signatures(
+                [Log(user=author, content=f"bench {i}") for i in range(rows)],
+                batch_size=options['batch_size'],
+            )
+
+        self.stdout.write(f"{rows} rows per strategy")
+        for label, func in (('exists() loop', legacy), ('insert-and-retry', per_row), ('bulk import', bulk)):
+            elapsed, queries = self._measure(func)
+            self.stdout.write(
+                f"{label:>18}: {rows / elapsed:8.0f} rows/s, {queries / rows:.2f} queries/row ({elapsed:.2f}s)"
+            )
+
+    def _measure(self, func):
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            try:
+                with transaction.atomic():
+                    func()
+                    elapsed = time.perf_counter() - started
+                    raise _Rollback
+            except _Rollback:
+                pass
+        return elapsed, len(ctx.captured_queries)
@@ -0,0 +1,79 @@
+"""
+Backfill stored HTML: content_html (escaped content with @mention links) for logs
+and comments, and highlighted code snippet previews for logs.
+
+Usage:
+    python manage.py build_content_html                  # rows not rendered yet
+    python manage.py build_content_html --force          # re-render every row
+    python manage.py build_content_html --only comments --batch-size 1000
+    python manage.py build_content_html --only snippets
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from logs.models import Comment, Log
+from logs.utils.code_snippets import render_snippet_preview
+from logs.utils.mentions import RENDERED_FIELDS, render_content_html
+
+
+class Command(BaseCommand):
+    help = "Render stored HTML for log and comment content (one username query per batch)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows rendered per username query")
+        parser.add_argument('--only', choices=['logs', 'comments', 'snippets'], help="Limit to one kind of HTML")
+        parser.add_argument('--force', action='store_true', help="Re-render rows that already have HTML")
+
+    def handle(self, *args, **options):
+        models = {'logs': Log, 'comments': Comment}
+        for label, model in models.items():
+            if options['only'] not in (None, label):
+                continue
+            done = self._backfill(model, options['batch_size'], options['force'])
+            self.stdout.write(self.style.SUCCESS(f"{model.__name__} rows rendered: {done}"))
+
+        if options['only'] in (None, 'snippets'):
+            done = self._backfill_snippets(options['batch_size'], options['force'])
+            self.stdout.write(self.style.SUCCESS(f"Code snippets highlighted: {done}"))
+
+    def _backfill(self, model, batch_size, force):
+        rows = model.objects.exclude(content='').only('id', 'content', *RENDERED_FIELDS).order_by('id')
+        if not force:
+            rows = rows.filter(content_html='')
+
+        done = 0
+        last_id = 0
+        while True:
+            batch = list(rows.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                return done
+            last_id = batch[-1].id
+            render_content_html(batch)
+            # bulk_update keeps save() (and its per-row username query) out of the backfill
+            model.objects.bulk_update(batch, RENDERED_FIELDS)
+            if model is Log:
+                # Cached log cards embed content_html
+                Log.objects.filter(pk__in=[log.id for log in batch]).update(version=F('version') + 1)
+            done += len(batch)
+            if done % (batch_size * 10) == 0:
+                self.stdout.write(f"  {model.__name__}: {done} done")
+
+    def _backfill_snippets(self, batch_size, force):
+        fields = ['code_language', 'code_snippet_preview_html', 'code_snippet_truncated']
+        rows = Log.objects.exclude(code_snippet='').exclude(code_snippet__isnull=True)
+        rows = rows.only('id', 'code_snippet', *fields).order_by('id')
+        if not force:
+            rows = rows.filter(code_snippet_preview_html='')
+
+        done = 0
+        last_id = 0
+        while True:
+            batch = list(rows.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                return done
+            last_id = batch[-1].id
+            for log in batch:
+                render_snippet_preview(log)
+            Log.objects.bulk_update(batch, fields)
+            Log.objects.filter(pk__in=[log.id for log in batch]).update(version=F('version') + 1)
+            done += len(batch)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0019_logformsettings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='log',
+            name='snap_shot_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
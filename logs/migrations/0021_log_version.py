@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0020_log_snap_shot_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='log',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
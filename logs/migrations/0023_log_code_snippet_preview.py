@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0022_content_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='log',
+            name='code_language',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='log',
+            name='code_snippet_preview_html',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='log',
+            name='code_snippet_truncated',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:45
+
+from django.db import migrations, models
+
+
+def flag_existing_mentions(apps, schema_editor):
+    # Rows saved before the flag: anything with an @ may hold an unresolved mention.
+    # Over-flagging only widens signup rebuilds; the next re-render clears it
+    for model_name in ('Log', 'Comment'):
+        model = apps.get_model('logs', model_name)
+        model.objects.filter(content__contains='@').update(has_unresolved_mentions=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0023_log_code_snippet_preview'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='has_unresolved_mentions',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='log',
+            name='has_unresolved_mentions',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('has_unresolved_mentions', True)), fields=['id'], name='comment_unresolved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='log',
+            index=models.Index(condition=models.Q(('has_unresolved_mentions', True)), fields=['id'], name='log_unresolved_mention_idx'),
+        ),
+        migrations.RunPython(flag_existing_mentions, migrations.RunPython.noop),
+    ]
@@ -1,33 +1,199 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from myapp.models import userinfo
 from django.utils.crypto import get_random_string
 from django.db.models import F, Count
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.utils.safestring import mark_safe
+
+from .utils.code_snippets import render_snippet_preview
+from .utils.mentions import RENDERED_FIELDS, render_content_html, render_mentions
 
 BASE62_ALPHABET = '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
 
 def generate_base62_id(length=8):
     return get_random_string(length=length, allowed_chars=BASE62_ALPHABET)
 
+# Attempts before giving up on a signature collision (62^8 ids, so a retry is already rare)
+SIG_MAX_ATTEMPTS = 5
+
 def generate_unique_signature():
-    while True:
-        sig = f"sig-{generate_base62_id()}"
-        if not Log.objects.filter(sig=sig).exists():
-            return sig
+    """
+    Random log signature. Doesn't touch the database: uniqueness is enforced by
+    the unique constraint, and Log.save / LogManager.bulk_create_with_signatures
+    pick a new one on the rare collision.
+    """
+    return f"sig-{generate_base62_id()}"
+
+
+# Fields rendered in a log card; saving any of them bumps Log.version
+CARD_FIELDS = frozenset({
+    'content', 'content_html', 'snap_shot', 'snap_shot_variants', 'code_snippet', 'code_language',
+    'code_snippet_preview_html', 'code_snippet_truncated', 'link',
+})
+
+
+class LogManager(models.Manager):
+    def bulk_create_with_signatures(self, logs, batch_size=500):
+        """
+        Insert many logs with one signature lookup per batch instead of one per row.
+
+        Colliding signatures (within the batch or against existing rows) are
+        regenerated before the insert. content_html and snippet previews are
+        rendered per batch. Like bulk_create, this skips save() and post_save
+        signals.
+
+        Args:
+            logs: Unsaved Log objects
+            batch_size: Rows per INSERT
+
+        Returns:
+            List of created Log objects
+        """
+        created = []
+        for start in range(0, len(logs), batch_size):
+            batch = logs[start:start + batch_size]
+            render_content_html(batch)
+            for log in batch:
+                render_snippet_preview(log)
+            for attempt in range(SIG_MAX_ATTEMPTS):
+                self._assign_signatures(batch)
+                try:
+                    with transaction.atomic(using=self.db):
+                        created.extend(self.bulk_create(batch))
+                    break
+                except IntegrityError:
+                    # A concurrent insert took one of our signatures after the check
+                    if attempt == SIG_MAX_ATTEMPTS - 1:
+                        raise
+                    for log in batch:
+                        log.sig = None
+        return created
+
+    def _assign_signatures(self, batch):
+        seen = set()
+        pending = []
+        for log in batch:
+            if not log.sig or log.sig in seen:
+                log.sig = generate_unique_signature()
+            seen.add(log.sig)
+            pending.append(log)
+
+        while pending:
+            taken = set(self.filter(sig__in=[log.sig for log in pending]).values_list('sig', flat=True))
+            pending = [log for log in pending if log.sig in taken]
+            for log in pending:
+                seen.discard(log.sig)
+                while log.sig in taken or log.sig in seen:
+                    log.sig = generate_unique_signature()
+                seen.add(log.sig)
+
+
+def _render_content(obj, save_kwargs):
+    """Refresh content_html when content is being saved"""
+    update_fields = save_kwargs.get('update_fields')
+    if update_fields is not None:
+        if 'content' not in update_fields:
+            return
+        save_kwargs['update_fields'] = {*update_fields, *RENDERED_FIELDS}
+    render_content_html([obj])
+
+
+def _render_snippet(log, save_kwargs):
+    update_fields = save_kwargs.get('update_fields')
+    if update_fields is not None:
+        if 'code_snippet' not in update_fields:
+            return
+        save_kwargs['update_fields'] = {
+            *update_fields, 'code_language', 'code_snippet_preview_html', 'code_snippet_truncated',
+        }
+    render_snippet_preview(log)
+
+
+def _rendered_content(obj):
+    # Rows saved before content_html existed render on the fly until backfilled
+    if obj.content_html or not obj.content:
+        return mark_safe(obj.content_html)
+    return render_mentions(obj.content)
+
 
 class Log(models.Model):
     user = models.ForeignKey(userinfo, on_delete=models.CASCADE, related_name='mind_logs')
     content = models.TextField(max_length=280)
+    # content with escaping and @mention links, rendered on save (logs.utils.mentions)
+    content_html = models.TextField(blank=True, default='')
+    # A mention in content that doesn't link to a user (yet); see logs.utils.mentions
+    has_unresolved_mentions = models.BooleanField(default=False)
     snap_shot = models.ImageField(upload_to='log_snap_shot', blank=True, null=True)
+    snap_shot_variants = models.JSONField(default=dict, blank=True)
     code_snippet = models.TextField(max_length=10000, blank=True, null=True)
+    # Highlighted on save (logs.utils.code_snippets); cards ship the preview only
+    code_language = models.CharField(max_length=50, blank=True, default='')
+    code_snippet_preview_html = models.TextField(blank=True, default='')
+    code_snippet_truncated = models.BooleanField(default=False)
     timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
     link = models.URLField(blank=True, null=True, max_length=200)
 
     # Unique signature
     sig = models.CharField(max_length=20, unique=True, default=generate_unique_signature)
-    
+
+    # Bumped whenever the rendered card changes (edits, reactions, comments, renditions)
+    version = models.PositiveIntegerField(default=1)
+
+    objects = LogManager()
+
+    class Meta:
+        indexes = [
+            # Rows a signup may need to re-render (logs.utils.mentions)
+            models.Index(
+                fields=['id'], condition=models.Q(has_unresolved_mentions=True), name='log_unresolved_mention_idx',
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        """Insert with the random signature and retry with a new one on collision"""
+        _render_content(self, kwargs)
+        _render_snippet(self, kwargs)
+        if not self._state.adding:
+            update_fields = kwargs.get('update_fields')
+            # Edits to what the card shows invalidate its cached markup (logs.utils.log_cards)
+            self._bump_version = update_fields is None or bool(CARD_FIELDS.intersection(update_fields))
+            if self._bump_version and update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'version'}
+            try:
+                return super().save(*args, **kwargs)
+            finally:
+                self._bump_version = False
+
+        for attempt in range(SIG_MAX_ATTEMPTS):
+            try:
+                with transaction.atomic(using=kwargs.get('using')):
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                if attempt == SIG_MAX_ATTEMPTS - 1 or not Log.objects.filter(sig=self.sig).exists():
+                    raise
+                self.sig = generate_unique_signature()
+    
+    def _do_update(self, base_qs, using, pk_val, values, *args, **kwargs):
+        if not getattr(self, '_bump_version', False):
+            return super()._do_update(base_qs, using, pk_val, values, *args, **kwargs)
+        # Bump in the same UPDATE, like bump_log_version, so concurrent bumps aren't overwritten
+        values = [
+            (field, model, F('version') + 1 if field.attname == 'version' else value)
+            for field, model, value in values
+        ]
+        updated = super()._do_update(base_qs, using, pk_val, values, *args, **kwargs)
+        # Deferred until read: post_save receivers and later code load the new integer
+        self.__dict__.pop('version', None)
+        return updated
+
+    def rendered_content(self):
+        return _rendered_content(self)
+
     def total_comments(self):
+        # Feeds annotate comment_count; fall back to a query elsewhere
+        if getattr(self, 'comment_count', None) is not None:
+            return self.comment_count
         return self.comments.count()
     
     def total_reactions(self):
@@ -35,13 +201,21 @@ class Log(models.Model):
     
     def get_reaction_counts(self):
         """Get count of each reaction type"""
-        counts = self.reactions.values('emoji').annotate(count=Count('emoji'))
-        return {item['emoji']: item['count'] for item in counts}
+        # Attached by the global feed cache (logs.utils.global_feed), else memoized:
+        # templates call this once per emoji
+        if not hasattr(self, '_reaction_counts'):
+            counts = self.reactions.values('emoji').annotate(count=Count('emoji'))
+            self._reaction_counts = {item['emoji']: item['count'] for item in counts}
+        return self._reaction_counts
     
     def get_user_reaction(self, user):
         """Get the reaction by a specific user for this log"""
+        user = user.info if hasattr(user, 'info') else user
+        viewer = getattr(self, '_viewer_reaction', None)
+        if viewer is not None and viewer[0] == user.id:
+            return viewer[1]
         try:
-            return self.reactions.get(user=user.info if hasattr(user, 'info') else user)
+            return self.reactions.get(user=user)
         except:
             return None
     
@@ -61,6 +235,9 @@ class Comment(models.Model):
     mindlog = models.ForeignKey(Log, on_delete=models.CASCADE, related_name='comments')
     user = models.ForeignKey(userinfo, on_delete=models.CASCADE, related_name='mindlog_comments')
     content = models.TextField(max_length=500)
+    content_html = models.TextField(blank=True, default='')
+    # A mention in content that doesn't link to a user (yet); see logs.utils.mentions
+    has_unresolved_mentions = models.BooleanField(default=False)
     timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
     
     # Reply functionality (nested comments)
@@ -74,9 +251,22 @@ class Comment(models.Model):
         indexes = [
             models.Index(fields=['mindlog', 'timestamp']),
             models.Index(fields=['user', 'timestamp']),
+            models.Index(
+                fields=['id'], condition=models.Q(has_unresolved_mentions=True), name='comment_unresolved_idx',
+            ),
         ]
     
+    def save(self, *args, **kwargs):
+        _render_content(self, kwargs)
+        super().save(*args, **kwargs)
+
+    def rendered_content(self):
+        return _rendered_content(self)
+
     def total_likes(self):
+        # Thread pages annotate like_count (logs.utils.comment_threads)
+        if getattr(self, 'like_count', None) is not None:
+            return self.like_count
         return self.likes.count()
     
     def is_reply(self):
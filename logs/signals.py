@@ -1,257 +1,103 @@
 """
-Signal handlers for logs app - includes file cleanup and notification creation
+Signal handlers for logs app - publish domain events for writes to logs,
+comments and reactions.
+
+Their side effects (notifications, leaderboard counters, the global timeline,
+log card versions, snapshot cleanup) run in logs/handlers.py once the write
+has committed; receivers here only record one compact event in the writer's
+transaction (see myapp.utils.events).
 """
-from django.db.models.signals import post_delete, post_save
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
-from django.core.files.storage import default_storage
-from django.contrib.contenttypes.models import ContentType
-import re
 
-from .models import Log, Comment, Reaction, Notification
-from myapp.models import follow
+from .models import Log, Comment, Reaction
+from myapp.utils.events import publish
+from myapp.utils.images import iter_rendition_names
+from myapp.utils.tasks import enqueue
 
 
-@receiver(post_delete, sender=Log)
-def delete_log_snapshot(sender, instance, **kwargs):
-    """Clean up snapshot file when log is deleted"""
-    if instance.snap_shot and instance.snap_shot.name:
-        if default_storage.exists(instance.snap_shot.name):
-            default_storage.delete(instance.snap_shot.name)
+@receiver(post_save, sender=Log)
+def generate_log_snapshot_renditions(sender, instance, created, **kwargs):
+    """Generate card-sized renditions for a newly uploaded snapshot"""
+    if not created or not instance.snap_shot or instance.snap_shot_variants:
+        return
 
+    enqueue('generate_log_snapshot_renditions', {'log_id': instance.pk})
 
-# ============= NOTIFICATION SIGNALS =============
 
-@receiver(post_save, sender=Comment)
-def create_comment_notification(sender, instance, created, **kwargs):
-    """
-    Create notification when someone comments on a log or replies to a comment
-    """
-    if not created:
-        return
-    
-    # Determine notification type and recipient
-    if instance.parent_comment or hasattr(instance, '_actual_parent_user'):
-        # This is a reply to a comment
-        # Use _actual_parent_user if available (handles flattened replies)
-        if hasattr(instance, '_actual_parent_user'):
-            recipient = instance._actual_parent_user
-        else:
-            recipient = instance.parent_comment.user
-        verb = 'replied to your comment'
-        notification_type = 'reply'
-    else:
-        # This is a comment on a log
-        recipient = instance.mindlog.user
-        verb = 'commented on your log'
-        notification_type = 'comment'
-        
-        # Don't notify if user comments on their own log
-        if recipient == instance.user:
-            # Still check for mentions though
-            create_mention_notifications(instance.content, instance.user, instance.mindlog, instance, 'comment_mention')
-            return
-    
-    # Don't notify if replying to yourself
-    if recipient == instance.user:
-        # Still check for mentions though
-        create_mention_notifications(instance.content, instance.user, instance.mindlog, instance, 'comment_mention')
-        return
-    
-    # Create the notification
-    Notification.objects.create(
-        recipient=recipient,
-        actor=instance.user,
-        verb=verb,
-        target=instance.mindlog,
-        action_object=instance,
-        notification_type=notification_type
-    )
-    
-    # Check for @mentions in the comment
-    # Pass the reply recipient to avoid duplicate notifications
-    reply_recipient = recipient if notification_type == 'reply' else None
-    create_mention_notifications(instance.content, instance.user, instance.mindlog, instance, 'comment_mention', exclude_user=reply_recipient)
+@receiver(post_save, sender=Log)
+def publish_log_created(sender, instance, created, **kwargs):
+    if created:
+        publish('log.created', log_id=instance.id, user_id=instance.user_id, timestamp=instance.timestamp.isoformat())
 
 
-@receiver(post_save, sender=Reaction)
-def create_reaction_notification(sender, instance, created, **kwargs):
-    """
-    Create notification when someone reacts to a log
-    """
-    if not created:
-        return
-    
-    # Don't notify if user reacts to their own log
-    if instance.mindlog.user == instance.user:
-        return
-    
-    Notification.objects.create(
-        recipient=instance.mindlog.user,
-        actor=instance.user,
-        verb=f'reacted {instance.emoji} to your log',
-        target=instance.mindlog,
-        action_object=instance,
-        notification_type='reaction'
+@receiver(post_delete, sender=Log)
+def publish_log_deleted(sender, instance, **kwargs):
+    # The row is gone by the time handlers run, so the event carries its files
+    files = list(iter_rendition_names(instance.snap_shot_variants))
+    if instance.snap_shot and instance.snap_shot.name:
+        files.append(instance.snap_shot.name)
+    publish(
+        'log.deleted',
+        log_id=instance.id,
+        user_id=instance.user_id,
+        timestamp=instance.timestamp.isoformat() if instance.timestamp else None,
+        files=files,
     )
 
 
-@receiver(post_save, sender=follow)
-def create_follow_notification(sender, instance, created, **kwargs):
-    """
-    Create notification when someone follows a user
-    """
+@receiver(post_save, sender=Comment)
+def publish_comment_created(sender, instance, created, **kwargs):
     if not created:
         return
-    
-    Notification.objects.create(
-        recipient=instance.following,
-        actor=instance.follower,
-        verb='started following you',
-        target=instance.follower,  # Target is the follower's profile
-        notification_type='follow'
+    # add_comment sets _actual_parent_user when a nested reply is flattened
+    reply_to = getattr(instance, '_actual_parent_user', None)
+    publish(
+        'comment.created',
+        comment_id=instance.id,
+        log_id=instance.mindlog_id,
+        reply_to_user_id=reply_to.id if reply_to is not None else None,
     )
 
 
-@receiver(post_save, sender=Log)
-def create_log_mention_notifications(sender, instance, created, **kwargs):
-    """
-    Create notifications for @mentions in log content
-    """
-    if not created:
-        return
-    
-    create_mention_notifications(instance.content, instance.user, instance, None, 'mention')
-
+@receiver(post_delete, sender=Comment)
+def publish_comment_deleted(sender, instance, **kwargs):
+    publish('comment.deleted', comment_id=instance.id, log_id=instance.mindlog_id)
 
-def create_mention_notifications(content, actor, log, action_object=None, notification_type='mention', exclude_user=None):
-    """
-    Parse content for @mentions and create notifications
-    
-    Args:
-        content: Text content to parse for mentions
-        actor: User who created the content
-        log: The log being mentioned in
-        action_object: Optional action object (e.g., Comment)
-        notification_type: Type of mention notification
-        exclude_user: Optional user to exclude from mention notifications (e.g., if they already got a reply notification)
-    """
-    from myapp.models import userinfo
-    
-    # Find all @mentions in the content
-    mention_pattern = r'@(\w+)'
-    mentioned_usernames = re.findall(mention_pattern, content)
-    
-    if not mentioned_usernames:
-        return
-    
-    # Get unique usernames
-    mentioned_usernames = set(mentioned_usernames)
-    
-    # Find users and create notifications
-    for username in mentioned_usernames:
-        try:
-            mentioned_user = userinfo.objects.select_related('user').get(user__username=username)
-            
-            # Don't notify if mentioning yourself
-            if mentioned_user == actor:
-                continue
-            
-            # Don't notify if this user already received a reply notification
-            if exclude_user and mentioned_user == exclude_user:
-                continue
-            
-            # Don't notify the log owner if they're mentioned in their own log
-            if mentioned_user == log.user and not action_object:
-                continue
-            
-            # Create notification
-            verb = 'mentioned you in a comment' if notification_type == 'comment_mention' else 'mentioned you in a log'
-            
-            Notification.objects.create(
-                recipient=mentioned_user,
-                actor=actor,
-                verb=verb,
-                target=log,
-                action_object=action_object,
-                notification_type=notification_type
-            )
-        except userinfo.DoesNotExist:
-            # Username doesn't exist, skip
-            continue
 
+@receiver(post_save, sender=Reaction)
+def publish_reaction_saved(sender, instance, created, **kwargs):
+    # Changing the emoji changes the log's reaction counts
+    publish('reaction.created' if created else 'reaction.updated', reaction_id=instance.id, log_id=instance.mindlog_id)
 
-# ============= NOTIFICATION CLEANUP SIGNALS =============
 
-@receiver(post_delete, sender=Comment)
-def delete_comment_notifications(sender, instance, **kwargs):
-    """
-    Delete notifications when a comment or reply is deleted
-    """
-    from django.contrib.contenttypes.models import ContentType
-    
-    # Get the ContentType for Comment
-    comment_ct = ContentType.objects.get_for_model(Comment)
-    
-    # Delete notifications where this comment is the action_object
-    # This handles both comment and reply notifications
-    Notification.objects.filter(
-        action_content_type=comment_ct,
-        action_object_id=instance.id
-    ).delete()
-    
-    # Also delete mention notifications where this comment is the action_object
-    Notification.objects.filter(
-        action_content_type=comment_ct,
-        action_object_id=instance.id,
-        notification_type__in=['comment_mention']
-    ).delete()
+@receiver(post_delete, sender=Reaction)
+def publish_reaction_deleted(sender, instance, **kwargs):
+    publish('reaction.deleted', reaction_id=instance.id, log_id=instance.mindlog_id)
 
 
-@receiver(post_delete, sender=Reaction)
-def delete_reaction_notifications(sender, instance, **kwargs):
-    """
-    Delete notifications when a reaction is removed
-    """
-    from django.contrib.contenttypes.models import ContentType
-    
-    # Get the ContentType for Reaction
-    reaction_ct = ContentType.objects.get_for_model(Reaction)
-    
-    # Delete the reaction notification
-    Notification.objects.filter(
-        action_content_type=reaction_ct,
-        action_object_id=instance.id,
-        notification_type='reaction'
-    ).delete()
+@receiver(post_init, sender=User)
+def remember_loaded_username(sender, instance, **kwargs):
+    # No query: compared in post_save (deferred usernames aren't saved anyway)
+    instance._loaded_username = instance.__dict__.get('username')
 
 
-@receiver(post_delete, sender=follow)
-def delete_follow_notifications(sender, instance, **kwargs):
-    """
-    Delete notifications when someone unfollows a user
-    """
-    # Delete the follow notification
-    # We match by recipient, actor, and notification_type since follow doesn't use action_object
-    Notification.objects.filter(
-        recipient=instance.following,
-        actor=instance.follower,
-        notification_type='follow'
-    ).delete()
+@receiver(post_save, sender=User)
+def rebuild_mentions_on_username_change(sender, instance, created, update_fields=None, **kwargs):
+    """Stored content_html links mentions of existing users only"""
+    previous, instance._loaded_username = getattr(instance, '_loaded_username', None), instance.username
+    if created:
+        # A new name can only fix mentions that link nowhere yet (partially indexed rows)
+        enqueue('rebuild_mention_html', {'usernames': [instance.username], 'unresolved_only': True})
+        return
+    if update_fields is not None and 'username' not in update_fields:
+        return
+    if previous is None or previous == instance.username:
+        return
+    enqueue('rebuild_mention_html', {'usernames': [previous, instance.username]})
 
 
-@receiver(post_delete, sender=Log)
-def delete_log_notifications(sender, instance, **kwargs):
-    """
-    Delete all notifications related to a log when it's deleted
-    """
-    from django.contrib.contenttypes.models import ContentType
-    
-    # Get the ContentType for Log
-    log_ct = ContentType.objects.get_for_model(Log)
-    
-    # Delete all notifications where this log is the target
-    # This includes comments, reactions, and mentions on this log
-    Notification.objects.filter(
-        target_content_type=log_ct,
-        target_object_id=instance.id
-    ).delete()
\ No newline at end of file
+@receiver(post_delete, sender=User)
+def rebuild_mentions_on_user_delete(sender, instance, **kwargs):
+    enqueue('rebuild_mention_html', {'usernames': [instance.username]})
@@ -0,0 +1,29 @@
+"""
+Background task handlers for logs (run by `manage.py run_tasks`)
+"""
+from django.db.models import F
+
+from myapp.utils.images import generate_renditions
+from myapp.utils.tasks import task
+
+from .models import Log
+from .utils.mentions import rebuild_mention_html as rebuild_mentions
+
+
+@task('generate_log_snapshot_renditions')
+def generate_log_snapshot_renditions(log_id):
+    """Generate card-sized renditions for a log snapshot"""
+    try:
+        log = Log.objects.only('id', 'snap_shot').get(pk=log_id)
+    except Log.DoesNotExist:
+        return
+
+    variants = generate_renditions(log.snap_shot, 'card')
+    if variants:
+        Log.objects.filter(pk=log_id).update(snap_shot_variants=variants, version=F('version') + 1)
+
+
+@task('rebuild_mention_html')
+def rebuild_mention_html(usernames, unresolved_only=False):
+    """Re-render stored content that mentions renamed, new or deleted usernames"""
+    rebuild_mentions(usernames, unresolved_only=unresolved_only)
@@ -0,0 +1,21 @@
+from django import template
+
+from logs.utils.log_cards import render_log_cards as render_cards
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def render_log_cards(context, logs, variant):
+    """
+    Prepare the cached card markup for a page of logs (sets log.card_html).
+
+    Usage in template, before the loop:
+        {% render_log_cards feed_items 'feed' %}
+    """
+    request = context.get('request')
+    viewer = None
+    if request is not None and request.user.is_authenticated:
+        viewer = getattr(request.user, 'info', None)
+    render_cards(logs, variant, viewer)
+    return ''
@@ -7,8 +7,12 @@ urlpatterns = [
     path("reaction/<str:sig>/", views.toggle_reaction, name="toggle_reaction"),
     path("comment/add/<str:sig>/", views.add_comment, name="add_comment"),
     path("comment/delete/<int:comment_id>/", views.delete_comment, name="delete_comment"),
+    path("comments/<str:sig>/", views.comment_thread, name="comment_thread"),
+    path("comment/replies/<int:comment_id>/", views.comment_replies, name="comment_replies"),
+    path("comment/like/<int:comment_id>/", views.toggle_comment_like, name="toggle_comment_like"),
     
     path("load-more-profile-logs/<str:username>/", views.load_more_profile_logs, name="load_more_profile_logs"),
+    path("snippet/<str:sig>/", views.code_snippet, name="code_snippet"),
     
     # Mention autocomplete API
     path("api/users/search/", views.search_users_for_mention, name="search_users_for_mention"),
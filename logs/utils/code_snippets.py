@@ -0,0 +1,220 @@
+"""
+Code snippet highlighting - snippets are highlighted with Pygments when a log is
+saved instead of by highlight.js in every viewer's browser.
+
+    from logs.utils.code_snippets import render_snippet_preview, get_snippet_html
+    render_snippet_preview(log)       # sets code_language, code_snippet_preview_html, code_snippet_truncated
+    get_snippet_html(log)             # full highlighted snippet (content-addressed cache)
+
+Feed cards only carry the preview: the first PREVIEW_LINES lines (at most
+PREVIEW_CHARS characters). The full snippet, up to 10,000 characters, is
+fetched when a viewer expands or copies it. Its HTML is cached under the
+snippet's SHA-256, so identical snippets share one entry and edits never
+need invalidation.
+
+Markup uses highlight.js class names (hljs-keyword, hljs-string, ...) so the
+github-dark theme loaded in base.html styles server and client output alike.
+"""
+import hashlib
+import re
+from io import StringIO
+
+from django.utils.html import escape
+from pygments.formatter import Formatter
+from pygments.lexers import TextLexer, get_lexer_by_name
+from pygments.token import Comment, Generic, Keyword, Name, Number, Operator, String
+from pygments.util import ClassNotFound
+
+from myapp.utils.cache import CacheNamespace
+
+PREVIEW_LINES = 15
+PREVIEW_CHARS = 1500
+# Language detection only looks at the start of long snippets
+DETECT_CHARS = 4000
+
+snippet_html_cache = CacheNamespace('code_snippets', ttl=7 * 24 * 3600)
+
+# Most specific token types first: the first match of a token's type or its parents wins
+HLJS_CLASSES = (
+    (Keyword.Constant, 'hljs-literal'),
+    (Keyword.Type, 'hljs-type'),
+    (Keyword, 'hljs-keyword'),
+    (Operator.Word, 'hljs-keyword'),
+    (Name.Builtin, 'hljs-built_in'),
+    (Name.Function, 'hljs-title'),
+    (Name.Class, 'hljs-title'),
+    (Name.Decorator, 'hljs-meta'),
+    (Name.Tag, 'hljs-name'),
+    (Name.Attribute, 'hljs-attr'),
+    (Name.Variable, 'hljs-variable'),
+    (String.Regex, 'hljs-regexp'),
+    (String, 'hljs-string'),
+    (Number, 'hljs-number'),
+    (Comment.PreprocFile, 'hljs-string'),
+    (Comment.Preproc, 'hljs-meta'),
+    (Comment, 'hljs-comment'),
+    (Generic.Deleted, 'hljs-deletion'),
+    (Generic.Inserted, 'hljs-addition'),
+    (Generic.Heading, 'hljs-section'),
+)
+
+
+_class_cache = {}
+
+
+def _css_class(ttype):
+    css_class = _class_cache.get(ttype)
+    if css_class is None:
+        css_class = next((name for parent, name in HLJS_CLASSES if ttype in parent), '')
+        _class_cache[ttype] = css_class
+    return css_class
+
+
+class HljsFormatter(Formatter):
+    """Escaped token text in <span class="hljs-..."> runs, without a wrapper element"""
+
+    def format(self, tokensource, outfile):
+        run_class, run = None, []
+        for ttype, value in tokensource:
+            css_class = _css_class(ttype)
+            if css_class != run_class and run:
+                _write_run(outfile, run_class, run)
+                run = []
+            run_class = css_class
+            run.append(value)
+        if run:
+            _write_run(outfile, run_class, run)
+
+
+def _write_run(outfile, css_class, values):
+    text = escape(''.join(values))
+    outfile.write(f'<span class="{css_class}">{text}</span>' if css_class else text)
+
+
+# Languages configured for highlight.js in static/scripts/syntax-highlight.js (Pygments aliases)
+LANGUAGES = (
+    'javascript', 'typescript', 'python', 'java', 'c', 'cpp', 'csharp',
+    'go', 'rust', 'ruby', 'php', 'swift', 'kotlin', 'scala',
+    'html', 'css', 'scss', 'json', 'xml', 'yaml', 'markdown',
+    'sql', 'bash', 'powershell', 'docker', 'nginx',
+)
+
+
+def _first_line_opens_block(code):
+    first = code.split('\n', 1)[0]
+    return bool(re.search(r':\s*$', first)) and not re.search(r'[{;]', first)
+
+
+# Same heuristics as detectLanguage() in syntax-highlight.js, checked in order
+LANGUAGE_RULES = (
+    ('python', lambda c: re.match(r'(import |from .+ import |def |class |if __name__|@\w+|print\(|async def )', c)
+        or _first_line_opens_block(c)),
+    ('typescript', lambda c: _is_javascript(c) and (
+        re.search(r':\s*(string|number|boolean|any|void|never|unknown)\b', c)
+        or re.search(r'interface\s+\w+|type\s+\w+\s*=|<\w+>', c))),
+    ('javascript', lambda c: _is_javascript(c)),
+    ('java', lambda c: re.match(r'(public |private |protected |package |import java\.|class \w+ (extends|implements))', c)
+        or re.search(r'System\.(out|err)\.print|public static void main', c)),
+    ('cpp', lambda c: _is_c(c) and re.search(r'cout|cin|std::|nullptr|class\s+\w+\s*{|template\s*<', c)),
+    ('c', lambda c: _is_c(c)),
+    ('csharp', lambda c: re.search(r'^using\s+System;|namespace\s+\w+|Console\.(Write|Read)', c)
+        or re.search(r'public\s+(class|interface|struct|enum)\s+\w+', c)),
+    ('go', lambda c: re.search(r'^package\s+\w+|^import\s+\(|func\s+\w+\(|fmt\.(Print|Scan)', c) or ':=' in c),
+    ('rust', lambda c: re.match(r'(use\s+\w+|fn\s+\w+|let\s+mut|impl\s+\w+|struct\s+\w+|enum\s+\w+|pub\s+fn)', c)
+        or re.search(r'println!\(|vec!\[|&str|&mut', c)),
+    ('ruby', lambda c: re.match(r'(require|gem|def\s+\w+|class\s+\w+\s*<|module\s+\w+|end$)', c)
+        or re.search(r'puts\s|\.each\s+do|do\s*\|', c)),
+    ('php', lambda c: re.search(r'^<\?php|\$\w+\s*=|function\s+\w+\s*\(.*\)\s*{|echo\s|->', c)),
+    ('html', lambda c: re.search(r'^<!DOCTYPE|^<html|^<head|^<body|<div|<span|<p>|<a\s|<img\s|<script|<style|</\w+>', c)),
+    ('scss', lambda c: _is_css(c) and re.search(r'@mixin|@include|\$\w+:|@extend', c)),
+    ('css', lambda c: _is_css(c)),
+    ('json', lambda c: re.match(r'\s*[\[{]', c) and re.search(r'[\]}]\s*$', c) and re.search(r'"\w+"\s*:', c)),
+    ('yaml', lambda c: re.search(r'^\w+:\s*(\n|$)|^-\s+\w+:', c) and not re.search(r'[{};]', c)),
+    ('sql', lambda c: re.match(r'(SELECT|INSERT|UPDATE|DELETE|CREATE|ALTER|DROP|FROM|WHERE|JOIN)\s', c, re.IGNORECASE)),
+    ('bash', lambda c: re.match(r'#!', c) or re.search(r'^\$\s|^echo\s|^cd\s|^ls\s|^grep\s|^awk\s|^sed\s|\|\s*(grep|awk|sed)', c)),
+    ('docker', lambda c: re.search(r'^(FROM|RUN|CMD|EXPOSE|ENV|ADD|COPY|ENTRYPOINT|VOLUME|WORKDIR)\s', c, re.MULTILINE)),
+    ('markdown', lambda c: re.search(r'^#+\s|^\*\*\w|\*\w\*|^-\s\[|```', c)),
+)
+
+
+def _is_javascript(code):
+    return bool(
+        re.match(r'(const |let |var |function |import |export |async |await |=>\s*{|class .+ extends)', code)
+        or re.search(r'\.(then|catch|finally)\(|console\.(log|error|warn)', code)
+    )
+
+
+def _is_c(code):
+    return bool(
+        re.match(r'#include\s*[<"]|(int|void|char|float|double)\s+main\s*\(', code)
+        or re.search(r'printf\(|scanf\(|cout\s*<<|cin\s*>>', code)
+    )
+
+
+def _is_css(code):
+    return bool(re.search(r'^[\.\#\w\-\[\]]+\s*{|@media|@import|@keyframes|:root\s*{', code))
+
+
+def detect_lexer(code):
+    """
+    Pygments lexer for a snippet: the client-side heuristics first, then the
+    best analyse_text() score among LANGUAGES, then plain text.
+    """
+    # Keep the snippet's whitespace exactly as typed
+    options = {'stripnl': False, 'ensurenl': False}
+    sample = code[:DETECT_CHARS].strip()
+
+    alias = next((alias for alias, rule in LANGUAGE_RULES if rule(sample)), None)
+    if alias is None:
+        # guess_lexer() would consider hundreds of niche formats; score the supported ones only
+        scores = [(get_lexer_by_name(name).analyse_text(sample), name) for name in LANGUAGES]
+        score, name = max(scores)
+        alias = name if score > 0 else None
+    try:
+        return get_lexer_by_name(alias, **options) if alias else TextLexer(**options)
+    except ClassNotFound:
+        return TextLexer(**options)
+
+
+def highlight(code, lexer):
+    """Highlighted HTML for `code` (safe to embed inside <code>)"""
+    out = StringIO()
+    HljsFormatter().format(lexer.get_tokens(code), out)
+    return out.getvalue()
+
+
+def truncate(code):
+    """The preview part of a snippet and whether anything was cut"""
+    lines = code.split('\n')
+    preview = '\n'.join(lines[:PREVIEW_LINES])[:PREVIEW_CHARS]
+    return preview, len(preview) < len(code)
+
+
+def render_snippet_preview(log):
+    """Set the language and highlighted preview columns from log.code_snippet"""
+    code = log.code_snippet or ''
+    if not code.strip():
+        log.code_language = ''
+        log.code_snippet_preview_html = ''
+        log.code_snippet_truncated = False
+        return log
+
+    lexer = detect_lexer(code)
+    preview, truncated = truncate(code)
+    log.code_language = lexer.name if not isinstance(lexer, TextLexer) else ''
+    log.code_snippet_preview_html = highlight(preview, lexer)
+    log.code_snippet_truncated = truncated
+    if truncated:
+        # Highlight the full snippet now so the first expand is a cache hit
+        snippet_html_cache.set(snippet_key(code), highlight(code, lexer))
+    return log
+
+
+def snippet_key(code):
+    return hashlib.sha256(code.encode()).hexdigest()
+
+
+def get_snippet_html(log):
+    """The full highlighted snippet, from the content-addressed cache"""
+    code = log.code_snippet or ''
+    return snippet_html_cache.get_or_set(snippet_key(code), lambda: highlight(code, detect_lexer(code)))
@@ -0,0 +1,198 @@
+"""
+Comment threads - keyset-paginated top-level comments with replies on demand.
+
+    from logs.utils.comment_threads import get_comment_page, get_reply_page
+    page = get_comment_page(log, viewer, cursor=request.GET.get('cursor'))
+    page['comments'], page['next_cursor'], page['has_next']
+
+Top-level comments are read newest first on the (mindlog, timestamp) index;
+replies oldest first per parent, when a viewer expands them. Every page costs
+the same four queries however hot the log is: the comments (with authors),
+reply counts, like counts and the viewer's likes, the last three grouped over
+the page's ids.
+
+Cursors are "timestamp,id" strings like the feed's.
+
+Deleting a comment removes its whole reply subtree with a fixed number of
+statements (delete_comment_subtree, or delete_comment_subtrees for a batch of
+comments): one recursive CTE collects the ids, then
+notifications, likes and the comments go in one bulk DELETE each.
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.utils.dateparse import parse_datetime
+
+from logs.models import Comment, Notification
+from logs.utils.log_cards import bump_log_versions
+
+PAGE_SIZE = 10
+REPLY_PAGE_SIZE = 20
+
+
+def parse_cursor(cursor):
+    """
+    Returns:
+        (timestamp, id), or None for a missing or malformed cursor
+    """
+    if not cursor:
+        return None
+    timestamp, _, comment_id = cursor.partition(',')
+    try:
+        timestamp = parse_datetime(timestamp)
+        comment_id = int(comment_id)
+    except (TypeError, ValueError):
+        return None
+    return (timestamp, comment_id) if timestamp is not None else None
+
+
+def _format_cursor(comment):
+    return f'{comment.timestamp.isoformat()},{comment.id}'
+
+
+def _page(queryset, cursor, limit, newest_first, viewer):
+    position = parse_cursor(cursor)
+    if position is not None:
+        timestamp, comment_id = position
+        if newest_first:
+            queryset = queryset.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=comment_id))
+        else:
+            queryset = queryset.filter(Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=comment_id))
+    ordering = ('-timestamp', '-id') if newest_first else ('timestamp', 'id')
+
+    # One extra row tells whether another page exists
+    comments = list(queryset.select_related('user__user').order_by(*ordering)[:limit + 1])
+    has_next = len(comments) > limit
+    comments = comments[:limit]
+    annotate_comments(comments, viewer)
+    return {
+        'comments': comments,
+        'has_next': has_next,
+        'next_cursor': _format_cursor(comments[-1]) if has_next else None,
+    }
+
+
+def get_comment_page(log, viewer=None, cursor=None, limit=PAGE_SIZE):
+    """
+    One page of a log's top-level comments, newest first.
+
+    Args:
+        log: Log whose thread is read
+        viewer: userinfo of the requesting user (None when logged out)
+        cursor: next_cursor of the previous page
+
+    Returns:
+        Dictionary with 'comments', 'has_next' and 'next_cursor'
+    """
+    top_level = Comment.objects.filter(mindlog=log, parent_comment__isnull=True)
+    return _page(top_level, cursor, limit, True, viewer)
+
+
+def get_reply_page(comment, viewer=None, cursor=None, limit=REPLY_PAGE_SIZE):
+    """
+    One page of replies to a top-level comment, oldest first.
+
+    Returns:
+        Dictionary with 'comments', 'has_next' and 'next_cursor'
+    """
+    return _page(Comment.objects.filter(parent_comment=comment), cursor, limit, False, viewer)
+
+
+def annotate_comments(comments, viewer=None):
+    """
+    Attach reply_count, like_count and viewer_liked with three grouped queries.
+    """
+    ids = [comment.id for comment in comments]
+    if not ids:
+        return comments
+    likes = Comment.likes.through.objects.filter(comment_id__in=ids)
+
+    reply_counts = dict(
+        Comment.objects.filter(parent_comment_id__in=ids)
+        .values_list('parent_comment_id').annotate(count=Count('id')).order_by()
+    )
+    like_counts = dict(likes.values_list('comment_id').annotate(count=Count('id')).order_by())
+    liked = set()
+    if viewer is not None:
+        liked = set(likes.filter(userinfo_id=viewer.id).values_list('comment_id', flat=True))
+
+    for comment in comments:
+        comment.reply_count = reply_counts.get(comment.id, 0)
+        comment.like_count = like_counts.get(comment.id, 0)
+        comment.viewer_liked = comment.id in liked
+    return comments
+
+
+# Deletion
+
+def collect_subtree_ids(comment_ids):
+    """
+    Ids of the given comments and all of their descendants, with the log each
+    belongs to, in one recursive query.
+
+    Returns:
+        List of (comment id, log id) tuples
+    """
+    if not comment_ids:
+        return []
+    quote = connection.ops.quote_name
+    table = quote(Comment._meta.db_table)
+    parent = quote(Comment._meta.get_field('parent_comment').column)
+    mindlog = quote(Comment._meta.get_field('mindlog').column)
+    placeholders = ', '.join(['%s'] * len(comment_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH RECURSIVE subtree(id, mindlog_id) AS (
+                SELECT id, {mindlog} FROM {table} WHERE id IN ({placeholders})
+                UNION ALL
+                SELECT child.id, child.{mindlog} FROM {table} child JOIN subtree ON child.{parent} = subtree.id
+            )
+            SELECT id, mindlog_id FROM subtree
+            """,
+            list(comment_ids),
+        )
+        return cursor.fetchall()
+
+
+def delete_comment_subtree(comment):
+    """
+    Delete a comment, its replies and everything attached to them.
+
+    Returns:
+        Number of comments deleted
+    """
+    return delete_comment_subtrees([comment.id])
+
+
+def delete_comment_subtrees(comment_ids):
+    """
+    Delete comments with their reply subtrees, in a fixed number of statements.
+
+    Bypasses the per-row cascade: notifications and likes are removed in bulk
+    and the comments' delete signals are not sent; their effect (dropping
+    notifications, bumping the logs' card versions) is applied once here.
+
+    Returns:
+        Number of comments deleted
+    """
+    rows = collect_subtree_ids(comment_ids)
+    if not rows:
+        return 0
+    ids = [comment_id for comment_id, _ in rows]
+
+    with transaction.atomic():
+        Notification.objects.filter(
+            action_content_type=ContentType.objects.get_for_model(Comment),
+            action_object_id__in=ids,
+        ).delete()
+        Comment.likes.through.objects.filter(comment_id__in=ids).delete()
+        # QuerySet.delete() would load every row to send delete signals
+        with connection.cursor() as cursor:
+            placeholders = ', '.join(['%s'] * len(ids))
+            cursor.execute(
+                f"DELETE FROM {connection.ops.quote_name(Comment._meta.db_table)} WHERE id IN ({placeholders})",
+                ids,
+            )
+        bump_log_versions({log_id for _, log_id in rows})
+    return len(ids)
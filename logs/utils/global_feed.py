@@ -0,0 +1,101 @@
+"""
+Global feed cache - the newest logs are the same for every viewer, so they are
+cached once as compact tuples and decorated per request.
+
+Cached head: the newest HEAD_SIZE logs as (log_id, timestamp, version,
+reaction_counts, comment_count). Pages whose cursor falls inside the head are
+sliced from it; older pages fall back to the database query. The head is dropped
+whenever a log is created or deleted. Reactions and comments bump Log.version, so
+counts are only reused while the log is still at the cached version.
+
+Per viewer: one in_bulk query for the page's logs and one query for the viewer's
+own reactions.
+"""
+from django.db.models import Count
+
+from logs.models import Comment, Log, Reaction
+from myapp.utils.cache import CacheNamespace
+
+global_feed_cache = CacheNamespace('global_feed', ttl=30)
+
+# Covers the first ten infinite-scroll pages of 7 (plus the has_next probe)
+HEAD_SIZE = 71
+
+
+def get_global_feed_logs(viewer, cursor_timestamp=None, cursor_id=None, limit=8):
+    """
+    Up to `limit` global feed logs after the cursor, decorated for `viewer`.
+
+    Args:
+        viewer: userinfo of the requesting user
+        cursor_timestamp, cursor_id: Compound cursor of the last log shown (None for the first page)
+
+    Returns:
+        List of Log objects, or None when the page lies beyond the cached head
+    """
+    head = global_feed_cache.get_or_compute('head', _load_head)
+
+    start = 0
+    if cursor_timestamp is not None and cursor_id is not None:
+        # Head is newest first: skip entries at or above the cursor
+        while start < len(head) and (head[start][1], head[start][0]) >= (cursor_timestamp, cursor_id):
+            start += 1
+
+    # A full head may be cut short: pages reaching past its end come from the database
+    if len(head) >= HEAD_SIZE and start + limit > len(head):
+        return None
+    return decorate_logs(viewer, head[start:start + limit])
+
+
+def _load_head():
+    entries = list(Log.objects.order_by('-timestamp', '-id').values_list('id', 'timestamp', 'version')[:HEAD_SIZE])
+    ids = [entry[0] for entry in entries]
+
+    reaction_counts = {}
+    for log_id, emoji, count in (
+        Reaction.objects.filter(mindlog_id__in=ids)
+        .values_list('mindlog_id', 'emoji').annotate(count=Count('id')).order_by()
+    ):
+        reaction_counts.setdefault(log_id, {})[emoji] = count
+    comment_counts = dict(
+        Comment.objects.filter(mindlog_id__in=ids)
+        .values_list('mindlog_id').annotate(count=Count('id')).order_by()
+    )
+
+    return [
+        (log_id, timestamp, version, reaction_counts.get(log_id, {}), comment_counts.get(log_id, 0))
+        for log_id, timestamp, version in entries
+    ]
+
+
+def decorate_logs(viewer, entries):
+    """
+    Load the logs for cached head entries and attach the viewer's state.
+
+    Sets the viewer's reaction (read by Log.get_user_reaction), plus
+    reaction_count, comment_count and the per-emoji counts (read by
+    Log.get_reaction_counts) for logs unchanged since caching.
+    """
+    ids = [entry[0] for entry in entries]
+    logs = Log.objects.select_related('user__user').in_bulk(ids)
+    own_reactions = {
+        reaction.mindlog_id: reaction
+        for reaction in Reaction.objects.filter(user=viewer, mindlog_id__in=ids)
+    }
+    decorated = []
+    for log_id, _, version, reaction_counts, comment_count in entries:
+        log = logs.get(log_id)
+        if log is None:  # Deleted since caching
+            continue
+        if log.version == version:
+            # Otherwise reacted to or commented on since caching: counts are reloaded on render
+            log.reaction_count = sum(reaction_counts.values())
+            log.comment_count = comment_count
+            log._reaction_counts = dict(reaction_counts)
+        log._viewer_reaction = (viewer.id, own_reactions.get(log_id))
+        decorated.append(log)
+    return decorated
+
+
+def invalidate_global_feed():
+    global_feed_cache.delete('head')
@@ -0,0 +1,146 @@
+"""
+Log card fragments - a card's markup is the same for every viewer, so it is
+rendered once per log version and cached.
+
+    {% load log_card_tags %}
+    {% render_log_cards feed_items 'feed' %}    {# sets log.card_html for the page #}
+
+Cache key: variant, log id and Log.version (plus the author's username and
+profile timestamp on feed cards). Log.version is bumped on edits, reactions,
+comments and snapshot renditions, so a stale card is never served; old versions
+simply expire. A page's fragments are read with one get_many and the misses are
+written back with one set_many.
+
+Viewer-specific bits are left as <!--viewer:...--> markers in the cached markup
+and filled in per request: the relative timestamp, the owner's delete button and
+the viewer's own reaction highlight. The follow button and the comment section
+stay outside the fragment in the card list templates.
+"""
+from django.db.models import Count, F
+from django.template.loader import render_to_string
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+from django.utils.timesince import timesince
+
+from logs.models import Comment, Log, Reaction
+from myapp.utils.cache import CacheNamespace
+
+log_card_cache = CacheNamespace('log_cards', ttl=24 * 3600)
+
+CARD_TEMPLATES = {
+    'feed': 'logs/partials/log_card_feed.html',
+    'personal': 'logs/partials/log_card_personal.html',
+}
+
+TIMESINCE_MARKER = '<!--viewer:timesince-->'
+DELETE_MARKER = '<!--viewer:delete-->'
+REACTION_MARKER = '<!--viewer:reaction:{emoji}-->'
+
+OWN_REACTION_CLASSES = 'bg-blue-500/10 text-blue-400 border border-blue-500/30'
+REACTION_CLASSES = 'bg-[#0d1117] text-gray-500 border border-[#21262d] hover:border-gray-600 hover:text-gray-300'
+DELETE_BUTTON = (
+    '<button class="delete-log-btn text-gray-500 hover:text-red-400 transition-colors p-1" data-log-id="{}">'
+    '<i class="fa fa-trash text-xs"></i></button>'
+)
+
+EMOJIS = [emoji for emoji, _ in Reaction.REACTION_CHOICES]
+
+
+def bump_log_version(log_id):
+    """Invalidate a log's cached card (its next render uses a new key)"""
+    Log.objects.filter(pk=log_id).update(version=F('version') + 1)
+
+
+def bump_log_versions(log_ids):
+    """bump_log_version for many logs in one UPDATE"""
+    if log_ids:
+        Log.objects.filter(pk__in=list(log_ids)).update(version=F('version') + 1)
+
+
+def _cache_key(log, variant):
+    key = f'{variant}:{log.id}:{log.version}'
+    if variant == 'feed':
+        author = log.user
+        key += f':{author.user.username}:{author.updated_at.timestamp()}'
+    return key
+
+
+def render_log_cards(logs, variant, viewer=None):
+    """
+    Attach `card_html` (cached body plus the viewer's bits) to each log.
+
+    Args:
+        logs: Log objects of one page
+        variant: 'feed' (with author header) or 'personal' (profile list)
+        viewer: userinfo of the requesting user, or None when logged out
+    """
+    logs = list(logs)
+    if not logs:
+        return
+    keys = {log.id: _cache_key(log, variant) for log in logs}
+    cached = log_card_cache.get_many(keys.values())
+
+    missing = [log for log in logs if keys[log.id] not in cached]
+    if missing:
+        _prefetch_counts(missing)
+        rendered = {keys[log.id]: render_to_string(CARD_TEMPLATES[variant], {'log': log}) for log in missing}
+        log_card_cache.set_many(rendered)
+        cached.update(rendered)
+
+    own_reactions = _own_reactions(logs, viewer)
+    for log in logs:
+        log.card_html = mark_safe(_fill_viewer_bits(cached[keys[log.id]], log, viewer, own_reactions.get(log.id)))
+
+
+def _fill_viewer_bits(html, log, viewer, own_emoji):
+    html = html.replace(TIMESINCE_MARKER, f'{timesince(log.timestamp)} ago')
+    is_owner = viewer is not None and log.user_id == viewer.id
+    html = html.replace(DELETE_MARKER, format_html(DELETE_BUTTON, log.sig) if is_owner else '')
+    for emoji in EMOJIS:
+        classes = OWN_REACTION_CLASSES if emoji == own_emoji else REACTION_CLASSES
+        html = html.replace(REACTION_MARKER.format(emoji=emoji), classes)
+    return html
+
+
+def _own_reactions(logs, viewer):
+    """log id -> the viewer's emoji, with one query for logs not already decorated"""
+    if viewer is None:
+        return {}
+    own = {}
+    unknown = []
+    for log in logs:
+        attached = getattr(log, '_viewer_reaction', None)
+        if attached is not None and attached[0] == viewer.id:
+            if attached[1] is not None:
+                own[log.id] = attached[1].emoji
+        else:
+            unknown.append(log.id)
+    if unknown:
+        own.update(Reaction.objects.filter(user=viewer, mindlog_id__in=unknown).values_list('mindlog_id', 'emoji'))
+    return own
+
+
+def _prefetch_counts(logs):
+    """Grouped reaction and comment counts for the logs about to be rendered"""
+    need_reactions = {log.id for log in logs if not hasattr(log, '_reaction_counts')}
+    need_comments = {log.id for log in logs if getattr(log, 'comment_count', None) is None}
+
+    reaction_counts = {}
+    if need_reactions:
+        for log_id, emoji, count in (
+            Reaction.objects.filter(mindlog_id__in=need_reactions)
+            .values_list('mindlog_id', 'emoji').annotate(count=Count('id')).order_by()
+        ):
+            reaction_counts.setdefault(log_id, {})[emoji] = count
+    comment_counts = {}
+    if need_comments:
+        comment_counts = dict(
+            Comment.objects.filter(mindlog_id__in=need_comments)
+            .values_list('mindlog_id').annotate(count=Count('id')).order_by()
+        )
+
+    for log in logs:
+        if log.id in need_reactions:
+            log._reaction_counts = reaction_counts.get(log.id, {})
+        if log.id in need_comments:
+            log.comment_count = comment_counts.get(log.id, 0)
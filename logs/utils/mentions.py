@@ -0,0 +1,138 @@
+"""
+Mention rendering - log and comment content is turned into safe HTML once, when
+it is saved, and stored in content_html.
+
+    from logs.utils.mentions import render_mentions, render_content_html
+    render_mentions('hi @alice', existing={'alice'})   # escaped text with a profile link
+    render_content_html(comments)                      # sets content_html, one username query
+
+Only @mentions of existing users become links. Stored HTML goes stale when a
+mentioned username appears or disappears, so username changes, signups and
+account deletions queue rebuild_mention_html (see logs/signals.py), and
+`manage.py build_content_html` backfills rows saved before the column existed.
+Rows with a mention that links nowhere are flagged (has_unresolved_mentions,
+partially indexed), so a signup only re-reads those rows.
+"""
+import re
+
+from django.contrib.auth.models import User
+from django.db.models import F, Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+# Same character set the signup form allows in usernames
+MENTION_PATTERN = re.compile(r'@([a-zA-Z0-9_.]+)')
+# Fields set by render_content_html; save them together
+RENDERED_FIELDS = ('content_html', 'has_unresolved_mentions')
+MENTION_LINK = '<a href="/user-profile/{username}/" class="text-green-500 hover:text-green-600 transition-colors font-semibold">@{username}</a>'
+
+
+def _candidates(name):
+    # "@bob." at the end of a sentence mentions bob
+    stripped = name.rstrip('.')
+    return (name, stripped) if stripped and stripped != name else (name,)
+
+
+def find_mentions(text):
+    """Usernames that may be mentioned in `text` (before checking they exist)"""
+    names = set()
+    for name in MENTION_PATTERN.findall(text or ''):
+        names.update(_candidates(name))
+    return names
+
+
+def resolve_usernames(names):
+    """The subset of `names` that belong to existing users (one query)"""
+    if not names:
+        return set()
+    return set(User.objects.filter(username__in=names).values_list('username', flat=True))
+
+
+def render_mentions(text, existing=None):
+    """
+    Escape `text` and link its @mentions.
+
+    Args:
+        existing: Usernames to link; None links every mention
+
+    Returns:
+        Safe HTML string
+    """
+    if not text:
+        return mark_safe('')
+
+    def replace_mention(match):
+        for name in _candidates(match.group(1)):
+            if existing is None or name in existing:
+                return MENTION_LINK.format(username=name) + match.group(1)[len(name):]
+        return match.group(0)
+
+    # Mentions only contain [a-zA-Z0-9_.], which escaping leaves unchanged
+    return mark_safe(MENTION_PATTERN.sub(replace_mention, escape(text)))
+
+
+def render_content_html(objects):
+    """
+    Set content_html on logs or comments from their content, resolving every
+    mentioned username across the batch in one query.
+    """
+    objects = list(objects)
+    names = set()
+    for obj in objects:
+        names |= find_mentions(obj.content)
+    existing = resolve_usernames(names)
+    for obj in objects:
+        obj.content_html = render_mentions(obj.content, existing)
+        obj.has_unresolved_mentions = any(
+            not existing.intersection(_candidates(name)) for name in MENTION_PATTERN.findall(obj.content or '')
+        )
+    return objects
+
+
+def rebuild_mention_html(usernames, unresolved_only=False, batch_size=500):
+    """
+    Re-render logs and comments whose content mentions any of `usernames`.
+
+    Called when one of them is renamed, created or deleted, so links to it
+    appear or disappear.
+
+    Args:
+        unresolved_only: Only look at rows with a mention that links nowhere
+            (enough for new usernames, and served by a partial index)
+
+    Returns:
+        Number of rows rewritten
+    """
+    from logs.models import Comment, Log
+
+    usernames = [name for name in usernames if name]
+    if not usernames:
+        return 0
+    # Substring match; render_content_html re-checks the actual mentions
+    mentions = Q()
+    for name in usernames:
+        mentions |= Q(content__contains=f'@{name}')
+
+    rewritten = 0
+    for model in (Log, Comment):
+        rows = model.objects.filter(mentions).only('id', 'content', *RENDERED_FIELDS).order_by('id')
+        if unresolved_only:
+            rows = rows.filter(has_unresolved_mentions=True)
+        last_id = 0
+        while True:
+            batch = list(rows.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            previous = {obj.id: obj.content_html for obj in batch}
+            render_content_html(batch)
+            changed = [obj for obj in batch if obj.content_html != previous[obj.id]]
+            if not changed:
+                continue
+            model.objects.bulk_update(changed, RENDERED_FIELDS)
+            if model is Log:
+                # Cached log cards embed content_html
+                Log.objects.filter(pk__in=[obj.id for obj in changed]).update(version=F('version') + 1)
+            rewritten += len(changed)
+    return rewritten
@@ -1,10 +1,30 @@
 """
 Trending logs utility - Calculate engagement scores for hot/trending content
 """
+from collections import defaultdict
 from django.db.models import Count, Q, F
 from django.utils import timezone
 from datetime import timedelta
-from logs.models import Log
+from logs.models import Comment, Log, Reaction
+from myapp.utils.cache import CacheNamespace
+
+# Same list for every viewer, as compact (log_id, engagement_score, engaged_users)
+# tuples; hydrated per request. Refreshed every few minutes
+trending_cache = CacheNamespace('trending_logs', ttl=300)
+
+# Fields used by includes/trending_logs.html
+TRENDING_CARD_FIELDS = (
+    'id',
+    'sig',
+    'content',
+    'timestamp',
+    'user__id',
+    'user__profile_image',
+    'user__profile_image_variants',
+    'user__updated_at',
+    'user__user__id',
+    'user__user__username',
+)
 
 
 def get_trending_logs(limit=5, hours=24):
@@ -20,19 +40,22 @@ def get_trending_logs(limit=5, hours=24):
         hours: Time window in hours (default 24)
     
     Returns:
-        QuerySet of Log objects with engagement_score and total_engaged_users annotations
+        List of Log objects with engagement_score and total_engaged_users attributes
+    """
+    ranked = trending_cache.get_or_compute(f'{limit}:{hours}', lambda: _compute_trending_logs(limit, hours))
+    return _hydrate_logs(ranked)
+
+
+def _compute_trending_logs(limit, hours):
+    """
+    Returns:
+        List of (log_id, engagement_score, total_engaged_users) tuples, hottest first
     """
     cutoff_time = timezone.now() - timedelta(hours=hours)
     
     # Annotate logs with engagement metrics
-    trending_logs = Log.objects.filter(
+    ranked = list(Log.objects.filter(
         timestamp__gte=cutoff_time
-    ).select_related(
-        'user__user',
-        'user__coding_style'
-    ).prefetch_related(
-        'reactions__user',
-        'comments__user'
     ).annotate(
         # Count individual engagement types
         reaction_count=Count('reactions__user', distinct=True),
@@ -43,24 +66,34 @@ def get_trending_logs(limit=5, hours=24):
         engagement_score=F('reaction_count') * 2 + F('comment_count') * 3 + F('reply_count') * 3
     ).filter(
         engagement_score__gt=0  # Only show logs with engagement
-    ).order_by('-engagement_score')[:limit]
+    ).order_by('-engagement_score').values_list('id', 'engagement_score')[:limit])
     
     # Calculate actual unique engaged users (to avoid double counting)
     # A user who reacts AND comments should be counted once, not twice
-    trending_logs = list(trending_logs)  # Evaluate QuerySet to allow modification
-    
-    for log in trending_logs:
-        engaged_users = set()
-        
-        # Add all users who reacted (uses prefetched data, no extra query)
-        engaged_users.update(log.reactions.values_list('user_id', flat=True))
-        
-        # Add all users who commented or replied (uses prefetched data, no extra query)
-        engaged_users.update(log.comments.values_list('user_id', flat=True))
-        
-        # Set the actual unique count
-        log.total_engaged_users = len(engaged_users)
+    log_ids = [log_id for log_id, _ in ranked]
+    engaged_users = defaultdict(set)
+    for model in (Reaction, Comment):
+        for log_id, user_id in model.objects.filter(mindlog_id__in=log_ids).values_list('mindlog_id', 'user_id'):
+            engaged_users[log_id].add(user_id)
     
+    return [(log_id, score, len(engaged_users[log_id])) for log_id, score in ranked]
+
+
+def _hydrate_logs(ranked):
+    """Load the cached ranking's logs for display (one query), keeping rank order"""
+    if not ranked:
+        return []
+    logs = Log.objects.select_related('user__user').only(*TRENDING_CARD_FIELDS).in_bulk(
+        [log_id for log_id, _, _ in ranked]
+    )
+    trending_logs = []
+    for log_id, score, engaged in ranked:
+        log = logs.get(log_id)
+        if log is None:  # Deleted since the ranking was cached
+            continue
+        log.engagement_score = score
+        log.total_engaged_users = engaged
+        trending_logs.append(log)
     return trending_logs
 
 
@@ -17,6 +17,7 @@ from datetime import date, timedelta
 from django.db.models import Avg, Q
 from django.contrib import messages
 from myapp.models import userinfo
+from myapp.utils.replicas import read_from_replica
 
 def chunk_list(data, size):
     it = iter(data)
@@ -44,6 +45,7 @@ def build_contribution_months(contribution_days):
     return contribution_months
 
 
+@read_from_replica
 def load_more_profile_logs(request, username):
     """
     Cursor-based pagination for loading more logs on user profile.
@@ -233,6 +235,7 @@ def add_comment(request, sig):
             'user': comment.user.user.username,
             'user_image': comment.user.profile_image.url if comment.user.profile_image else None,
             'content': comment.content,
+            'content_html': comment.content_html,
             'timestamp': comment.timestamp.strftime('%b %d, %Y, %I:%M %p'),
             'parent_id': comment.parent_comment.id if comment.parent_comment else None,
             'can_delete': True  # User just created it, so they can delete it
@@ -243,27 +246,97 @@ def add_comment(request, sig):
 @login_required
 @require_POST
 def delete_comment(request, comment_id):
-    comment = get_object_or_404(Comment, id=comment_id)
+    from .utils.comment_threads import delete_comment_subtree
+
+    comment = get_object_or_404(Comment.objects.select_related('mindlog'), id=comment_id)
     
     # Allow deletion by comment owner or log owner
-    if comment.user != request.user.info and comment.mindlog.user != request.user.info:
+    viewer_id = request.user.info.id
+    if comment.user_id != viewer_id and comment.mindlog.user_id != viewer_id:
         return JsonResponse({'error': 'Unauthorized'}, status=403)
     
-    # Count total comments to be deleted (parent + all nested replies)
-    def count_nested_comments(comment):
-        count = 1  # Count the comment itself
-        for reply in comment.replies.all():
-            count += count_nested_comments(reply)
-        return count
-    
-    total_deleted = count_nested_comments(comment)
-    
-    comment.delete()
+    # Removes the comment and all nested replies (count includes them)
+    total_deleted = delete_comment_subtree(comment)
     return JsonResponse({'success': True, 'deleted_count': total_deleted})
 
 
+def _viewer(request):
+    return getattr(request.user, 'info', None) if request.user.is_authenticated else None
+
+
+def _render_comments(request, log, page, first_page=False):
+    html = render_to_string('logs/partials/comment_list.html', {
+        'comments': page['comments'],
+        'log': log,
+        'log_sig': log.sig,
+        'first_page': first_page,
+    }, request=request)
+    return JsonResponse({
+        'html': html,
+        'has_next': page['has_next'],
+        'cursor': page['next_cursor'],
+    })
+
+
+@require_GET
+@read_from_replica
+def comment_thread(request, sig):
+    """
+    Keyset-paginated top-level comments of a log (loaded when the thread is opened).
+    Query params: cursor (from the previous response).
+    """
+    from .utils.comment_threads import get_comment_page
+
+    log = get_object_or_404(Log.objects.only('id', 'sig', 'user_id'), sig=sig)
+    cursor = request.GET.get('cursor')
+    page = get_comment_page(log, _viewer(request), cursor=cursor)
+    return _render_comments(request, log, page, first_page=not cursor)
+
+
+@require_GET
+@read_from_replica
+def comment_replies(request, comment_id):
+    """Keyset-paginated replies to one comment, loaded on demand"""
+    from .utils.comment_threads import get_reply_page
+
+    comment = get_object_or_404(Comment.objects.select_related('mindlog'), id=comment_id)
+    page = get_reply_page(comment, _viewer(request), cursor=request.GET.get('cursor'))
+    return _render_comments(request, comment.mindlog, page)
+
+
+@login_required
+@require_POST
+def toggle_comment_like(request, comment_id):
+    """Like or unlike a comment"""
+    comment = get_object_or_404(Comment.objects.only('id'), id=comment_id)
+    likes = Comment.likes.through.objects.filter(comment_id=comment.id)
+    viewer = request.user.info
+
+    removed, _ = likes.filter(userinfo_id=viewer.id).delete()
+    if not removed:
+        comment.likes.add(viewer)
+    return JsonResponse({'liked': not removed, 'like_count': likes.count()})
+
+
+@require_GET
+def code_snippet(request, sig):
+    """
+    Full code snippet of a log, for cards that only show the preview.
+    Returns the source (for copying) and its highlighted HTML.
+    """
+    from .utils.code_snippets import get_snippet_html
+
+    log = get_object_or_404(Log.objects.only('id', 'sig', 'code_snippet', 'code_language'), sig=sig)
+    return JsonResponse({
+        'code': log.code_snippet or '',
+        'html': get_snippet_html(log),
+        'language': log.code_language,
+    })
+
+
 @login_required
 @require_GET
+@read_from_replica
 def search_users_for_mention(request):
     """
     API endpoint for @mention autocomplete.
@@ -11,6 +11,9 @@ import math
 
 
 def get_explore_users(filter_dev, request, count=200, order_by='-created_at'):
+    if order_by == '?':
+        return _get_random_explore_users(filter_dev, request, count)
+    
     # Step 1: Get followed user IDs and current user ID
     followed_ids = follow.objects.filter(
         follower=request.user.info
@@ -23,6 +26,24 @@ def get_explore_users(filter_dev, request, count=200, order_by='-created_at'):
     return users
 
 
+def _get_random_explore_users(filter_dev, request, count):
+    """
+    Random suggestions from the cached sample pool instead of ORDER BY random()
+    over the whole table. Ids filtered out by `filter_dev` just shrink the result.
+    """
+    from .utils.follow_graph import get_follow_graph
+    from .utils.sampling import sample_developer_ids
+    
+    me = request.user.info.id
+    exclude_ids = set(get_follow_graph().neighbors(me).tolist())
+    exclude_ids.add(me)
+    
+    sampled_ids = sample_developer_ids(count, exclude=exclude_ids)
+    users = filter_dev.only('id', 'profile_image', 'user__username').in_bulk(sampled_ids)
+    # The query returns rows in database order; keep the sample's random order
+    return [users[dev_id] for dev_id in sampled_ids if dev_id in users]
+
+
 # =============================================================================
 # LOCAL FEED - MVP CONFIGURATION
 # =============================================================================
@@ -138,6 +159,7 @@ def get_local_feed_logs(user):
     - Preserves existing local recommendation label
     """
     from logs.models import Log
+    from .utils.skill_index import get_skill_index
     
     user_lat = user.latitude
     user_lon = user.longitude
@@ -146,16 +168,12 @@ def get_local_feed_logs(user):
     if not user_lat or not user_lon:
         return []
     
-    # Get user's skills for recommendation label
-    user_skills = set(user.skills.values_list('id', flat=True)) if hasattr(user, 'skills') else set()
-    
     # Fetch logs from users with coordinates
     nearby_users_logs = list(
         Log.objects
         .exclude(user=user)
         .filter(user__latitude__isnull=False, user__longitude__isnull=False)
         .select_related('user__user')
-        .prefetch_related('user__skills')
         .annotate(
             reaction_count=Count('reactions', distinct=True),
             comment_count=Count('comments', distinct=True),
@@ -179,18 +197,18 @@ def get_local_feed_logs(user):
         if distance > LOCAL_RADIUS_KM:
             continue
         
-        # Calculate shared skills for recommendation label
-        author_skills = set(log.user.skills.values_list('id', flat=True)) if hasattr(log.user, 'skills') else set()
-        shared_count = len(user_skills.intersection(author_skills))
-        
         # Add metadata
         log.distance_km = distance
         log.feed_type = 'local'
         log.is_secondary_network = False
-        log.recommendation_reason = _get_local_recommendation_reason(log, distance, shared_count)
         
         local_logs.append(log)
     
+    # Shared skills for the recommendation labels, one skill index lookup for all authors
+    shared_counts = get_skill_index().shared_counts(user.id, [log.user_id for log in local_logs])
+    for log, shared_count in zip(local_logs, shared_counts.tolist()):
+        log.recommendation_reason = _get_local_recommendation_reason(log, log.distance_km, shared_count)
+    
     # Already sorted by timestamp (most recent first) from the query
     return local_logs
 
@@ -218,15 +236,9 @@ def get_secondary_network_user_ids(user, primary_network_ids):
     if not primary_network_ids:
         return set()
     
-    # Users followed by people I follow
-    secondary_ids = set(
-        follow.objects.filter(follower_id__in=primary_network_ids)
-        .exclude(following=user)  # Exclude self
-        .exclude(following_id=user.id)  # Also exclude by ID
-        .exclude(following_id__in=primary_network_ids)  # Exclude direct follows
-        .values_list('following_id', flat=True)
-    )
-    return secondary_ids
+    # Users followed by people I follow, from the in-memory follow graph
+    from .utils.follow_graph import get_follow_graph
+    return set(get_follow_graph().two_hop(user.id, direct=primary_network_ids).tolist())
 
 
 def _get_secondary_recommendation_reason(log, current_user, primary_network_ids):
@@ -384,27 +396,33 @@ def get_personalized_feed(request, type='network', page=1, per_page=7, cursor=No
         # GLOBAL FEED: Pure recency-based sorting with cursor pagination
         # Simple timestamp-based sorting - most recent logs first
         
-        query = Log.objects.all()
-        
-        if cursor_timestamp is not None and cursor_id is not None:
-            # Fetch logs older than cursor using compound cursor (timestamp, id)
-            # This guarantees no duplicates even when timestamps are identical
-            query = query.filter(
-                Q(timestamp__lt=cursor_timestamp) |
-                Q(timestamp=cursor_timestamp, id__lt=cursor_id)
-            )
+        # The first pages come from the shared cached head, decorated for this viewer
+        from logs.utils.global_feed import get_global_feed_logs
+        logs_list = get_global_feed_logs(user, cursor_timestamp, cursor_id, limit=per_page + 1)
         
-        # Fetch per_page + 1 to check if there are more items
-        logs_list = list(
-            query
-            .select_related('user__user')  # Prevent N+1 queries
-            .annotate(
-                reaction_count=Count('reactions', distinct=True),
-                comment_count=Count('comments', distinct=True),
+        if logs_list is None:
+            # Beyond the cached head: query the database
+            query = Log.objects.all()
+            
+            if cursor_timestamp is not None and cursor_id is not None:
+                # Fetch logs older than cursor using compound cursor (timestamp, id)
+                # This guarantees no duplicates even when timestamps are identical
+                query = query.filter(
+                    Q(timestamp__lt=cursor_timestamp) |
+                    Q(timestamp=cursor_timestamp, id__lt=cursor_id)
+                )
+            
+            # Fetch per_page + 1 to check if there are more items
+            logs_list = list(
+                query
+                .select_related('user__user')  # Prevent N+1 queries
+                .annotate(
+                    reaction_count=Count('reactions', distinct=True),
+                    comment_count=Count('comments', distinct=True),
+                )
+                .order_by('-timestamp', '-id')  # Deterministic ordering: newest first, then highest ID
+                [:per_page + 1]
             )
-            .order_by('-timestamp', '-id')  # Deterministic ordering: newest first, then highest ID
-            [:per_page + 1]
-        )
         
         # Add minimal metadata
         for log in logs_list:
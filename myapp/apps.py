@@ -6,4 +6,7 @@ class MyappConfig(AppConfig):
     name = 'myapp'
 
     def ready(self):
-        import myapp.signals 
\ No newline at end of file
+        import myapp.signals
+        from myapp.utils import events, tasks
+        tasks.autodiscover()
+        events.autodiscover()
\ No newline at end of file
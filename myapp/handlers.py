@@ -0,0 +1,22 @@
+"""
+Domain event handlers for myapp (run by the event dispatcher, see myapp.utils.events)
+"""
+from .utils.events import on_event
+from .utils.popular_developers import record_follower_change
+from .utils.recommendations import invalidate_recommendation_cache
+
+
+@on_event('follow.created')
+def count_follower(following_id, **payload):
+    record_follower_change(following_id, 1)
+
+
+@on_event('follow.deleted')
+def uncount_follower(following_id, **payload):
+    record_follower_change(following_id, -1)
+
+
+@on_event('follow.created', 'follow.deleted')
+def invalidate_follower_recommendations(follower_id, **payload):
+    """Recommendations exclude developers the user already follows"""
+    invalidate_recommendation_cache(follower_id)
@@ -0,0 +1,63 @@
+"""
+Benchmark the in-memory follow graph on a synthetic network.
+
+Usage:
+    python manage.py bench_follow_graph --edges 1000000 --nodes 100000
+"""
+import statistics
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from myapp.utils.follow_graph import FollowGraph
+
+
+class Command(BaseCommand):
+    help = "Measure follow graph memory and query latency on synthetic data (no database access)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--edges', type=int, default=1_000_000)
+        parser.add_argument('--nodes', type=int, default=100_000)
+        parser.add_argument('--runs', type=int, default=200, help="Samples per operation")
+        parser.add_argument('--overlay', type=int, default=5000, help="Follow/unfollow changes applied on top")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        nodes, edges, runs = options['nodes'], options['edges'], options['runs']
+
+        # Skewed follow targets: a few popular accounts, a long tail
+        followers = rng.integers(1, nodes, size=edges)
+        followings = np.minimum((rng.pareto(1.2, size=edges) * nodes / 50).astype(np.int64) + 1, nodes - 1)
+        pairs = np.unique(np.stack([followers, followings], axis=1), axis=0)
+        pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+
+        started = time.perf_counter()
+        graph = FollowGraph.from_edges(pairs[:, 0], pairs[:, 1], num_nodes=nodes + 1)
+        build_seconds = time.perf_counter() - started
+
+        for follower, following in rng.integers(1, nodes, size=(options['overlay'], 2)).tolist():
+            graph.apply(follower, following, 'add' if rng.random() < 0.7 else 'remove')
+
+        self.stdout.write(
+            f"{len(pairs)} edges, {nodes} nodes: built in {build_seconds:.2f}s, "
+            f"{graph.nbytes / 1024 / 1024:.1f} MiB CSR, {graph.overlay_changes} overlay changes"
+        )
+
+        users = rng.integers(1, nodes, size=runs).tolist()
+        self._time("neighbors", lambda u: graph.neighbors(u), users)
+        self._time("mutual_counts x250", lambda u: graph.mutual_counts(u, rng.integers(1, nodes, size=250)), users)
+        self._time("mutuals (pair)", lambda u: graph.mutuals(u, u // 2 + 1), users)
+        self._time("two_hop", lambda u: graph.two_hop(u), users)
+        self._time("is_following_many x100", lambda u: graph.is_following_many(u, rng.integers(1, nodes, size=100)), users)
+
+    def _time(self, label, func, users):
+        samples = []
+        for user in users:
+            started = time.perf_counter()
+            func(user)
+            samples.append((time.perf_counter() - started) * 1000)
+        samples.sort()
+        p95 = samples[int(len(samples) * 0.95) - 1]
+        self.stdout.write(f"{label:>24}: p50 {statistics.median(samples):.3f}ms, p95 {p95:.3f}ms")
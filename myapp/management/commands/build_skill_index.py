@@ -0,0 +1,34 @@
+"""
+Precompute "developers like you" lists from the skill index.
+
+Usage:
+    python manage.py build_skill_index                  # every user with skills
+    python manage.py build_skill_index --users 12 34    # specific userinfo ids
+    python manage.py build_skill_index --batch-size 512
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from myapp.utils.skill_index import BATCH_SIZE, get_skill_index, precompute_similar_developers
+
+
+class Command(BaseCommand):
+    help = "Compute and cache top-k skill-similar developers per user in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Users per sparse product")
+        parser.add_argument('--users', type=int, nargs='*', help="Only these userinfo ids")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        index = get_skill_index()
+        self.stdout.write(
+            f"Index: {index.num_users} users x {index.num_skills} skills, "
+            f"{index.matrix.nnz} entries ({time.perf_counter() - started:.1f}s)"
+        )
+
+        written = precompute_similar_developers(options['users'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Cached similar developers for {written} users in {time.perf_counter() - started:.1f}s"
+        ))
@@ -0,0 +1,38 @@
+"""
+Precompute developer recommendations (personalized PageRank + similarity).
+
+The periodic compute_recommendations task (run_tasks) refreshes them daily;
+this runs a refresh on demand, optionally in parallel.
+
+Usage:
+    python manage.py compute_recommendations                  # all active users
+    python manage.py compute_recommendations --workers 8 --shard-size 500
+    python manage.py compute_recommendations --users 12 34    # specific userinfo ids
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from myapp.utils.graph_recommendations import SHARD_SIZE, TOP_N, compute_recommendations
+
+
+class Command(BaseCommand):
+    help = "Compute top-N developer recommendations per user in a process pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Worker processes (1 = run inline)")
+        parser.add_argument('--shard-size', type=int, default=SHARD_SIZE, help="Users per shard")
+        parser.add_argument('--top-n', type=int, default=TOP_N, help="Candidates stored per user")
+        parser.add_argument('--users', type=int, nargs='*', help="Only these userinfo ids")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        users, written = compute_recommendations(
+            user_ids=options['users'] or None,
+            workers=options['workers'],
+            shard_size=options['shard_size'],
+            top_n=options['top_n'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {written} candidates for {users} users in {time.perf_counter() - started:.1f}s"
+        ))
@@ -0,0 +1,69 @@
+"""
+Backfill WebP/JPEG renditions for existing profile images and log snapshots.
+
+Usage:
+    python manage.py generate_image_renditions
+    python manage.py generate_image_renditions --only logs --batch-size 200 --force
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from logs.models import Log
+from myapp.models import userinfo
+from myapp.utils.images import generate_renditions, iter_rendition_names
+from myapp.utils.storage_deletion import queue_storage_deletion
+
+
+class Command(BaseCommand):
+    help = "Generate missing image renditions for profile images and log snapshots"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', choices=['profiles', 'logs'], help="Limit the backfill to one kind of media")
+        parser.add_argument('--batch-size', type=int, default=100, help="Rows fetched per database round-trip")
+        parser.add_argument('--force', action='store_true', help="Regenerate renditions that already exist")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        force = options['force']
+
+        if options['only'] in (None, 'profiles'):
+            default_image = userinfo._meta.get_field('profile_image').default
+            profiles = userinfo.objects.exclude(profile_image='').exclude(profile_image=default_image)
+            if not force:
+                profiles = profiles.filter(profile_image_variants={})
+            done = self._backfill(
+                profiles.only('id', 'profile_image', 'profile_image_variants'),
+                'profile_image', 'profile_image_variants', 'avatar', batch_size, force
+            )
+            self.stdout.write(self.style.SUCCESS(f"Profile images processed: {done}"))
+
+        if options['only'] in (None, 'logs'):
+            logs = Log.objects.exclude(snap_shot='').exclude(snap_shot__isnull=True)
+            if not force:
+                logs = logs.filter(snap_shot_variants={})
+            done = self._backfill(
+                logs.only('id', 'snap_shot', 'snap_shot_variants'),
+                'snap_shot', 'snap_shot_variants', 'card', batch_size, force
+            )
+            self.stdout.write(self.style.SUCCESS(f"Log snapshots processed: {done}"))
+
+    def _backfill(self, queryset, file_field, variants_field, kind, batch_size, force):
+        model = queryset.model
+        done = 0
+        for obj in queryset.order_by('id').iterator(chunk_size=batch_size):
+            variants = generate_renditions(getattr(obj, file_field), kind)
+            if not variants:
+                self.stderr.write(f"Skipped {model.__name__} {obj.pk}: could not render {getattr(obj, file_field).name}")
+                continue
+            # update() keeps the save signals (and their storage round-trips) out of the backfill
+            updates = {variants_field: variants}
+            if model is Log:
+                updates['version'] = F('version') + 1  # cached log cards embed the renditions
+            model.objects.filter(pk=obj.pk).update(**updates)
+            if force:
+                # New renditions are saved under fresh names while the old files still exist
+                queue_storage_deletion(iter_rendition_names(getattr(obj, variants_field)))
+            done += 1
+            if done % batch_size == 0:
+                self.stdout.write(f"  {model.__name__}: {done} done")
+        return done
@@ -0,0 +1,51 @@
+"""
+Consume domain events from the outbox.
+
+Usage:
+    python manage.py process_events            # poll forever
+    python manage.py process_events --once     # drain and exit
+    python manage.py process_events --stats    # print outbox metrics (lag included)
+
+Run several processes (alongside or instead of `run_tasks`) to scale out;
+SKIP LOCKED claims keep them from handling the same events.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from myapp.utils.events import CLAIM_BATCH_SIZE, dispatch_pending, get_event_metrics
+
+
+class Command(BaseCommand):
+    help = "Run handlers for queued domain events"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Process due events and exit")
+        parser.add_argument('--batch-size', type=int, default=CLAIM_BATCH_SIZE, help="Events claimed per poll")
+        parser.add_argument('--sleep', type=float, default=1.0, help="Seconds to wait when the outbox is empty")
+        parser.add_argument('--stats', action='store_true', help="Print outbox metrics and exit")
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self._print_stats()
+            return
+
+        try:
+            while True:
+                close_old_connections()
+                processed = dispatch_pending(limit=options['batch_size'])
+
+                if options['once'] and processed == 0:
+                    break
+                if processed == 0:
+                    time.sleep(options['sleep'])
+        finally:
+            self._print_stats()
+
+    def _print_stats(self):
+        metrics = get_event_metrics()
+        self.stdout.write(
+            f"Outbox: {metrics['outbox']}, retrying: {metrics['retrying']}, failed: {metrics['failed']}, "
+            f"lag: {metrics['lag_seconds']:.0f}s"
+        )
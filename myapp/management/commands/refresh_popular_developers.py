@@ -0,0 +1,26 @@
+"""
+Rebuild the popular-developers leaderboard.
+
+The periodic refresh_popular_developers task (run_tasks) keeps it fresh; this
+rebuilds it on demand.
+
+Usage:
+    python manage.py refresh_popular_developers
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from myapp.utils.popular_developers import popular_cache, refresh_leaderboard
+
+
+class Command(BaseCommand):
+    help = "Recompute the PopularDeveloper leaderboard from logs and follows"
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written = refresh_leaderboard()
+        popular_cache.delete('ranking')
+        self.stdout.write(self.style.SUCCESS(
+            f"Ranked {written} developers in {time.perf_counter() - started:.1f}s"
+        ))
@@ -0,0 +1,114 @@
+"""
+Background task worker.
+
+Usage:
+    python manage.py run_tasks                                # one worker, poll forever
+    python manage.py run_tasks --workers 4                    # pool of 4 worker threads
+    python manage.py run_tasks --workers 4 --pool process     # pool of 4 worker processes
+    python manage.py run_tasks --once                         # drain due tasks and exit
+    python manage.py run_tasks --stats                        # print task and queue metrics
+
+The main process also runs the scheduler: it queues periodic tasks and
+releases tasks whose lease expired (myapp.utils.tasks).
+Threads suit I/O-bound tasks (storage, email, database); use processes for
+CPU-bound work such as image renditions.
+"""
+import multiprocessing
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from myapp.utils.tasks import get_task_metrics, requeue_stale, schedule_periodic, work
+
+# Seconds between scheduler passes
+SCHEDULER_INTERVAL = 30
+
+
+def _process_worker(stop, batch_size, sleep, once):
+    # Ctrl-C and SIGTERM reach the whole process group; the parent sets `stop`
+    # instead, so children finish the tasks they claimed
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    return work(stop, batch_size=batch_size, sleep=sleep, once=once)
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Process due tasks and exit")
+        parser.add_argument('--batch-size', type=int, default=10, help="Tasks claimed per poll")
+        parser.add_argument('--sleep', type=float, default=2.0, help="Seconds to wait when the queue is empty")
+        parser.add_argument('--workers', type=int, default=1, help="Number of workers in the pool")
+        parser.add_argument('--pool', choices=['thread', 'process'], default='thread', help="Worker pool type")
+        parser.add_argument('--stats', action='store_true', help="Print queue metrics and exit")
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self._print_stats()
+            return
+
+        workers = max(1, options['workers'])
+        pool = options['pool']
+        self.stdout.write(
+            f"Background worker started ({workers} {pool} worker(s), batch size {options['batch_size']})"
+        )
+
+        self._schedule()
+        if pool == 'process':
+            context = multiprocessing.get_context('fork')
+            stop = context.Event()
+            # Forked children must not share the parent's database connections
+            connections.close_all()
+            runners = [
+                context.Process(target=_process_worker, args=(stop, options['batch_size'], options['sleep'], options['once']))
+                for _ in range(workers)
+            ]
+        else:
+            stop = threading.Event()
+            runners = [
+                threading.Thread(
+                    target=work, args=(stop,),
+                    kwargs={'batch_size': options['batch_size'], 'sleep': options['sleep'], 'once': options['once']},
+                    daemon=True,
+                )
+                for _ in range(workers)
+            ]
+        for runner in runners:
+            runner.start()
+
+        # SIGTERM (e.g. from the platform on deploy) stops the pool like Ctrl-C
+        signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        last_schedule = time.monotonic()
+        try:
+            while any(runner.is_alive() for runner in runners):
+                if stop.wait(1):
+                    break
+                if time.monotonic() - last_schedule >= SCHEDULER_INTERVAL:
+                    self._schedule()
+                    last_schedule = time.monotonic()
+        except KeyboardInterrupt:
+            stop.set()
+        for runner in runners:
+            runner.join()
+        self._print_stats()
+
+    def _schedule(self):
+        close_old_connections()
+        queued = schedule_periodic()
+        released = requeue_stale()
+        if queued or released:
+            self.stdout.write(f"Scheduler: queued {queued} periodic task(s), released {released} task(s) with an expired lease")
+
+    def _print_stats(self):
+        metrics = get_task_metrics()
+        for name, entry in sorted(metrics['tasks'].items()):
+            self.stdout.write(
+                f"{name}: {entry['runs']} runs in the last hour ({entry['succeeded']} ok, {entry['failed']} failed, "
+                f"{entry['retrying']} retrying), avg {entry['avg_seconds'] * 1000:.0f}ms, "
+                f"max {entry['max_seconds'] * 1000:.0f}ms"
+            )
+        self.stdout.write(f"Queue: {metrics['queue']}, lag: {metrics['lag_seconds']:.0f}s")
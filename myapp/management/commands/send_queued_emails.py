@@ -0,0 +1,51 @@
+"""
+Deliver queued email from the outbox.
+
+Usage:
+    python manage.py send_queued_emails            # poll forever
+    python manage.py send_queued_emails --once     # drain and exit
+    python manage.py send_queued_emails --stats    # print delivery metrics
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from myapp.utils.email_outbox import CLAIM_BATCH_SIZE, deliver_pending, get_delivery_metrics
+
+
+class Command(BaseCommand):
+    help = "Deliver queued emails through Brevo"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Deliver due emails and exit")
+        parser.add_argument('--batch-size', type=int, default=CLAIM_BATCH_SIZE, help="Emails claimed per poll")
+        parser.add_argument('--sleep', type=float, default=5.0, help="Seconds to wait when the outbox is empty")
+        parser.add_argument('--stats', action='store_true', help="Print delivery metrics and exit")
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self._print_stats()
+            return
+
+        try:
+            while True:
+                close_old_connections()
+                processed = deliver_pending(limit=options['batch_size'])
+
+                if options['once'] and processed == 0:
+                    break
+                if processed == 0:
+                    time.sleep(options['sleep'])
+        finally:
+            self._print_stats()
+
+    def _print_stats(self):
+        metrics = get_delivery_metrics()
+        self.stdout.write(
+            f"Sent in the last hour: {metrics['sent']} (avg {metrics['avg_delivery_seconds']:.1f}s after queueing), "
+            f"retrying: {metrics['retrying']}, failed: {metrics['failed']}"
+        )
+        self.stdout.write(
+            f"Outbox: {metrics['outbox']}, oldest queued: {metrics['oldest_queued_seconds']:.0f}s"
+        )
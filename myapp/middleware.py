@@ -7,4 +7,26 @@ class UpdateLastSeenMiddleware(MiddlewareMixin):
         if request.user.is_authenticated:
             request.user.info.last_seen = timezone.now()
             request.user.info.save(update_fields=['last_seen'])
-        return None
\ No newline at end of file
+        return None
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Read-your-writes for replica reads (see myapp.utils.replicas): a browser
+    that just wrote reads from the primary for a few seconds.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        from .utils.replicas import SAFE_METHODS, get_replicas, is_pinned, pin, request_scope
+
+        if not get_replicas():
+            return self.get_response(request)
+
+        with request_scope(pinned=is_pinned(request)) as scope:
+            response = self.get_response(request)
+        if request.method not in SAFE_METHODS or scope.wrote:
+            pin(response)
+        return response
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0135_remove_ip_geolocation_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userinfo',
+            name='profile_image_variants',
+            field=models.JSONField(blank=True, default=dict, help_text='Resized WebP/JPEG renditions of profile_image'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0138_outboundemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('follower_id', models.BigIntegerField()),
+                ('following_id', models.BigIntegerField()),
+                ('op', models.CharField(choices=[('add', 'Follow'), ('remove', 'Unfollow')], max_length=6)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0140_recommendationcandidate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularDeveloper',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity', serialize=False, to='myapp.userinfo')),
+                ('log_count', models.PositiveIntegerField(default=0)),
+                ('recent_log_count', models.PositiveIntegerField(default=0, help_text='Logs in the last RECENT_DAYS days')),
+                ('follower_count', models.PositiveIntegerField(default=0)),
+                ('score', models.FloatField(default=0)),
+                ('last_log_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-score', 'user'], name='popular_dev_score_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0144_domainevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backgroundtask',
+            name='periodic',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddConstraint(
+            model_name='backgroundtask',
+            constraint=models.UniqueConstraint(condition=models.Q(('periodic', True), ('status__in', ['pending', 'running'])), fields=('name',), name='unique_queued_periodic_task'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0145_backgroundtask_periodic'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='outboundemail',
+            index=models.Index(fields=['status', 'sent_at'], name='myapp_outbo_status_289295_idx'),
+        ),
+    ]
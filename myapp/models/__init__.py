@@ -1,2 +1,9 @@
 from .users import userinfo, education, experience, follow
-from .filter import skill, user_status, CodingStyle
\ No newline at end of file
+from .filter import skill, user_status, CodingStyle
+from .tasks import BackgroundTask
+from .emails import OutboundEmail
+from .graph import FollowChange, RecommendationCandidate
+from .leaderboard import PopularDeveloper
+from .accounts import AccountDeletion
+from .storage import PendingStorageDeletion
+from .events import DomainEvent
@@ -0,0 +1,34 @@
+from django.contrib.auth.models import User
+from django.db import models
+
+
+class AccountDeletion(models.Model):
+    """
+    Account deletion job.
+    The account is deactivated as soon as the job is created; `purge_account`
+    tasks then delete its data stage by stage in bounded chunks
+    (see myapp.utils.account_deletion) and record their progress here.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    # Kept once the user row is gone, so finished jobs remain as a record
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='deletion_jobs')
+    username = models.CharField(max_length=150)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    stage = models.CharField(max_length=20, blank=True, default='')
+    progress = models.JSONField(default=dict, blank=True, help_text="Rows deleted per stage")
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Delete {self.username} ({self.status}: {self.stage or '-'})"
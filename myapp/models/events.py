@@ -0,0 +1,36 @@
+from django.db import models
+from django.utils import timezone
+
+
+class DomainEvent(models.Model):
+    """
+    Transactional outbox entry.
+    Signals write one compact event (ids only) in the transaction that changed
+    the data; workers run the event's handlers afterwards (see myapp.utils.events).
+    `handled` lists the handlers that already succeeded, so a retried event only
+    runs the rest. Rows are deleted once every handler has succeeded.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    handled = models.JSONField(default=list, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
@@ -0,0 +1,45 @@
+from django.db import models
+
+
+class FollowChange(models.Model):
+    """
+    Append-only log of follow/unfollow events.
+    Each worker's in-memory follow graph (myapp.utils.follow_graph) replays rows
+    past its watermark to stay in sync with follows handled by other workers.
+    """
+    OP_CHOICES = [
+        ('add', 'Follow'),
+        ('remove', 'Unfollow'),
+    ]
+
+    follower_id = models.BigIntegerField()
+    following_id = models.BigIntegerField()
+    op = models.CharField(max_length=6, choices=OP_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.op} {self.follower_id} -> {self.following_id}"
+
+
+class RecommendationCandidate(models.Model):
+    """
+    Precomputed developer recommendations, written by
+    `manage.py compute_recommendations` (personalized PageRank over the follow
+    graph blended with skill and coding-style similarity).
+    """
+    user = models.ForeignKey('myapp.userinfo', on_delete=models.CASCADE, related_name='recommendation_candidates')
+    candidate = models.ForeignKey('myapp.userinfo', on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    reason_code = models.CharField(max_length=32, blank=True, default='')
+    computed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['user', 'rank']
+        unique_together = ['user', 'candidate']
+        indexes = [
+            models.Index(fields=['user', 'rank']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.candidate_id} (#{self.rank})"
@@ -0,0 +1,25 @@
+from django.db import models
+
+
+class PopularDeveloper(models.Model):
+    """
+    Materialized popular-developers leaderboard (myapp.utils.popular_developers).
+    Counters move with F() updates as logs and follows are created or deleted;
+    recent_log_count and score are recomputed by the scheduled refresh task.
+    """
+    user = models.OneToOneField('myapp.userinfo', on_delete=models.CASCADE, primary_key=True,
+                                related_name='popularity')
+    log_count = models.PositiveIntegerField(default=0)
+    recent_log_count = models.PositiveIntegerField(default=0, help_text="Logs in the last RECENT_DAYS days")
+    follower_count = models.PositiveIntegerField(default=0)
+    score = models.FloatField(default=0)
+    last_log_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score', 'user'], name='popular_dev_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.score:.1f}"
@@ -0,0 +1,33 @@
+from django.db import models
+from django.utils import timezone
+
+
+class PendingStorageDeletion(models.Model):
+    """
+    File waiting to be deleted from the default storage (R2 in production).
+    Delete signals append rows here instead of calling the storage API; workers
+    remove them in DeleteObjects batches (see myapp.utils.storage_deletion).
+    Rows are dropped once the file is gone.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('deleting', 'Deleting'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=500)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['next_attempt_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
@@ -20,6 +20,8 @@ class userinfo(models.Model):
     contact_email = models.EmailField(max_length=255, blank=True, null=True)
     about_user = models.TextField(max_length=1000, blank=True, null=True) 
     profile_image = models.ImageField(upload_to='user_profile_img', height_field=None, default='user_profile_img/profile.jpg')
+    profile_image_variants = models.JSONField(default=dict, blank=True, help_text="Resized WebP/JPEG renditions of profile_image")
+    profile_image_processing = models.BooleanField(default=False, help_text="A new profile image is being processed in the background")
     banner_image = models.CharField(max_length=255, default='banners/default.jpg', blank=True, null=True)
     location = models.CharField(max_length=200, blank=True, null=True)
     city = models.CharField(max_length=100, blank=True, null=True)
@@ -99,19 +101,14 @@ class userinfo(models.Model):
         return reverse("user_info_detail", kwargs={"pk": self.pk})
     
     #following methods:from your
+    # The recommendation cache is invalidated by the follow.created/follow.deleted handlers
     def follow(self, other_user):
         if not self.is_following(other_user):
             follow.objects.create(follower = self, following=other_user)
-            # Invalidate recommendation cache
-            from myapp.utils.recommendations import invalidate_recommendation_cache
-            invalidate_recommendation_cache(self)
     
     def unfollow(self, other_user):
         if self.is_following(other_user):
             follow.objects.filter(follower = self, following = other_user).delete()
-            # Invalidate recommendation cache
-            from myapp.utils.recommendations import invalidate_recommendation_cache
-            invalidate_recommendation_cache(self)
     
     def is_following(self, other_user):
         return follow.objects.filter(follower = self, following = other_user).exists()
@@ -1,13 +1,19 @@
 from django.dispatch import receiver
 from allauth.account.signals import user_signed_up, user_logged_in
 from django.contrib.auth.models import User
-from django.db.models.signals import post_delete, pre_save
+from django.db.models.signals import post_delete, post_init, pre_save
 from myapp.models import userinfo, education 
 from django.dispatch import receiver
 from django.core.files.storage import default_storage
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
-from .models import userinfo, education
+from django.db.models.signals import m2m_changed, post_save
+from .models import userinfo, education, follow
+from .utils.images import iter_rendition_names
+from .utils.storage_deletion import queue_storage_deletion
+from .utils.tasks import enqueue
+from .utils.follow_graph import record_follow_change
+from .utils.events import publish
+from .utils.skill_index import record_skills_change
 
 @receiver(post_save, sender=User)
 def create_related_user_models(sender, instance, created, **kwargs):
@@ -21,28 +27,115 @@ def handle_new_social_signup(request, user, **kwargs):
         user.info.needs_profile_completion = True
         user.info.save()
 
+PROFILE_IMAGE_FIELDS = {'profile_image', 'profile_image_variants'}
+
+@receiver(post_init, sender=userinfo)
+def remember_loaded_profile_image(sender, instance, **kwargs):
+    # Deferred fields aren't in __dict__; reading them here would cost a query
+    value = instance.__dict__.get('profile_image')
+    instance._loaded_profile_image = getattr(value, 'name', value)
+
 @receiver(pre_save, sender=userinfo)
-def delete_old_userinfo_profile_image(sender, instance, **kwargs):
+def delete_old_userinfo_profile_image(sender, instance, update_fields=None, **kwargs):
+    instance._replaced_image_names = None
+    instance._profile_image_changed = False
+    # e.g. save(update_fields=['last_seen']): no image change, no extra query
+    if update_fields is not None and not PROFILE_IMAGE_FIELDS & set(update_fields):
+        return
+
     if not instance.pk:  # If this is a new instance, skip
+        instance._profile_image_changed = instance.profile_image.name != instance.profile_image.field.default
         return
     
     try:
-        old_instance = userinfo.objects.only('profile_image').get(pk=instance.pk)
+        old_instance = userinfo.objects.only('profile_image', 'profile_image_variants').get(pk=instance.pk)
     except userinfo.DoesNotExist:
         return
     
+    if old_instance.profile_image.name == instance.profile_image.name:
+        return
+
+    if instance.profile_image.name == getattr(instance, '_loaded_profile_image', None):
+        # Stale copy: the image was replaced since this instance was loaded (e.g. by
+        # process_profile_image's update()). Keep the stored image instead of reverting it
+        instance.profile_image = old_instance.profile_image.name
+        instance.profile_image_variants = old_instance.profile_image_variants
+        return
+
+    instance._profile_image_changed = True
+    
+    # Renditions belong to the old file; new ones are generated after save
+    old_names = list(iter_rendition_names(old_instance.profile_image_variants))
+    instance.profile_image_variants = {}
+    
     # Skip if old profile_image is empty or the default
     if (old_instance.profile_image and old_instance.profile_image.name and 
-        old_instance.profile_image != instance.profile_image and 
-        old_instance.profile_image.name != old_instance.profile_image.field.default and 
-        default_storage.exists(old_instance.profile_image.name)):
-        default_storage.delete(old_instance.profile_image.name)
+        old_instance.profile_image.name != old_instance.profile_image.field.default):
+        old_names.append(old_instance.profile_image.name)
+    
+    # Queued in post_save, once the row no longer references them
+    instance._replaced_image_names = old_names
+
+@receiver(post_save, sender=userinfo)
+def queue_replaced_profile_image(sender, instance, **kwargs):
+    if instance.__dict__.get('profile_image') is not None:
+        instance._loaded_profile_image = instance.profile_image.name
+    names = getattr(instance, '_replaced_image_names', None)
+    if not names:
+        return
+    instance._replaced_image_names = None
+
+    # Never delete what the row references now (another writer may have set it meanwhile)
+    current = userinfo.objects.filter(pk=instance.pk).values_list('profile_image', 'profile_image_variants').first()
+    if current:
+        in_use = {current[0], *iter_rendition_names(current[1])}
+        names = [name for name in names if name not in in_use]
+    # Storage round-trips happen in the background worker, not in the request
+    queue_storage_deletion(names)
+
+@receiver(post_save, sender=userinfo)
+def generate_userinfo_profile_image_renditions(sender, instance, **kwargs):
+    if not getattr(instance, '_profile_image_changed', False):
+        return
+    instance._profile_image_changed = False
+    
+    if not instance.profile_image or instance.profile_image.name == instance.profile_image.field.default:
+        return
+    
+    enqueue('generate_profile_image_renditions', {'userinfo_id': instance.pk})
         
 @receiver(post_delete, sender=userinfo)
 def delete_userinfo_profile_image_on_delete(sender, instance, **kwargs):
+    names = list(iter_rendition_names(instance.profile_image_variants))
     # Skip if profile_image is empty or the default
     if (instance.profile_image and instance.profile_image.name and 
         instance.profile_image.name != instance.profile_image.field.default):
-        if default_storage.exists(instance.profile_image.name):
-            default_storage.delete(instance.profile_image.name)
-            
\ No newline at end of file
+        names.append(instance.profile_image.name)
+    queue_storage_deletion(names)
+            
+
+@receiver(post_save, sender=follow)
+def record_follow_added(sender, instance, created, **kwargs):
+    # Keeps every worker's in-memory follow graph in sync (FollowChange is its own log);
+    # counters, notifications and caches are updated by the follow.created handlers
+    if created:
+        record_follow_change(instance.follower_id, instance.following_id, 'add')
+        publish('follow.created', follow_id=instance.id, follower_id=instance.follower_id, following_id=instance.following_id)
+
+@receiver(post_delete, sender=follow)
+def record_follow_removed(sender, instance, **kwargs):
+    record_follow_change(instance.follower_id, instance.following_id, 'remove')
+    publish('follow.deleted', follow_id=instance.id, follower_id=instance.follower_id, following_id=instance.following_id)
+
+@receiver(m2m_changed, sender=userinfo.skills.through)
+def record_skills_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # Keeps every worker's skill index in sync (EditSkillForm, admin)
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # skill.users edits: instance is the skill, pk_set the affected users (None on clear)
+        user_ids = pk_set if pk_set is not None else []
+    else:
+        user_ids = [instance.pk]
+    for user_id in user_ids:
+        record_skills_change(user_id)
@@ -0,0 +1,213 @@
+"""
+Background task handlers for myapp (run by `manage.py run_tasks`)
+"""
+import base64
+import binascii
+import io
+import logging
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import userinfo
+from .utils.email_outbox import DELIVERY_INTERVAL
+from .utils.events import DISPATCH_INTERVAL
+from .utils.graph_recommendations import RECOMPUTE_INTERVAL
+from .utils.images import generate_renditions, iter_rendition_names, store_renditions
+from .utils.popular_developers import REFRESH_INTERVAL
+from .utils.storage_deletion import queue_storage_deletion
+from .utils.tasks import enqueue, task
+
+logger = logging.getLogger(__name__)
+
+# Cropped profile images are normalized to this size before upload
+PROFILE_IMAGE_MAX_SIZE = 512
+# Finished task rows are kept this long for inspection
+TASK_RETENTION = timedelta(days=7)
+
+
+@task('delete_storage_files', max_attempts=5)
+def delete_storage_files(names):
+    """Move files from tasks queued before PendingStorageDeletion existed onto the deletion queue"""
+    queue_storage_deletion(names)
+
+
+def _reschedule_storage_drain(**kwargs):
+    """Queue the next drain for rows waiting on a retry or on an expired 'deleting' lease"""
+    from .models import PendingStorageDeletion
+
+    next_retry = (
+        PendingStorageDeletion.objects.filter(status__in=['queued', 'deleting'])
+        .order_by('next_attempt_at')
+        .values_list('next_attempt_at', flat=True)
+        .first()
+    )
+    if next_retry:
+        enqueue('drain_storage_deletions', run_at=max(next_retry, timezone.now()))
+
+
+# on_failure: a drain that crashed or timed out (its rows stay 'deleting') still reschedules
+@task('drain_storage_deletions', max_attempts=1, on_failure=_reschedule_storage_drain)
+def drain_storage_deletions():
+    """Delete queued storage files in batches; names that need a retry reschedule the drain"""
+    from .utils.storage_deletion import drain_pending
+
+    while drain_pending():
+        pass
+
+    _reschedule_storage_drain()
+
+
+def _clear_profile_image_processing(userinfo_id, **kwargs):
+    userinfo.objects.filter(pk=userinfo_id).update(profile_image_processing=False)
+
+
+@task('process_profile_image', on_failure=_clear_profile_image_processing, keep_payload=False)
+def process_profile_image(userinfo_id, image_data, file_name):
+    """
+    Decode a cropped base64 profile image, normalize it, upload it with its
+    renditions and swap it in. The previous file is queued for deletion.
+    """
+    try:
+        info = userinfo.objects.only('id', 'profile_image', 'profile_image_variants').get(pk=userinfo_id)
+    except userinfo.DoesNotExist:
+        return
+
+    try:
+        raw = base64.b64decode(image_data.split(';base64,', 1)[1])
+        with Image.open(io.BytesIO(raw)) as original:
+            image = ImageOps.exif_transpose(original)
+            image.thumbnail((PROFILE_IMAGE_MAX_SIZE, PROFILE_IMAGE_MAX_SIZE), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            if image.mode in ('RGBA', 'LA', 'P'):
+                image.save(buffer, 'PNG', optimize=True)
+                file_name = f"{file_name.rsplit('.', 1)[0]}.png"
+            else:
+                image.convert('RGB').save(buffer, 'JPEG', quality=90, optimize=True)
+                file_name = f"{file_name.rsplit('.', 1)[0]}.jpg"
+    except (IndexError, ValueError, binascii.Error, OSError) as e:
+        # Bad upload: retrying won't help, drop it and keep the current image
+        logger.warning(f'Discarding invalid profile image for userinfo {userinfo_id}: {e}')
+        _clear_profile_image_processing(userinfo_id)
+        return
+
+    image_bytes = buffer.getvalue()
+    field = userinfo._meta.get_field('profile_image')
+    name = default_storage.save(field.generate_filename(info, file_name), ContentFile(image_bytes))
+    variants = store_renditions(name, image_bytes, 'avatar')
+
+    old_names = list(iter_rendition_names(info.profile_image_variants))
+    if info.profile_image.name and info.profile_image.name != field.default:
+        old_names.append(info.profile_image.name)
+
+    # update() skips the pre_save storage cleanup; old files are queued below instead
+    userinfo.objects.filter(pk=userinfo_id).update(
+        profile_image=name,
+        profile_image_variants=variants,
+        profile_image_processing=False,
+        updated_at=timezone.now(),
+    )
+
+    queue_storage_deletion(old_names)
+
+
+@task('generate_profile_image_renditions')
+def generate_profile_image_renditions(userinfo_id):
+    """Generate avatar renditions for an image that was saved directly (e.g. via admin)"""
+    try:
+        info = userinfo.objects.only('id', 'profile_image').get(pk=userinfo_id)
+    except userinfo.DoesNotExist:
+        return
+
+    variants = generate_renditions(info.profile_image, 'avatar')
+    if variants:
+        userinfo.objects.filter(pk=userinfo_id, profile_image=info.profile_image.name).update(profile_image_variants=variants)
+
+
+@task('deliver_outbound_emails', max_attempts=1, every=DELIVERY_INTERVAL)
+def deliver_outbound_emails():
+    """Drain the email outbox until no email is due (periodic sweep)"""
+    from .utils.email_outbox import deliver_pending
+
+    while deliver_pending():
+        pass
+
+
+@task('prune_outbound_emails', max_attempts=1, every=timedelta(days=1))
+def prune_outbound_emails():
+    """Delete sent and failed outbox rows older than OUTBOX_RETENTION (periodic)"""
+    from .utils.email_outbox import prune_outbox
+
+    deleted = prune_outbox()
+    logger.info(f'Pruned {deleted} outbound emails')
+
+
+@task('refresh_similar_developers')
+def refresh_similar_developers(user_ids):
+    """Recompute cached top-k similar developers after a skill edit"""
+    from .utils.skill_index import precompute_similar_developers
+
+    precompute_similar_developers(user_ids)
+
+
+@task('refresh_popular_developers', max_attempts=1, every=REFRESH_INTERVAL)
+def refresh_popular_developers():
+    """Recompute the popular-developers leaderboard (periodic)"""
+    from .utils.popular_developers import popular_cache, refresh_leaderboard
+
+    written = refresh_leaderboard()
+    popular_cache.delete('ranking')
+    logger.info(f'Refreshed popular developers leaderboard: {written} developers')
+
+
+@task('compute_recommendations', max_attempts=1, lease=3600, every=RECOMPUTE_INTERVAL)
+def compute_recommendations():
+    """Recompute stored recommendations for every active user (periodic)"""
+    from .utils.graph_recommendations import compute_recommendations as compute
+
+    users, written = compute()
+    logger.info(f'Stored {written} recommendation candidates for {users} users')
+
+
+@task('prune_background_tasks', max_attempts=1, every=timedelta(days=1))
+def prune_background_tasks():
+    """Delete done and failed task rows older than TASK_RETENTION (periodic)"""
+    from .models import BackgroundTask
+
+    deleted, _ = BackgroundTask.objects.filter(
+        status__in=['done', 'failed'], finished_at__lt=timezone.now() - TASK_RETENTION
+    ).delete()
+    logger.info(f'Pruned {deleted} finished background tasks')
+
+
+def _fail_account_deletion(job_id, **kwargs):
+    from .models import AccountDeletion
+
+    AccountDeletion.objects.filter(pk=job_id).update(status='failed', last_error='purge_account failed, see task log')
+
+
+@task('purge_account', max_attempts=5, on_failure=_fail_account_deletion)
+def purge_account(job_id):
+    """Delete the next chunks of a deactivated account's data, requeueing until it is gone"""
+    from .models import AccountDeletion
+    from .utils.account_deletion import run_account_deletion
+
+    try:
+        job = AccountDeletion.objects.get(pk=job_id)
+    except AccountDeletion.DoesNotExist:
+        return
+
+    if not run_account_deletion(job):
+        enqueue('purge_account', {'job_id': job_id})
+
+
+@task('dispatch_domain_events', max_attempts=1, every=DISPATCH_INTERVAL)
+def dispatch_domain_events():
+    """Run handlers for committed domain events until none are due (periodic sweep)"""
+    from .utils.events import dispatch_pending
+
+    while dispatch_pending():
+        pass
@@ -53,6 +53,7 @@ def linkify_usernames(text):
     Example: "@john follows" becomes "<a href='/user-profile/john/'>@john</a> follows"
     """
     import re
+    from django.utils.html import escape
     from django.utils.safestring import mark_safe
     
     # Pattern to match @username (alphanumeric and underscores)
@@ -62,8 +63,8 @@ def linkify_usernames(text):
         username = match.group(1)
         return f'<a href="/user-profile/{username}/" class="hover:underline">@{username}</a>'
     
-    # Replace all @username mentions with links
-    linked_text = re.sub(pattern, replace_mention, text)
+    # Replace all @username mentions with links (escaped first: the output is marked safe)
+    linked_text = re.sub(pattern, replace_mention, escape(text))
     
     return mark_safe(linked_text)
 
@@ -71,4 +72,41 @@ def linkify_usernames(text):
 def timesince_short(value):
     full = timesince(value)  # e.g. "13 hours, 51 minutes"
     short = full.split(',')[0]  # Take only the largest unit
-    return short
\ No newline at end of file
+    return short
+
+def _versioned_url(url, version):
+    if version is None or version == '':
+        return url
+    return f"{url}?v={version}"
+
+@register.simple_tag
+def rendition_src(field_file, variants, width, fmt='jpeg', version=None):
+    """
+    URL of the smallest stored rendition at least `width` px wide,
+    falling back to the original file when no renditions exist yet.
+    Usage: {% rendition_src dev.profile_image dev.profile_image_variants 96 version=dev.updated_at.timestamp %}
+    """
+    from django.core.files.storage import default_storage
+    from myapp.utils.images import pick_rendition
+    
+    name = pick_rendition(variants, int(width), fmt)
+    if name:
+        return _versioned_url(default_storage.url(name), version)
+    if not field_file:
+        return ''
+    return _versioned_url(field_file.url, version)
+
+@register.simple_tag
+def rendition_srcset(variants, fmt='webp', version=None):
+    """
+    srcset attribute value ("url 48w, url 96w") for a variants dict.
+    Returns an empty string when no renditions exist yet.
+    """
+    from django.core.files.storage import default_storage
+    
+    by_width = (variants or {}).get(fmt) or {}
+    entries = sorted(by_width.items(), key=lambda item: int(item[0]))
+    return ', '.join(
+        f"{_versioned_url(default_storage.url(name), version)} {width}w"
+        for width, name in entries
+    )
@@ -0,0 +1,131 @@
+"""
+Email outbox delivery against the local Brevo stub (helpers.brevo.stub_server).
+"""
+from datetime import timedelta
+
+from django.core.mail import EmailMessage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from helpers.brevo.stub_server import StubServer
+from myapp.models import OutboundEmail
+from myapp.utils.email_outbox import (
+    OUTBOX_RETENTION, RETRY_BASE_DELAY_SECONDS, OutboxEmailBackend, deliver_pending,
+    get_delivery_metrics, prune_outbox,
+)
+
+
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        self.stub = StubServer(port=0).start()
+        self.addCleanup(self.stub.stop)
+        overrides = override_settings(
+            BREVO_API_URL=self.stub.url, BREVO_API_KEY='test-key', BACKGROUND_TASKS_EAGER=False,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def queue(self, *recipients, subject='Welcome to DevMate', body='Hello!'):
+        messages = [
+            EmailMessage(subject, body, 'DevMate <admin@devmate.space>', [recipient])
+            for recipient in recipients
+        ]
+        return OutboxEmailBackend().send_messages(messages)
+
+    def make_due(self):
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+
+    def test_shared_content_is_sent_as_one_message_versions_request(self):
+        self.assertEqual(self.queue('a@example.com', 'b@example.com', 'c@example.com'), 3)
+        self.queue('d@example.com', subject='Someone followed you')
+
+        self.assertEqual(deliver_pending(), 4)
+
+        self.assertEqual(len(self.stub.received), 2)
+        batch = next(payload for payload in self.stub.received if 'messageVersions' in payload)
+        self.assertEqual(
+            [version['to'][0]['email'] for version in batch['messageVersions']],
+            ['a@example.com', 'b@example.com', 'c@example.com'],
+        )
+        self.assertNotIn('to', batch)
+
+        emails = OutboundEmail.objects.all()
+        self.assertEqual({email.status for email in emails}, {'sent'})
+        self.assertEqual(len({email.message_id for email in emails}), 4)
+
+    def test_server_error_is_retried_with_backoff(self):
+        self.queue('a@example.com', 'b@example.com')
+        self.stub.fail_rate = 1.0
+
+        before = timezone.now()
+        self.assertEqual(deliver_pending(), 2)
+
+        for email in OutboundEmail.objects.all():
+            self.assertEqual((email.status, email.attempts), ('queued', 1))
+            self.assertTrue(email.last_error.startswith('503'))
+            self.assertGreaterEqual(email.next_attempt_at, before + timedelta(seconds=RETRY_BASE_DELAY_SECONDS))
+        # Not due until the backoff expires
+        self.assertEqual(deliver_pending(), 0)
+
+        self.stub.fail_rate = 0.0
+        self.make_due()
+        deliver_pending()
+
+        self.assertEqual(set(OutboundEmail.objects.values_list('status', 'attempts')), {('sent', 2)})
+        self.assertEqual(len(self.stub.received), 1)
+
+    def test_rejected_batch_is_resent_per_message(self):
+        self.queue('a@example.com', 'bad@example.com', 'c@example.com')
+        self.stub.rejected.add('bad@example.com')
+
+        self.assertEqual(deliver_pending(), 3)
+
+        self.assertEqual(
+            dict(OutboundEmail.objects.values_list('recipients', 'status')),
+            {'a@example.com': 'sent', 'bad@example.com': 'failed', 'c@example.com': 'sent'},
+        )
+        self.assertTrue(OutboundEmail.objects.get(status='failed').last_error.startswith('400'))
+        self.assertEqual(
+            sorted(payload['to'][0]['email'] for payload in self.stub.received), ['a@example.com', 'c@example.com'],
+        )
+
+    def test_failed_after_max_attempts(self):
+        self.queue('a@example.com')
+        OutboundEmail.objects.update(max_attempts=2)
+        self.stub.fail_rate = 1.0
+
+        for _ in range(2):
+            self.make_due()
+            deliver_pending()
+
+        email = OutboundEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), ('failed', 2))
+
+    def test_metrics_come_from_outbox_rows(self):
+        self.queue('a@example.com', 'b@example.com')
+        deliver_pending()
+        self.queue('c@example.com', subject='Other')
+        self.stub.fail_rate = 1.0
+        deliver_pending()
+
+        metrics = get_delivery_metrics()
+
+        self.assertEqual(metrics['outbox'], {'sent': 2, 'queued': 1})
+        self.assertEqual(metrics['sent'], 2)
+        self.assertEqual(metrics['retrying'], 1)
+        self.assertEqual(metrics['failed'], 0)
+
+    def test_prune_deletes_old_finished_rows_only(self):
+        self.queue('sent-old@example.com', 'sent-new@example.com', 'failed-old@example.com', 'queued@example.com')
+        old = timezone.now() - OUTBOX_RETENTION - timedelta(hours=1)
+        OutboundEmail.objects.filter(recipients='sent-old@example.com').update(status='sent', sent_at=old)
+        OutboundEmail.objects.filter(recipients='sent-new@example.com').update(status='sent', sent_at=timezone.now())
+        OutboundEmail.objects.filter(recipients='failed-old@example.com').update(status='failed', next_attempt_at=old)
+        OutboundEmail.objects.filter(recipients='queued@example.com').update(next_attempt_at=old)
+
+        self.assertEqual(prune_outbox(batch_size=1), 2)
+
+        self.assertEqual(
+            set(OutboundEmail.objects.values_list('recipients', flat=True)),
+            {'sent-new@example.com', 'queued@example.com'},
+        )
@@ -0,0 +1,155 @@
+"""
+Replica routing with two database aliases: 'default' and a replica that mirrors
+it under the test runner (DevMate.test_settings adds one when DB_REPLICA_URLS is empty).
+"""
+import threading
+import time
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import OperationalError, connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from myapp.middleware import ReplicaStickinessMiddleware
+from myapp.utils import replicas
+from myapp.utils.replicas import STICKY_COOKIE_NAME, read_from_replica, replica, use_replica
+
+REPLICA = settings.DATABASE_REPLICAS[0] if settings.DATABASE_REPLICAS else None
+
+
+@skipUnless(REPLICA, 'needs a replica alias (DATABASE_REPLICAS)')
+class ReplicaTestCase(TransactionTestCase):
+    # TransactionTestCase: TestCase's wrapping transaction would keep every read on the primary
+    databases = {'default', REPLICA} if REPLICA else {'default'}
+
+    def setUp(self):
+        self.mark_replica(healthy=True)
+        self.addCleanup(replicas._health.clear)
+
+    def mark_replica(self, healthy):
+        replicas._health[REPLICA] = (time.monotonic(), healthy)
+
+    def read_alias(self):
+        """Alias the next read of User actually runs on"""
+        with CaptureQueriesContext(connections[REPLICA]) as on_replica:
+            User.objects.filter(username='nobody').exists()
+        return REPLICA if on_replica.captured_queries else 'default'
+
+
+class RouterTests(ReplicaTestCase):
+    def test_reads_stay_on_primary_without_opt_in(self):
+        self.assertEqual(self.read_alias(), 'default')
+
+    def test_opted_in_reads_go_to_replica(self):
+        with use_replica():
+            self.assertEqual(self.read_alias(), REPLICA)
+        self.assertEqual(replica(User.objects.all()).db, REPLICA)
+
+    def test_writes_stay_on_primary(self):
+        with use_replica():
+            user = User.objects.create(username='writer')
+            self.assertEqual(user._state.db, 'default')
+            # Read-your-writes for the rest of the block
+            self.assertEqual(self.read_alias(), 'default')
+
+    def test_reads_in_transaction_stay_on_primary(self):
+        with use_replica(), transaction.atomic():
+            self.assertEqual(self.read_alias(), 'default')
+
+    def test_replica_is_not_migrated(self):
+        router = replicas.ReplicaRouter()
+        self.assertFalse(router.allow_migrate(REPLICA, 'myapp'))
+        self.assertIsNone(router.allow_migrate('default', 'myapp'))
+
+
+class StickinessTests(ReplicaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = RequestFactory()
+        self.read_on = None
+
+        @read_from_replica
+        def view(request):
+            if request.GET.get('write'):
+                User.objects.create(username='writer')
+            self.read_on = self.read_alias()
+            return HttpResponse()
+
+        self.middleware = ReplicaStickinessMiddleware(view)
+
+    def test_get_reads_from_replica_without_pinning(self):
+        response = self.middleware(self.factory.get('/'))
+        self.assertEqual(self.read_on, REPLICA)
+        self.assertNotIn(STICKY_COOKIE_NAME, response.cookies)
+
+    def test_post_pins_browser_to_primary(self):
+        response = self.middleware(self.factory.post('/'))
+        self.assertEqual(self.read_on, 'default')
+        cookie = response.cookies[STICKY_COOKIE_NAME]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_STICKY_SECONDS)
+
+        request = self.factory.get('/')
+        request.COOKIES[STICKY_COOKIE_NAME] = cookie.value
+        self.middleware(request)
+        self.assertEqual(self.read_on, 'default')
+
+    def test_write_inside_opted_in_get_pins(self):
+        response = self.middleware(self.factory.get('/', {'write': 1}))
+        self.assertEqual(self.read_on, 'default')
+        self.assertIn(STICKY_COOKIE_NAME, response.cookies)
+
+    def test_expired_window_reads_from_replica_again(self):
+        request = self.factory.get('/')
+        request.COOKIES[STICKY_COOKIE_NAME] = str(int(time.time()) - 1)
+        self.middleware(request)
+        self.assertEqual(self.read_on, REPLICA)
+
+
+class LagCheckTests(ReplicaTestCase):
+    def setUp(self):
+        super().setUp()
+        replicas._health.clear()
+
+    def test_failed_check_falls_back_to_primary(self):
+        with mock.patch.object(replicas, '_replica_lag', side_effect=OperationalError('connection refused')):
+            self.assertFalse(replicas.check_replica(REPLICA))
+        with use_replica():
+            self.assertEqual(self.read_alias(), 'default')
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        with mock.patch.object(replicas, '_replica_lag', return_value=settings.REPLICA_MAX_LAG_SECONDS + 1):
+            self.assertFalse(replicas.check_replica(REPLICA))
+        with use_replica():
+            self.assertEqual(self.read_alias(), 'default')
+
+        with mock.patch.object(replicas, '_replica_lag', return_value=0.5):
+            self.assertTrue(replicas.check_replica(REPLICA))
+        with use_replica():
+            self.assertEqual(self.read_alias(), REPLICA)
+
+    def test_slow_check_does_not_block_reads(self):
+        release = threading.Event()
+        checked = threading.Event()
+
+        def slow_lag(alias):
+            release.wait(5)
+            checked.set()
+            return 0.0
+
+        with mock.patch.object(replicas, '_replica_lag', side_effect=slow_lag):
+            started = time.monotonic()
+            with use_replica():
+                # Unknown health: the primary serves while the check runs
+                self.assertEqual(self.read_alias(), 'default')
+            self.assertLess(time.monotonic() - started, 1)
+            release.set()
+            self.assertTrue(checked.wait(5))
+        for _ in range(50):
+            if REPLICA in replicas._health:
+                break
+            time.sleep(0.01)
+        with use_replica():
+            self.assertEqual(self.read_alias(), REPLICA)
@@ -0,0 +1,178 @@
+"""
+Storage deletion queue against a local S3 stand-in (moto, from requirements-dev.txt).
+"""
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+import boto3
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from moto import mock_aws
+
+from helpers.cloudflare.storages import DELETE_BATCH_SIZE, MediaFileStorage
+from myapp.models import PendingStorageDeletion
+from myapp.utils import storage_deletion
+from myapp.utils.storage_deletion import RETRY_BASE_DELAY_SECONDS, drain_pending, queue_storage_deletion
+
+BUCKET = 'devmate-test'
+
+
+class S3Mixin:
+    """Starts moto and a MediaFileStorage on an empty bucket"""
+
+    def setUp(self):
+        super().setUp()
+        self.aws = mock_aws()
+        self.aws.start()
+        self.addCleanup(self.aws.stop)
+        self.s3 = boto3.client('s3', region_name='us-east-1')
+        self.s3.create_bucket(Bucket=BUCKET)
+        self.storage = MediaFileStorage(
+            bucket_name=BUCKET, access_key='test', secret_key='test', region_name='us-east-1'
+        )
+        self.delete_calls = []
+        client = self.storage.connection.meta.client
+        original = client.delete_objects
+
+        def record(**kwargs):
+            self.delete_calls.append(len(kwargs['Delete']['Objects']))
+            return original(**kwargs)
+
+        client.delete_objects = record
+
+    def put(self, *names):
+        for name in names:
+            self.s3.put_object(Bucket=BUCKET, Key=f'{self.storage.location}/{name}', Body=b'x')
+        return list(names)
+
+    def keys(self):
+        return {obj['Key'] for obj in self.s3.list_objects_v2(Bucket=BUCKET).get('Contents', [])}
+
+    def fail_keys(self, *names):
+        """Make DeleteObjects report `names` as failed (and delete the others)"""
+        client = self.storage.connection.meta.client
+        original = client.delete_objects
+        failing = {f'{self.storage.location}/{name}' for name in names}
+
+        def partial(**kwargs):
+            objects = kwargs['Delete']['Objects']
+            kwargs['Delete']['Objects'] = [obj for obj in objects if obj['Key'] not in failing]
+            response = original(**kwargs) if kwargs['Delete']['Objects'] else {}
+            response['Errors'] = [
+                {'Key': obj['Key'], 'Code': 'InternalError', 'Message': 'We encountered an internal error'}
+                for obj in objects if obj['Key'] in failing
+            ]
+            return response
+
+        client.delete_objects = partial
+
+
+class MediaFileStorageDeleteManyTests(S3Mixin, SimpleTestCase):
+    def test_deletes_in_batches(self):
+        names = self.put(*[f'logs/{i}.jpg' for i in range(DELETE_BATCH_SIZE + 5)])
+
+        failures = self.storage.delete_many(names)
+
+        self.assertEqual(failures, {})
+        self.assertEqual(self.delete_calls, [DELETE_BATCH_SIZE, 5])
+        self.assertEqual(self.keys(), set())
+
+    def test_missing_keys_count_as_deleted(self):
+        self.assertEqual(self.storage.delete_many(['logs/missing.jpg']), {})
+
+    def test_partial_failures_are_reported(self):
+        names = self.put('logs/a.jpg', 'logs/b.jpg', 'logs/c.jpg')
+        self.fail_keys('logs/b.jpg')
+
+        failures = self.storage.delete_many(names)
+
+        self.assertEqual(list(failures), ['logs/b.jpg'])
+        self.assertIn('InternalError', failures['logs/b.jpg'])
+        self.assertEqual(self.keys(), {'uploads/logs/b.jpg'})
+
+
+class DrainPendingTests(S3Mixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(storage_deletion, 'default_storage', self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_drain_deletes_files_and_rows(self):
+        names = self.put('logs/a.jpg', 'logs/b.jpg')
+        queue_storage_deletion(names + ['logs/a.jpg', ''])
+
+        self.assertEqual(drain_pending(), 2)
+
+        self.assertEqual(self.keys(), set())
+        self.assertFalse(PendingStorageDeletion.objects.exists())
+
+    def test_partial_failure_is_retried_with_backoff(self):
+        names = self.put('logs/a.jpg', 'logs/b.jpg')
+        self.fail_keys('logs/b.jpg')
+        queue_storage_deletion(names)
+
+        before = timezone.now()
+        drain_pending()
+
+        row = PendingStorageDeletion.objects.get()
+        self.assertEqual((row.name, row.status, row.attempts), ('logs/b.jpg', 'queued', 1))
+        self.assertIn('InternalError', row.last_error)
+        self.assertGreaterEqual(row.next_attempt_at, before + timedelta(seconds=RETRY_BASE_DELAY_SECONDS))
+        # Not due yet
+        self.assertEqual(drain_pending(), 0)
+
+        # The backoff doubles with each attempt
+        PendingStorageDeletion.objects.update(next_attempt_at=timezone.now())
+        before = timezone.now()
+        drain_pending()
+        row.refresh_from_db()
+        self.assertEqual(row.attempts, 2)
+        self.assertGreaterEqual(row.next_attempt_at, before + timedelta(seconds=RETRY_BASE_DELAY_SECONDS * 2))
+
+    def test_failed_after_max_attempts(self):
+        names = self.put('logs/a.jpg')
+        self.fail_keys('logs/a.jpg')
+        queue_storage_deletion(names)
+        PendingStorageDeletion.objects.update(max_attempts=2)
+
+        for _ in range(2):
+            PendingStorageDeletion.objects.update(next_attempt_at=timezone.now())
+            drain_pending()
+
+        row = PendingStorageDeletion.objects.get()
+        self.assertEqual((row.status, row.attempts), ('failed', 2))
+        PendingStorageDeletion.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(drain_pending(), 0)
+
+    def test_expired_deleting_lease_is_claimed_again(self):
+        names = self.put('logs/a.jpg')
+        PendingStorageDeletion.objects.create(
+            name=names[0], status='deleting', attempts=1, next_attempt_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        self.assertEqual(drain_pending(), 1)
+        self.assertEqual(self.keys(), set())
+
+
+class DeleteFilesFallbackTests(TestCase):
+    def test_storage_without_delete_many_deletes_one_by_one(self):
+        with tempfile.TemporaryDirectory() as root:
+            storage = FileSystemStorage(location=root)
+            kept = storage.save('b.jpg', ContentFile(b'x'))
+            names = [storage.save('a.jpg', ContentFile(b'x')), kept]
+
+            def delete(name):
+                if name == kept:
+                    raise OSError('Permission denied')
+                FileSystemStorage.delete(storage, name)
+
+            with mock.patch.object(storage, 'delete', side_effect=delete):
+                failures = storage_deletion.delete_files(names, storage)
+
+            self.assertEqual(failures, {kept: 'Permission denied'})
+            self.assertFalse(storage.exists(names[0]))
+            self.assertTrue(storage.exists(kept))
@@ -0,0 +1,78 @@
+"""
+Periodic tasks and pruning in the database-backed task queue (myapp.utils.tasks).
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from myapp.models import BackgroundTask
+from myapp.tasks import TASK_RETENTION, prune_background_tasks
+from myapp.utils import tasks
+from myapp.utils.tasks import get_task_metrics, run_pending, schedule_periodic, task
+
+EVERY = timedelta(seconds=5)
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=False)
+class PeriodicTaskTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        self.fail = False
+        registry = mock.patch.dict(tasks.TASK_REGISTRY, clear=True)
+        registry.start()
+        self.addCleanup(registry.stop)
+
+        @task('test_sweep', max_attempts=1, every=EVERY)
+        def sweep():
+            self.calls.append(timezone.now())
+            if self.fail:
+                raise ValueError('sweep broke')
+
+    def run_due(self):
+        BackgroundTask.objects.filter(status='pending').update(run_at=timezone.now())
+        return run_pending()
+
+    def test_runs_reuse_one_row(self):
+        self.assertEqual(schedule_periodic(), 1)
+        for _ in range(3):
+            self.assertEqual(self.run_due(), 1)
+
+        self.assertEqual(len(self.calls), 3)
+        row = BackgroundTask.objects.get()
+        self.assertEqual((row.status, row.attempts, row.last_error), ('pending', 0, ''))
+        self.assertEqual(row.run_at, row.started_at + EVERY)
+        # Already queued: the scheduler adds nothing
+        self.assertEqual(schedule_periodic(), 0)
+
+    def test_failed_run_is_requeued_and_reported(self):
+        schedule_periodic()
+        self.fail = True
+        self.run_due()
+
+        row = BackgroundTask.objects.get()
+        self.assertEqual(row.status, 'pending')
+        self.assertEqual(row.last_error, 'ValueError: sweep broke')
+        self.assertEqual(get_task_metrics()['tasks']['test_sweep']['failed'], 1)
+
+        self.fail = False
+        self.run_due()
+        row.refresh_from_db()
+        self.assertEqual(row.last_error, '')
+        self.assertEqual(get_task_metrics()['tasks']['test_sweep']['succeeded'], 1)
+
+
+class PruneBackgroundTasksTests(TestCase):
+    def test_prunes_old_done_and_failed_rows(self):
+        old = timezone.now() - TASK_RETENTION - timedelta(hours=1)
+        for status in ('done', 'failed'):
+            BackgroundTask.objects.create(name=f'old_{status}', status=status, finished_at=old)
+        BackgroundTask.objects.create(name='recent', status='failed', finished_at=timezone.now())
+        BackgroundTask.objects.create(name='pending_periodic', periodic=True, finished_at=old)
+
+        prune_background_tasks()
+
+        self.assertEqual(
+            set(BackgroundTask.objects.values_list('name', flat=True)), {'recent', 'pending_periodic'}
+        )
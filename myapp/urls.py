@@ -22,6 +22,7 @@ urlpatterns = [
     # User-profile
     path("user-profile/<str:user_name>/", views.user_profile, name="user_profile"),
     path("<str:username>/user-follow-list/", views.follow_list, name="follow_list"),
+    path("<str:username>/user-follow-list/load-more/", views.load_more_follow_list, name="load_more_follow_list"),
     path("unfollow/<int:otheruserinfo_id>/", views.unfollow_user, name = 'unfollow_user'),
     path("follow/<int:otheruserinfo_id>/", views.follow_user, name = 'follow_user'),
     path("api/quick-follow/", views.quick_follow_user, name='quick_follow_user'),
@@ -45,4 +46,7 @@ urlpatterns = [
     path('api/geolocation/update/', views.update_user_geolocation, name='update_geolocation'),
     path('api/geolocation/status/', views.get_user_geolocation_status, name='geolocation_status'),
     path('api/geolocation/permission/denied/', views.set_permission_denied, name='set_permission_denied'),
+
+    # Monitoring (staff only)
+    path('api/cache-metrics/', views.cache_metrics_api, name='cache_metrics_api'),
 ]
@@ -0,0 +1,268 @@
+"""
+Account Deletion
+Deactivates an account right away and purges its data in the background.
+
+    from myapp.utils.account_deletion import start_account_deletion
+    start_account_deletion(request.user)     # is_active=False, queues purge_account
+
+A user's rows are deleted stage by stage (STAGES), CHUNK_SIZE rows per
+transaction, instead of one cascading user.delete(). Chunks bypass the per-row
+delete signals: their side effects are applied once per chunk - notifications,
+likes and dependent rows go in bulk DELETEs, snapshot files onto the storage
+deletion queue in one INSERT, log card versions in one UPDATE, follow graph
+changes in one INSERT. Progress (rows deleted per stage) is saved on the
+AccountDeletion row after every chunk.
+
+A purge_account run stops after ROWS_PER_RUN rows and requeues itself, so a
+heavy account never holds a worker for long. Stages are idempotent: a failed
+run is retried and picks up where the last committed chunk left off. The user
+row itself goes last, once little is left to cascade.
+"""
+import logging
+from collections import Counter
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+# Logs carry their comments, reactions and views with them
+LOG_CHUNK_SIZE = 50
+ROWS_PER_RUN = 5000
+
+STAGES = ('comments', 'comment_likes', 'reactions', 'notifications', 'log_views', 'follows', 'logs', 'account')
+
+
+def start_account_deletion(user):
+    """
+    Deactivate `user` and queue the purge of their data.
+
+    Returns:
+        AccountDeletion job (the existing one if a deletion is already underway)
+    """
+    from myapp.models import AccountDeletion
+    from myapp.utils.tasks import enqueue
+
+    with transaction.atomic():
+        job = AccountDeletion.objects.filter(user=user, status__in=['pending', 'running']).first()
+        if job is not None:
+            return job
+
+        # Inactive users can't log in, and their other sessions stop authenticating
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        job = AccountDeletion.objects.create(user=user, username=user.username, stage=STAGES[0])
+        enqueue('purge_account', {'job_id': job.id})
+    logger.info(f'Account deletion queued for {user.username} (job {job.id})')
+    return job
+
+
+def run_account_deletion(job, max_rows=ROWS_PER_RUN):
+    """
+    Advance a deletion job by up to `max_rows` rows.
+
+    Returns:
+        True once the account is fully deleted
+    """
+    if job.status == 'done':
+        return True
+    if job.status != 'running':
+        job.status = 'running'
+        job.started_at = job.started_at or timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+
+    userinfo_id = _userinfo_id(job)
+    deleted = 0
+    while job.stage in STAGES and deleted < max_rows:
+        purge = _STAGE_HANDLERS[job.stage]
+        with transaction.atomic():
+            # Without a profile there is nothing left to purge but the user row
+            count = purge(job, userinfo_id) if userinfo_id is not None or job.stage == 'account' else 0
+            if count:
+                job.progress[job.stage] = job.progress.get(job.stage, 0) + count
+                deleted += count
+            else:
+                job.stage = _next_stage(job.stage)
+            job.save(update_fields=['stage', 'progress'])
+
+    if job.stage not in STAGES:
+        job.status = 'done'
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'finished_at'])
+        logger.info(f'Account {job.username} deleted: {job.progress}')
+        return True
+
+    logger.info(f'Account deletion {job.id} ({job.username}) at {job.stage}: {job.progress}')
+    return False
+
+
+def _next_stage(stage):
+    index = STAGES.index(stage) + 1
+    return STAGES[index] if index < len(STAGES) else 'finished'
+
+
+def _userinfo_id(job):
+    from myapp.models import userinfo
+
+    if job.user_id is None:
+        return None
+    return userinfo.objects.filter(user_id=job.user_id).values_list('id', flat=True).first()
+
+
+def _raw_delete(model, values, column='id'):
+    """DELETE rows whose `column` is in `values`, without loading them or sending signals"""
+    if not values:
+        return
+    quote = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(values))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {quote(model._meta.db_table)} WHERE {quote(column)} IN ({placeholders})",
+            list(values),
+        )
+
+
+def _chunk(queryset, *fields, size=CHUNK_SIZE):
+    return list(queryset.order_by('id').values_list(*fields)[:size])
+
+
+# Stages: each deletes one chunk and returns its row count (0 when the stage is finished)
+
+def _purge_comments(job, userinfo_id):
+    """The user's comments, with the replies under them"""
+    from logs.models import Comment
+    from logs.utils.comment_threads import delete_comment_subtrees
+
+    ids = [comment_id for comment_id, in _chunk(Comment.objects.filter(user_id=userinfo_id), 'id')]
+    return delete_comment_subtrees(ids)
+
+
+def _purge_comment_likes(job, userinfo_id):
+    from logs.models import Comment
+
+    likes = Comment.likes.through.objects
+    ids = [like_id for like_id, in _chunk(likes.filter(userinfo_id=userinfo_id), 'id')]
+    likes.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def _purge_reactions(job, userinfo_id):
+    from logs.models import Notification, Reaction
+    from logs.utils.log_cards import bump_log_versions
+
+    rows = _chunk(Reaction.objects.filter(user_id=userinfo_id), 'id', 'mindlog_id')
+    ids = [reaction_id for reaction_id, _ in rows]
+    Notification.objects.filter(
+        action_content_type=ContentType.objects.get_for_model(Reaction),
+        action_object_id__in=ids,
+    ).delete()
+    _raw_delete(Reaction, ids)
+    bump_log_versions({log_id for _, log_id in rows})
+    return len(ids)
+
+
+def _purge_notifications(job, userinfo_id):
+    """Notifications the user received or triggered (including follow notifications)"""
+    from logs.models import Notification
+
+    notifications = Notification.objects.filter(Q(recipient_id=userinfo_id) | Q(actor_id=userinfo_id))
+    ids = [notification_id for notification_id, in _chunk(notifications, 'id')]
+    Notification.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def _purge_log_views(job, userinfo_id):
+    from logs.models import LogViews
+
+    ids = [view_id for view_id, in _chunk(LogViews.objects.filter(user_id=userinfo_id), 'id')]
+    LogViews.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def _purge_follows(job, userinfo_id):
+    """Follow edges in both directions; the graph and follower counts are patched per chunk"""
+    from myapp.models import follow
+    from myapp.utils.follow_graph import record_follow_changes
+    from myapp.utils.popular_developers import record_follower_change
+
+    edges = follow.objects.filter(Q(follower_id=userinfo_id) | Q(following_id=userinfo_id))
+    rows = _chunk(edges, 'id', 'follower_id', 'following_id')
+    _raw_delete(follow, [follow_id for follow_id, _, _ in rows])
+    record_follow_changes([(follower_id, following_id) for _, follower_id, following_id in rows], 'remove')
+
+    # The user's own leaderboard row goes with the account; only followed developers lose a follower
+    lost = Counter(following_id for _, follower_id, following_id in rows if follower_id == userinfo_id)
+    for following_id, count in lost.items():
+        record_follower_change(following_id, -count)
+    return len(rows)
+
+
+def _purge_logs(job, userinfo_id):
+    """
+    The user's logs with everything attached to them. Snapshot files and their
+    renditions are queued for deletion with one INSERT per chunk.
+    """
+    from logs.models import Comment, Log, LogViews, Notification, Reaction
+    from logs.utils.global_feed import invalidate_global_feed
+    from myapp.utils.images import iter_rendition_names
+    from myapp.utils.storage_deletion import queue_storage_deletion
+
+    logs = list(
+        Log.objects.filter(user_id=userinfo_id).order_by('id')
+        .only('id', 'snap_shot', 'snap_shot_variants')[:LOG_CHUNK_SIZE]
+    )
+    if not logs:
+        return 0
+    ids = [log.id for log in logs]
+    comments = Comment.objects.filter(mindlog_id__in=ids)
+
+    Notification.objects.filter(
+        Q(target_content_type=ContentType.objects.get_for_model(Log), target_object_id__in=ids)
+        | Q(action_content_type=ContentType.objects.get_for_model(Comment), action_object_id__in=comments.values('id'))
+    ).delete()
+    Comment.likes.through.objects.filter(comment__mindlog_id__in=ids).delete()
+    _raw_delete(Comment, ids, column='mindlog_id')
+    _raw_delete(Reaction, ids, column='mindlog_id')
+    LogViews.objects.filter(log_id__in=ids).delete()
+    _raw_delete(Log, ids)
+
+    names = []
+    for log in logs:
+        names.extend(iter_rendition_names(log.snap_shot_variants))
+        if log.snap_shot and log.snap_shot.name:
+            names.append(log.snap_shot.name)
+    queue_storage_deletion(names)
+    transaction.on_commit(invalidate_global_feed)
+    return len(ids)
+
+
+def _purge_account(job, userinfo_id):
+    """
+    The user row; what is left to cascade (profile, education, experience,
+    recommendations, leaderboard row) is small and goes through the regular
+    delete signals, which also queue the profile image deletion and mention
+    rebuild.
+    """
+    from django.contrib.auth.models import User
+
+    user = User.objects.filter(pk=job.user_id).first()
+    if user is None:
+        return 0
+    user.delete()
+    job.user_id = None
+    return 1
+
+
+_STAGE_HANDLERS = {
+    'comments': _purge_comments,
+    'comment_likes': _purge_comment_likes,
+    'reactions': _purge_reactions,
+    'notifications': _purge_notifications,
+    'log_views': _purge_log_views,
+    'follows': _purge_follows,
+    'logs': _purge_logs,
+    'account': _purge_account,
+}
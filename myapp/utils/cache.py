@@ -0,0 +1,431 @@
+"""
+Two-Tier Cache
+A small in-process LRU (L1) in front of the shared Django cache (L2, see CACHES).
+
+Usage:
+    from myapp.utils.cache import CacheNamespace
+
+    recommendation_cache = CacheNamespace('dev_recommendations', ttl=3600)
+    recommendation_cache.set(user.id, results)
+    recommendation_cache.get(user.id)
+    recommendation_cache.delete(user.id)     # one key, every worker
+    recommendation_cache.invalidate_all()    # whole namespace, every worker
+
+Keys are stored in L2 as "<namespace>:v<version>:<key>". invalidate_all() bumps
+the namespace version in L2, which orphans every key at once without scanning.
+
+Expensive computations should use get_or_compute(), which adds single-flight
+recomputation (a lock key in L2), probabilistic early refresh (XFetch) and
+serving the previous value while one worker recomputes:
+
+    recommendation_cache.get_or_compute(user.id, lambda: compute(user))
+
+Cross-worker consistency: deletes and version bumps hit L2 immediately. Other
+workers may keep serving their L1 copy for up to CACHE_L1_TTL seconds (default 5),
+so keep L1 short. Values in L1 are shared between requests: treat cached values
+as read-only.
+"""
+import logging
+import math
+import random
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_L1_MAX_ENTRIES = 1000
+DEFAULT_L1_TTL_SECONDS = 5
+
+# get_or_compute defaults
+DEFAULT_STALE_TTL_SECONDS = 300  # how long past expiry a value may still be served
+DEFAULT_XFETCH_BETA = 1.0  # >1 refreshes earlier, <1 later
+LOCK_TTL_SECONDS = 30  # recompute lock lifetime (covers a crashed worker)
+LOCK_WAIT_SECONDS = 2.0  # how long a cold-cache reader waits for another worker's result
+LOCK_POLL_SECONDS = 0.05
+
+_MISSING = object()
+
+
+class LocalLRU:
+    """Thread-safe in-process LRU with per-entry expiry"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=_MISSING):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_l1 = LocalLRU(getattr(settings, 'CACHE_L1_MAX_ENTRIES', DEFAULT_L1_MAX_ENTRIES))
+
+_metrics = {'l1_hits': 0, 'l2_hits': 0, 'misses': 0, 'l2_errors': 0}
+# namespace -> counters from get_or_compute
+_namespace_metrics = defaultdict(lambda: {
+    'hits': 0,
+    'stale_serves': 0,
+    'early_refreshes': 0,
+    'lock_waits': 0,
+    'recomputes': 0,
+    'recompute_seconds': 0.0,
+})
+_metrics_lock = threading.Lock()
+
+
+def _record(name, namespace=None, amount=1):
+    with _metrics_lock:
+        if namespace is None:
+            _metrics[name] += amount
+        else:
+            _namespace_metrics[namespace][name] += amount
+
+
+def get_cache_metrics():
+    """
+    Per-process cache counters.
+
+    Returns:
+        Dictionary with tier hit/miss counters and a 'namespaces' dictionary of
+        get_or_compute counters (hits, stale serves, early refreshes, lock waits,
+        recomputes and average recompute time)
+    """
+    with _metrics_lock:
+        metrics = dict(_metrics)
+        namespaces = {name: dict(counters) for name, counters in _namespace_metrics.items()}
+    for counters in namespaces.values():
+        counters['avg_recompute_seconds'] = (
+            counters['recompute_seconds'] / counters['recomputes'] if counters['recomputes'] else 0.0
+        )
+    metrics['namespaces'] = namespaces
+    return metrics
+
+
+def _new_version():
+    return int(time.time() * 1000)
+
+
+def _l2():
+    return caches[getattr(settings, 'CACHE_L2_ALIAS', 'default')]
+
+
+def _l1_ttl():
+    return getattr(settings, 'CACHE_L1_TTL', DEFAULT_L1_TTL_SECONDS)
+
+
+class CacheNamespace:
+    """
+    A versioned group of cache keys sharing a default TTL.
+
+    L2 failures (e.g. Redis unavailable) are logged and treated as misses so a
+    cache outage degrades to recomputation instead of errors.
+    """
+
+    def __init__(self, name, ttl, l1_ttl=None):
+        """
+        Args:
+            name: Namespace prefix (e.g. 'dev_recommendations')
+            ttl: Default L2 timeout in seconds
+            l1_ttl: In-process timeout (defaults to CACHE_L1_TTL, capped at ttl)
+        """
+        self.name = name
+        self.ttl = ttl
+        self.l1_ttl = l1_ttl
+
+    # Versioning
+
+    def _version_key(self):
+        return f'nsver:{self.name}'
+
+    def _version(self):
+        """Current namespace version, cached in L1 briefly to save an L2 round-trip"""
+        version_key = self._version_key()
+        version = _l1.get(version_key)
+        if version is not _MISSING:
+            return version
+        try:
+            l2 = _l2()
+            version = l2.get(version_key)
+            if version is None:
+                # First use, or the version was evicted: start from a fresh value so
+                # entries written under an older version can never resurface
+                l2.add(version_key, _new_version(), None)
+                version = l2.get(version_key)
+        except Exception as e:
+            _record('l2_errors')
+            logger.warning(f'Cache version lookup failed for {self.name}: {e}')
+            version = None
+        version = version or 1
+        _l1.set(version_key, version, _l1_ttl())
+        return version
+
+    def _key(self, key, version=None):
+        return f'{self.name}:v{version or self._version()}:{key}'
+
+    def _local_ttl(self, ttl):
+        local = self.l1_ttl if self.l1_ttl is not None else _l1_ttl()
+        return min(local, ttl) if ttl else local
+
+    # Access
+
+    def get(self, key, default=None):
+        full_key = self._key(key)
+
+        value = _l1.get(full_key)
+        if value is not _MISSING:
+            _record('l1_hits')
+            return value
+
+        try:
+            value = _l2().get(full_key, _MISSING)
+        except Exception as e:
+            _record('l2_errors')
+            logger.warning(f'Cache get failed for {full_key}: {e}')
+            value = _MISSING
+
+        if value is _MISSING:
+            _record('misses')
+            return default
+
+        _record('l2_hits')
+        _l1.set(full_key, value, self._local_ttl(self.ttl))
+        return value
+
+    def get_many(self, keys):
+        """
+        Read many keys: L1 first, then the rest from L2 in one round-trip.
+
+        Returns:
+            Dictionary of the keys that were found
+        """
+        version = self._version()
+        found = {}
+        missing = {}
+        for key in keys:
+            full_key = self._key(key, version)
+            value = _l1.get(full_key)
+            if value is _MISSING:
+                missing[full_key] = key
+            else:
+                _record('l1_hits')
+                found[key] = value
+        if not missing:
+            return found
+
+        try:
+            values = _l2().get_many(list(missing))
+        except Exception as e:
+            _record('l2_errors')
+            logger.warning(f'Cache get_many failed for {self.name}: {e}')
+            values = {}
+
+        local_ttl = self._local_ttl(self.ttl)
+        for full_key, key in missing.items():
+            if full_key in values:
+                _record('l2_hits')
+                found[key] = values[full_key]
+                _l1.set(full_key, values[full_key], local_ttl)
+            else:
+                _record('misses')
+        return found
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl or self.ttl
+        full_key = self._key(key)
+        _l1.set(full_key, value, self._local_ttl(ttl))
+        try:
+            _l2().set(full_key, value, ttl)
+        except Exception as e:
+            _record('l2_errors')
+            logger.warning(f'Cache set failed for {full_key}: {e}')
+
+    def set_many(self, mapping, ttl=None):
+        """
+        Write many keys to L2 in one round-trip. L1 is left alone so bulk
+        warm-ups don't flush this worker's hot entries.
+        """
+        if not mapping:
+            return
+        ttl = ttl or self.ttl
+        version = self._version()
+        full_mapping = {self._key(key, version): value for key, value in mapping.items()}
+        for full_key in full_mapping:
+            _l1.delete(full_key)
+        try:
+            _l2().set_many(full_mapping, ttl)
+        except Exception as e:
+            _record('l2_errors')
+            logger.warning(f'Cache set_many failed for {self.name}: {e}')
+
+    def delete(self, *keys):
+        """Delete keys from L2 and this worker's L1"""
+        full_keys = [self._key(key) for key in keys]
+        for full_key in full_keys:
+            _l1.delete(full_key)
+        try:
+            _l2().delete_many(full_keys)
+        except Exception as e:
+            _record('l2_errors')
+            logger.warning(f'Cache delete failed for {self.name}: {e}')
+
+    def get_or_set(self, key, compute, ttl=None):
+        """Return the cached value, or compute, store and return it"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value, ttl)
+        return value
+
+    def invalidate_all(self):
+        """Orphan every key in the namespace by bumping its version"""
+        l2 = _l2()
+        try:
+            try:
+                version = l2.incr(self._version_key())
+            except ValueError:
+                # No version stored (evicted): any fresh value orphans the old keys
+                version = _new_version()
+                l2.set(self._version_key(), version, None)
+        except Exception as e:
+            _record('l2_errors')
+            logger.warning(f'Cache namespace invalidation failed for {self.name}: {e}')
+            return
+        _l1.delete_prefix(f'{self.name}:')
+        _l1.set(self._version_key(), version, _l1_ttl())
+
+    # Stampede protection
+
+    def get_or_compute(self, key, compute, ttl=None, stale_ttl=DEFAULT_STALE_TTL_SECONDS, beta=DEFAULT_XFETCH_BETA):
+        """
+        Return the cached value, recomputing it on at most one worker at a time.
+
+        - Fresh values are served, but each read may volunteer to refresh early with
+          probability rising towards expiry (XFetch: expiry - delta * beta * ln(rand)),
+          so hot keys are usually refreshed before they expire.
+        - Expired values stay in L2 for `stale_ttl` more seconds and are served
+          while the lock holder recomputes.
+        - On a cold key, readers that don't get the lock wait briefly for the
+          holder's result, then compute themselves as a last resort.
+
+        Args:
+            key: Cache key within the namespace
+            compute: Zero-argument callable producing the value
+            ttl: Freshness lifetime in seconds (defaults to the namespace TTL)
+            stale_ttl: Extra seconds an expired value may be served
+            beta: XFetch aggressiveness
+
+        Returns:
+            The cached or freshly computed value
+        """
+        ttl = ttl or self.ttl
+        entry = self.get(key)
+
+        if entry is not None:
+            value, delta, expires_at = entry
+            now = time.time()
+            if now < expires_at:
+                # log(1 - random()) is in (-inf, 0], so this moves "now" forward
+                if now - delta * beta * math.log(1.0 - random.random()) < expires_at:
+                    _record('hits', self.name)
+                    return value
+                if self._acquire_lock(key):
+                    _record('early_refreshes', self.name)
+                    return self._recompute(key, compute, ttl, stale_ttl)
+                _record('hits', self.name)
+                return value
+
+            if self._acquire_lock(key):
+                return self._recompute(key, compute, ttl, stale_ttl)
+            _record('stale_serves', self.name)
+            return value
+
+        if self._acquire_lock(key):
+            return self._recompute(key, compute, ttl, stale_ttl)
+
+        # Someone else is computing a cold key: wait for their result
+        _record('lock_waits', self.name)
+        deadline = time.monotonic() + LOCK_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_SECONDS)
+            entry = self._get_shared(key)
+            if entry is not None:
+                _record('hits', self.name)
+                return entry[0]
+        return self._recompute(key, compute, ttl, stale_ttl, release=False)
+
+    def _lock_key(self, key):
+        return f'lock:{self._key(key)}'
+
+    def _acquire_lock(self, key):
+        try:
+            return _l2().add(self._lock_key(key), 1, LOCK_TTL_SECONDS)
+        except Exception as e:
+            _record('l2_errors')
+            logger.warning(f'Cache lock failed for {self.name}:{key}: {e}')
+            # Without a shared lock, fall back to computing locally
+            return True
+
+    def _release_lock(self, key):
+        try:
+            _l2().delete(self._lock_key(key))
+        except Exception as e:
+            _record('l2_errors')
+            logger.warning(f'Cache unlock failed for {self.name}:{key}: {e}')
+
+    def _get_shared(self, key):
+        """Read straight from L2, bypassing this worker's L1"""
+        full_key = self._key(key)
+        try:
+            entry = _l2().get(full_key)
+        except Exception:
+            return None
+        if entry is not None:
+            _l1.set(full_key, entry, self._local_ttl(self.ttl))
+        return entry
+
+    def _recompute(self, key, compute, ttl, stale_ttl, release=True):
+        started = time.perf_counter()
+        try:
+            value = compute()
+            delta = time.perf_counter() - started
+            # Entry: (value, compute seconds, fresh-until timestamp); kept in L2 through the stale window
+            self.set(key, (value, delta, time.time() + ttl), ttl + stale_ttl)
+        finally:
+            if release:
+                self._release_lock(key)
+        _record('recomputes', self.name)
+        _record('recompute_seconds', self.name, delta)
+        return value
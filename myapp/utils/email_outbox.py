@@ -0,0 +1,214 @@
+"""
+Email Outbox
+Queues outgoing email in the database and delivers it in batches through Brevo.
+
+Usage (settings.py):
+    EMAIL_BACKEND = 'myapp.utils.email_outbox.OutboxEmailBackend'
+
+send_mail()/allauth calls return as soon as the rows are written. Delivery runs
+in the periodic `deliver_outbound_emails` task (every DELIVERY_INTERVAL, in
+`manage.py run_tasks`) or standalone with `manage.py send_queued_emails`. Messages sharing content are merged into a
+single messageVersions request, and requests are sent concurrently over a
+pooled session (helpers.brevo.client). Delivery metrics are computed from the
+outbox rows by get_delivery_metrics() (`send_queued_emails --stats`). Sent and
+failed rows are deleted after OUTBOX_RETENTION by the daily
+`prune_outbound_emails` task.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Min, Q
+from django.utils import timezone
+
+from helpers.brevo import client
+from helpers.brevo.brevo_backend import BrevoEmailBackend
+
+logger = logging.getLogger(__name__)
+
+CLAIM_BATCH_SIZE = 500
+RETRY_BASE_DELAY_SECONDS = 60
+# Rows stuck in 'sending' this long (crashed worker) are claimed again
+SENDING_TIMEOUT_SECONDS = 600
+
+# Period of the deliver_outbound_emails sweep, i.e. the worst-case delay of a new email
+DELIVERY_INTERVAL = timedelta(seconds=5)
+# Window of sent emails summarized by get_delivery_metrics()
+METRICS_WINDOW = timedelta(hours=1)
+# Sent and failed rows (with their full payloads) are kept this long for inspection
+OUTBOX_RETENTION = timedelta(days=14)
+PRUNE_BATCH_SIZE = 1000
+
+
+class OutboxEmailBackend(BrevoEmailBackend):
+    """
+    Email backend that writes Brevo payloads to the OutboundEmail outbox
+    instead of calling the API in the request.
+    """
+
+    def send_messages(self, email_messages):
+        """
+        Queue EmailMessage objects for delivery.
+
+        Returns:
+            Number of messages queued
+        """
+        from myapp.models import OutboundEmail
+
+        try:
+            rows = []
+            for message in email_messages or []:
+                payload = self._build_payload(message)
+                if payload is None:
+                    continue
+                rows.append(OutboundEmail(
+                    payload=payload,
+                    recipients=', '.join(r['email'] for r in payload['to']),
+                    subject=payload.get('subject', '')[:255],
+                ))
+
+            if not rows:
+                return 0
+
+            OutboundEmail.objects.bulk_create(rows)
+            if getattr(settings, 'BACKGROUND_TASKS_EAGER', False):
+                # Development convenience, like enqueue(): deliver right after commit
+                transaction.on_commit(deliver_pending)
+            return len(rows)
+        except Exception as e:
+            logger.error(f"Failed to queue emails: {e}", exc_info=True)
+            if not self.fail_silently:
+                raise
+            return 0
+
+
+def claim_outbound(limit=CLAIM_BATCH_SIZE):
+    """
+    Claim due outbox rows for this worker (SKIP LOCKED, like claim_tasks).
+    Claimed rows get a lease via next_attempt_at so a crashed worker's rows come back.
+    """
+    from myapp.models import OutboundEmail
+
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutboundEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(Q(status='queued') | Q(status='sending'), next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:limit]
+        )
+        if emails:
+            OutboundEmail.objects.filter(id__in=[e.id for e in emails]).update(
+                status='sending',
+                attempts=F('attempts') + 1,
+                next_attempt_at=now + timedelta(seconds=SENDING_TIMEOUT_SECONDS),
+            )
+            for email in emails:
+                email.status = 'sending'
+                email.attempts += 1
+    return emails
+
+
+def deliver_pending(limit=CLAIM_BATCH_SIZE):
+    """
+    Claim and deliver up to `limit` queued emails.
+
+    Returns:
+        Number of emails processed (sent, retried or failed)
+    """
+    from myapp.models import OutboundEmail
+
+    emails = claim_outbound(limit)
+    if not emails:
+        return 0
+
+    by_id = {email.id: email for email in emails}
+    batches = client.build_batches([(email.id, email.payload) for email in emails])
+    results = client.send_batches(batches)
+
+    now = timezone.now()
+    sent, retried, failed = [], [], []
+    for ids, result in results:
+        for index, email_id in enumerate(ids):
+            email = by_id[email_id]
+            if result.ok:
+                email.status = 'sent'
+                email.sent_at = now
+                email.last_error = ''
+                if index < len(result.message_ids):
+                    email.message_id = result.message_ids[index][:255]
+                sent.append(email)
+            elif result.retryable and email.attempts < email.max_attempts:
+                delay = RETRY_BASE_DELAY_SECONDS * (2 ** (email.attempts - 1))
+                email.status = 'queued'
+                email.next_attempt_at = now + timedelta(seconds=delay)
+                email.last_error = f'{result.status_code}: {result.error}'
+                retried.append(email)
+            else:
+                email.status = 'failed'
+                email.last_error = f'{result.status_code}: {result.error}'
+                failed.append(email)
+
+    OutboundEmail.objects.bulk_update(
+        sent + retried + failed,
+        ['status', 'sent_at', 'message_id', 'next_attempt_at', 'last_error'],
+    )
+
+    if retried or failed:
+        logger.warning(f'Email delivery: {len(sent)} sent, {len(retried)} retrying, {len(failed)} failed')
+    return len(emails)
+
+
+def prune_outbox(retention=OUTBOX_RETENTION, batch_size=PRUNE_BATCH_SIZE):
+    """
+    Delete sent and failed outbox rows older than `retention`, in batches.
+    A failed row's next_attempt_at is the lease of its last attempt.
+
+    Returns:
+        Number of rows deleted
+    """
+    from myapp.models import OutboundEmail
+
+    cutoff = timezone.now() - retention
+    finished = OutboundEmail.objects.filter(
+        Q(status='sent', sent_at__lt=cutoff) | Q(status='failed', next_attempt_at__lt=cutoff)
+    )
+    deleted = 0
+    while True:
+        ids = list(finished.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += OutboundEmail.objects.filter(id__in=ids).delete()[0]
+
+
+def get_delivery_metrics(window=METRICS_WINDOW):
+    """
+    Delivery metrics for monitoring, computed from the outbox rows so every
+    process (and `send_queued_emails --stats`) sees the same numbers.
+
+    Args:
+        window: timedelta of sent emails to summarize
+
+    Returns:
+        Dictionary with 'outbox' (row counts by status), 'sent' and
+        'avg_delivery_seconds' (queue-to-sent time) within `window`, 'retrying'
+        (emails waiting for a retry), 'failed' and 'oldest_queued_seconds'
+    """
+    from myapp.models import OutboundEmail
+
+    now = timezone.now()
+    outbox = dict(OutboundEmail.objects.values_list('status').annotate(total=Count('id')).order_by())
+    sent = OutboundEmail.objects.filter(status='sent', sent_at__gte=now - window).aggregate(
+        total=Count('id'),
+        avg_delivery=Avg(ExpressionWrapper(F('sent_at') - F('created_at'), output_field=DurationField())),
+    )
+    oldest = OutboundEmail.objects.filter(status='queued').aggregate(oldest=Min('created_at'))['oldest']
+    return {
+        'outbox': outbox,
+        'sent': sent['total'],
+        'avg_delivery_seconds': sent['avg_delivery'].total_seconds() if sent['avg_delivery'] else 0.0,
+        'retrying': OutboundEmail.objects.filter(status='queued', attempts__gt=0).count(),
+        'failed': outbox.get('failed', 0),
+        'oldest_queued_seconds': (now - oldest).total_seconds() if oldest else 0.0,
+    }
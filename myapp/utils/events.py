@@ -0,0 +1,187 @@
+"""
+Domain Events
+Transactional outbox for side effects of writes (notifications, counters,
+timelines, caches).
+
+Usage:
+    from myapp.utils.events import on_event, publish
+
+    publish('comment.created', comment_id=comment.id, log_id=comment.mindlog_id)
+
+    # <app>/handlers.py
+    @on_event('comment.created')
+    def notify_log_owner(comment_id, log_id, **payload):
+        ...
+
+publish() writes one DomainEvent row in the caller's transaction, so an event
+exists exactly when the change that caused it was committed; that INSERT is the
+whole cost to the writer. The periodic `dispatch_domain_events` task (every
+DISPATCH_INTERVAL) and `process_events` claim due events (SKIP LOCKED, like
+claim_tasks) and run their handlers until none are left; several `run_tasks` or
+`process_events` processes form the worker pool.
+
+Delivery is at-least-once. Each handler runs in its own transaction together
+with recording its name in the event's `handled` list, so a handler whose
+database work committed is never run again for that event (counters are not
+double-applied), while a failing handler is retried with exponential backoff
+without repeating the others. Handlers must still tolerate their rows being
+gone (the object may have been deleted before the event was processed) and
+keep non-database effects (cache deletes) idempotent.
+
+Lag (age of the oldest unprocessed event) and retry/failure counts are computed
+from the outbox rows by get_event_metrics() (`manage.py process_events --stats`).
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+logger = logging.getLogger(__name__)
+
+# event name -> [(handler key, callable)]
+EVENT_HANDLERS = {}
+
+CLAIM_BATCH_SIZE = 100
+RETRY_BASE_DELAY_SECONDS = 30
+# Rows stuck in 'processing' this long (crashed worker) are claimed again
+PROCESSING_TIMEOUT_SECONDS = 300
+# Period of the dispatch_domain_events sweep, i.e. the worst-case delivery delay
+DISPATCH_INTERVAL = timedelta(seconds=5)
+
+def on_event(*names):
+    """
+    Register a function as a handler for one or more event names.
+    The handler is called with the event's payload as keyword arguments.
+    """
+    def decorator(func):
+        key = f'{func.__module__}.{func.__name__}'
+        for name in names:
+            EVENT_HANDLERS.setdefault(name, []).append((key, func))
+        return func
+    return decorator
+
+
+def autodiscover():
+    """Import every installed app's handlers module so event handlers get registered"""
+    autodiscover_modules('handlers')
+
+
+def publish(name, **payload):
+    """
+    Record a domain event in the current transaction.
+
+    Returns:
+        DomainEvent object
+    """
+    from myapp.models import DomainEvent
+
+    event = DomainEvent.objects.create(name=name, payload=payload)
+    if getattr(settings, 'BACKGROUND_TASKS_EAGER', False):
+        # Development convenience, like enqueue(): dispatch right after commit
+        transaction.on_commit(dispatch_pending)
+    return event
+
+
+def claim_events(limit=CLAIM_BATCH_SIZE):
+    """
+    Claim due events for this worker, oldest first.
+    Claimed rows get a lease via next_attempt_at so a crashed worker's events come back.
+    """
+    from myapp.models import DomainEvent
+
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            DomainEvent.objects
+            .select_for_update(skip_locked=True)
+            .filter(Q(status='pending') | Q(status='processing'), next_attempt_at__lte=now)
+            .order_by('id')[:limit]
+        )
+        if events:
+            DomainEvent.objects.filter(id__in=[event.id for event in events]).update(
+                status='processing',
+                attempts=F('attempts') + 1,
+                next_attempt_at=now + timedelta(seconds=PROCESSING_TIMEOUT_SECONDS),
+            )
+            for event in events:
+                event.status = 'processing'
+                event.attempts += 1
+    return events
+
+
+def dispatch_event(event):
+    """
+    Run the handlers of one claimed event that haven't succeeded yet.
+
+    Returns:
+        True if every handler has now succeeded
+    """
+    from myapp.models import DomainEvent
+
+    handled = list(event.handled)
+    errors = []
+    for key, func in EVENT_HANDLERS.get(event.name, []):
+        if key in handled:
+            continue
+        try:
+            with transaction.atomic():
+                func(**event.payload)
+                handled.append(key)
+                DomainEvent.objects.filter(pk=event.pk).update(handled=handled)
+        except Exception as e:
+            errors.append(f'{key}: {type(e).__name__}: {e}')
+            logger.warning(f'Handler {key} failed for {event}: {e}', exc_info=True)
+    event.handled = handled
+
+    now = timezone.now()
+    if not errors:
+        DomainEvent.objects.filter(pk=event.pk).delete()
+        return True
+
+    event.last_error = '\n'.join(errors)
+    if event.attempts < event.max_attempts:
+        event.status = 'pending'
+        event.next_attempt_at = now + timedelta(seconds=RETRY_BASE_DELAY_SECONDS * (2 ** (event.attempts - 1)))
+    else:
+        event.status = 'failed'
+        logger.error(f'Event {event} failed permanently: {event.last_error}')
+    event.save(update_fields=['status', 'next_attempt_at', 'last_error'])
+    return False
+
+
+def dispatch_pending(limit=CLAIM_BATCH_SIZE):
+    """
+    Claim and dispatch up to `limit` due events.
+
+    Returns:
+        Number of events processed (completed, retried or failed)
+    """
+    events = claim_events(limit)
+    for event in events:
+        dispatch_event(event)
+    return len(events)
+
+
+def get_event_metrics():
+    """
+    Outbox metrics for monitoring, computed from the event rows.
+
+    Returns:
+        Dictionary with 'outbox' (row counts by status), 'retrying' (events
+        waiting for a retry), 'failed' and 'lag_seconds', the age of the oldest
+        unprocessed event (0 when caught up)
+    """
+    from myapp.models import DomainEvent
+
+    outbox = dict(DomainEvent.objects.values_list('status').annotate(total=Count('id')).order_by())
+    oldest = DomainEvent.objects.exclude(status='failed').aggregate(oldest=Min('created_at'))['oldest']
+    return {
+        'outbox': outbox,
+        'retrying': DomainEvent.objects.filter(status='pending', attempts__gt=0).count(),
+        'failed': outbox.get('failed', 0),
+        'lag_seconds': (timezone.now() - oldest).total_seconds() if oldest else 0.0,
+    }
@@ -0,0 +1,396 @@
+"""
+Follow Graph
+Process-local, read-optimized copy of the follow table as NumPy CSR arrays.
+
+    graph = get_follow_graph()
+    graph.neighbors(user_id)                      # ids user_id follows (sorted)
+    graph.mutual_counts(user_id, candidate_ids)   # |following(user) ∩ following(c)| per candidate
+    graph.mutuals(user_id, other_id)              # ids both follow
+    graph.two_hop(user_id)                        # friends-of-friends, excluding direct follows
+    graph.is_following_many(user_id, target_ids)  # bool array
+
+Layout: row i of the CSR (indices[indptr[i]:indptr[i+1]]) holds the sorted ids
+userinfo i follows. Node ids are userinfo primary keys.
+
+Freshness: follow/unfollow signals append to the FollowChange table and, after
+commit, patch this worker's graph directly. Every worker replays FollowChange
+rows past its watermark at most every REFRESH_INTERVAL_SECONDS, so follows
+handled elsewhere show up within a couple of seconds. Changes are kept in a
+small overlay; the CSR arrays are rebuilt from the follow table hourly or when
+the overlay grows too large, in a background thread while the current graph
+keeps serving.
+
+Ids are allocated before commit, so a change can become visible after a higher
+id was already replayed. Ids skipped over by the watermark are remembered and
+looked up again for GAP_TIMEOUT_SECONDS, and a rebuilt graph replays that much
+history on top of its snapshot. Each edge remembers the id of the change last
+applied to it, so replaying a change twice or after a newer one is a no-op.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL_SECONDS = 2
+FULL_REBUILD_SECONDS = 3600
+MAX_OVERLAY_CHANGES = 50000
+CHANGE_BATCH_SIZE = 10000
+# How long a skipped change id is looked up again (longest expected follow transaction)
+GAP_TIMEOUT_SECONDS = 60
+MAX_TRACKED_GAPS = 10000
+# FollowChange rows older than this are pruned; must exceed FULL_REBUILD_SECONDS
+CHANGE_RETENTION = timedelta(days=1)
+
+_EMPTY = np.zeros(0, dtype=np.int64)
+
+
+class FollowGraph:
+    """CSR adjacency (follower -> following) plus an overlay of recent changes"""
+
+    def __init__(self, indptr, indices, change_watermark=0):
+        self.indptr = indptr
+        self.indices = indices
+        self.num_nodes = len(indptr) - 1
+        self.change_watermark = change_watermark
+        self.built_at = time.monotonic()
+        self.last_refresh = self.built_at
+        self._added = {}
+        self._removed = {}
+        self.overlay_changes = 0
+        # (follower_id, following_id) -> id of the last change applied to the edge
+        self._edge_changes = {}
+        # Change ids below the watermark that weren't visible yet -> when they were skipped
+        self._gaps = {}
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+
+    @classmethod
+    def from_edges(cls, followers, followings, num_nodes=None, change_watermark=0):
+        """
+        Build a graph from parallel arrays of follower and following ids.
+        """
+        src = np.asarray(followers, dtype=np.int64)
+        dst = np.asarray(followings, dtype=np.int64)
+        if num_nodes is None:
+            num_nodes = int(max(src.max(), dst.max())) + 1 if len(src) else 0
+
+        order = np.lexsort((dst, src))
+        src = src[order]
+        dst = dst[order]
+
+        indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=num_nodes), out=indptr[1:])
+        return cls(indptr, dst.astype(np.int32), change_watermark)
+
+    @classmethod
+    def load(cls):
+        """Build from the follow table, positioned after the latest FollowChange"""
+        from myapp.models import follow, FollowChange
+
+        # Read the watermark first and leave GAP_TIMEOUT_SECONDS of history below it:
+        # changes racing with the load, or committed late, are replayed (idempotently) later
+        cutoff = timezone.now() - timedelta(seconds=GAP_TIMEOUT_SECONDS)
+        watermark = (
+            FollowChange.objects.filter(created_at__lt=cutoff)
+            .order_by('-id').values_list('id', flat=True).first() or 0
+        )
+
+        started = time.perf_counter()
+        edges = np.array(list(follow.objects.values_list('follower_id', 'following_id').iterator(chunk_size=20000)),
+                         dtype=np.int64).reshape(-1, 2)
+        graph = cls.from_edges(edges[:, 0], edges[:, 1], change_watermark=watermark)
+        logger.info(
+            f'Loaded follow graph: {len(edges)} edges, {graph.num_nodes} nodes, '
+            f'{graph.nbytes / 1024 / 1024:.1f} MiB in {time.perf_counter() - started:.2f}s'
+        )
+        return graph
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.indices.nbytes
+
+    # Updates
+
+    def apply(self, follower_id, following_id, op, change_id=None):
+        """
+        Record a follow ('add') or unfollow ('remove') in the overlay; idempotent.
+        With `change_id`, changes older than the edge's last applied change are ignored.
+        """
+        with self._lock:
+            if change_id is not None:
+                key = (follower_id, following_id)
+                if change_id <= self._edge_changes.get(key, 0):
+                    return
+                self._edge_changes[key] = change_id
+            if op == 'add':
+                self._removed.get(follower_id, set()).discard(following_id)
+                self._added.setdefault(follower_id, set()).add(following_id)
+            else:
+                self._added.get(follower_id, set()).discard(following_id)
+                self._removed.setdefault(follower_id, set()).add(following_id)
+            self.overlay_changes += 1
+
+    def refresh(self):
+        """Replay FollowChange rows past the watermark and skipped ids that have committed since"""
+        from myapp.models import FollowChange
+
+        # Concurrent callers just use the graph as it is
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            now = time.monotonic()
+            if self._gaps:
+                late = (
+                    FollowChange.objects.filter(id__in=list(self._gaps))
+                    .order_by('id').values_list('id', 'follower_id', 'following_id', 'op')
+                )
+                for change_id, follower_id, following_id, op in late:
+                    self.apply(follower_id, following_id, op, change_id)
+                    del self._gaps[change_id]
+                # Rolled back (or sequence-cached) ids never show up
+                self._gaps = {change_id: seen for change_id, seen in self._gaps.items()
+                              if now - seen < GAP_TIMEOUT_SECONDS}
+
+            while True:
+                changes = list(
+                    FollowChange.objects.filter(id__gt=self.change_watermark)
+                    .order_by('id')
+                    .values_list('id', 'follower_id', 'following_id', 'op')[:CHANGE_BATCH_SIZE]
+                )
+                for change_id, follower_id, following_id, op in changes:
+                    if change_id > self.change_watermark + 1:
+                        self._track_gaps(self.change_watermark + 1, change_id, now)
+                    self.apply(follower_id, following_id, op, change_id)
+                    self.change_watermark = change_id
+                if len(changes) < CHANGE_BATCH_SIZE:
+                    break
+            self.last_refresh = time.monotonic()
+        finally:
+            self._refresh_lock.release()
+
+    def _track_gaps(self, start, stop, now):
+        room = MAX_TRACKED_GAPS - len(self._gaps)
+        if stop - start > room:
+            logger.warning(f'Follow graph: not tracking {stop - start - max(room, 0)} skipped change ids')
+            start = stop - max(room, 0)
+        for change_id in range(start, stop):
+            self._gaps[change_id] = now
+
+    # Reads
+
+    def _overlay(self, node):
+        with self._lock:
+            added = self._added.get(node)
+            removed = self._removed.get(node)
+            return (set(added) if added else None), (set(removed) if removed else None)
+
+    def _overlay_nodes(self):
+        with self._lock:
+            return {node for node, ids in self._added.items() if ids} | \
+                   {node for node, ids in self._removed.items() if ids}
+
+    def _base_row(self, node):
+        if 0 <= node < self.num_nodes:
+            return self.indices[self.indptr[node]:self.indptr[node + 1]].astype(np.int64)
+        return _EMPTY
+
+    def neighbors(self, node):
+        """Sorted ids `node` follows"""
+        row = self._base_row(node)
+        added, removed = self._overlay(node)
+        if removed:
+            row = row[~np.isin(row, np.fromiter(removed, dtype=np.int64))]
+        if added:
+            row = np.union1d(row, np.fromiter(added, dtype=np.int64))
+        return row
+
+    def _gather(self, nodes):
+        """
+        Concatenate the base rows of many nodes.
+
+        Returns:
+            (flat ids, row lengths) so results can be split or counted per node
+        """
+        nodes = np.asarray(nodes, dtype=np.int64)
+        in_range = (nodes >= 0) & (nodes < self.num_nodes)
+        starts = np.zeros(len(nodes), dtype=np.int64)
+        lengths = np.zeros(len(nodes), dtype=np.int64)
+        starts[in_range] = self.indptr[nodes[in_range]]
+        lengths[in_range] = self.indptr[nodes[in_range] + 1] - starts[in_range]
+
+        total = int(lengths.sum())
+        if total == 0:
+            return _EMPTY, lengths
+        # Position of each output element inside its row, shifted to the row start
+        row_offsets = np.cumsum(lengths) - lengths
+        positions = np.repeat(starts - row_offsets, lengths) + np.arange(total)
+        return self.indices[positions].astype(np.int64), lengths
+
+    def mutual_counts(self, node, candidates):
+        """
+        Count, for each candidate, the ids both `node` and the candidate follow.
+
+        Returns:
+            int64 array aligned with `candidates`
+        """
+        candidates = np.asarray(candidates, dtype=np.int64)
+        mine = self.neighbors(node)
+        if len(candidates) == 0 or len(mine) == 0:
+            return np.zeros(len(candidates), dtype=np.int64)
+
+        flat, lengths = self._gather(candidates)
+        hits = np.isin(flat, mine, assume_unique=False)
+        owners = np.repeat(np.arange(len(candidates)), lengths)
+        counts = np.bincount(owners, weights=hits, minlength=len(candidates)).astype(np.int64)
+
+        # Candidates with pending changes are recounted exactly
+        overlay_nodes = self._overlay_nodes()
+        if overlay_nodes:
+            for i, candidate in enumerate(candidates.tolist()):
+                if candidate in overlay_nodes:
+                    counts[i] = len(np.intersect1d(self.neighbors(candidate), mine, assume_unique=True))
+        return counts
+
+    def mutuals(self, node, other):
+        """Sorted ids both `node` and `other` follow"""
+        return np.intersect1d(self.neighbors(node), self.neighbors(other), assume_unique=True)
+
+    def neighbors_of_many(self, nodes):
+        """Sorted union of the ids followed by any of `nodes`"""
+        nodes = np.asarray(nodes, dtype=np.int64)
+        if len(nodes) == 0:
+            return _EMPTY
+
+        overlay_nodes = self._overlay_nodes()
+        if overlay_nodes:
+            patched = np.fromiter((n for n in nodes.tolist() if n in overlay_nodes), dtype=np.int64)
+            plain = nodes[~np.isin(nodes, patched)] if len(patched) else nodes
+        else:
+            patched, plain = _EMPTY, nodes
+
+        flat, _ = self._gather(plain)
+        parts = [flat] + [self.neighbors(n) for n in patched.tolist()]
+        return np.unique(np.concatenate(parts))
+
+    def two_hop(self, node, direct=None):
+        """
+        Friends-of-friends: ids followed by people `node` follows, excluding
+        `node` itself and its direct follows.
+
+        Args:
+            direct: Direct follow ids if already known (defaults to the graph's)
+        """
+        direct = self.neighbors(node) if direct is None else np.asarray(sorted(direct), dtype=np.int64)
+        reachable = self.neighbors_of_many(direct)
+        reachable = np.setdiff1d(reachable, direct, assume_unique=True)
+        return reachable[reachable != node]
+
+    def is_following_many(self, node, targets):
+        """Bool array: does `node` follow each target"""
+        return np.isin(np.asarray(targets, dtype=np.int64), self.neighbors(node))
+
+
+_graph = None
+_graph_lock = threading.Lock()
+_rebuilding = False
+
+
+def get_follow_graph():
+    """
+    This worker's follow graph, loading, refreshing or rebuilding it as needed.
+    Only the first call in a process loads synchronously; rebuilds run in a
+    background thread and swap the new graph in when it has caught up.
+    """
+    global _graph
+    graph = _graph
+    now = time.monotonic()
+
+    if graph is None:
+        with _graph_lock:
+            # Another thread may have loaded it while we waited
+            if _graph is None:
+                _graph = _build()
+            return _graph
+
+    if now - graph.built_at > FULL_REBUILD_SECONDS or graph.overlay_changes > MAX_OVERLAY_CHANGES:
+        _start_rebuild()
+
+    if now - graph.last_refresh > REFRESH_INTERVAL_SECONDS:
+        try:
+            graph.refresh()
+        except Exception as e:
+            logger.warning(f'Follow graph refresh failed: {e}')
+    return graph
+
+
+def _build():
+    graph = FollowGraph.load()
+    graph.refresh()
+    _prune_changes()
+    return graph
+
+
+def _start_rebuild():
+    global _rebuilding
+    with _graph_lock:
+        if _rebuilding:
+            return
+        _rebuilding = True
+    threading.Thread(target=_rebuild, name='follow-graph-rebuild', daemon=True).start()
+
+
+def _rebuild():
+    global _graph, _rebuilding
+    try:
+        graph = _build()
+        with _graph_lock:
+            _graph = graph
+    except Exception as e:
+        logger.warning(f'Follow graph rebuild failed: {e}')
+    finally:
+        _rebuilding = False
+        # This thread's own database connection
+        connection.close()
+
+
+def record_follow_change(follower_id, following_id, op):
+    """
+    Log a follow/unfollow for every worker's graph and patch this worker's copy
+    once the surrounding transaction commits.
+    """
+    record_follow_changes([(follower_id, following_id)], op)
+
+
+def record_follow_changes(edges, op):
+    """record_follow_change for many (follower_id, following_id) edges in one INSERT"""
+    from myapp.models import FollowChange
+
+    edges = list(edges)
+    if not edges:
+        return
+    changes = FollowChange.objects.bulk_create([
+        FollowChange(follower_id=follower_id, following_id=following_id, op=op)
+        for follower_id, following_id in edges
+    ])
+
+    def apply_locally():
+        if _graph is not None:
+            for change in changes:
+                _graph.apply(change.follower_id, change.following_id, op, change.pk)
+
+    transaction.on_commit(apply_locally)
+
+
+def _prune_changes():
+    from myapp.models import FollowChange
+
+    try:
+        FollowChange.objects.filter(created_at__lt=timezone.now() - CHANGE_RETENTION).delete()
+    except Exception as e:
+        logger.warning(f'Failed to prune follow changes: {e}')
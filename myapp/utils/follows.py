@@ -0,0 +1,106 @@
+"""
+Follow List Utility
+Keyset-paginated follower/following/mutual lists with batched follow-state lookup
+"""
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from myapp.models import follow
+
+FOLLOW_LIST_TYPES = ('followers', 'following', 'mutuals')
+
+
+def parse_follow_cursor(cursor):
+    """
+    Parse a compound follow cursor of the form "created_at,follow_id".
+
+    Returns:
+        (created_at, follow_id) tuple, or (None, None) if the cursor is missing or invalid
+    """
+    if not cursor:
+        return None, None
+    try:
+        created_part, id_part = cursor.split(',', 1)
+        created_at = parse_datetime(created_part)
+        follow_id = int(id_part)
+    except (ValueError, AttributeError, TypeError):
+        return None, None
+    if created_at is None:
+        return None, None
+    return created_at, follow_id
+
+
+def get_follow_page(userinfo_obj, list_type, viewer, cursor=None, per_page=25):
+    """
+    Get one page of a user's followers, following or mutuals.
+
+    Pages are keyed on the follow row's (created_at, id) so deep pages cost the
+    same as the first one. The viewer's follow state for every person on the page
+    is resolved with a single query and exposed as `is_followed_by_viewer`.
+
+    Args:
+        userinfo_obj: userinfo whose network is listed
+        list_type: 'followers', 'following' or 'mutuals'
+        viewer: userinfo of the user looking at the list
+        cursor: Compound cursor "created_at,follow_id" (None for first page)
+        per_page: Number of people to return
+
+    Returns:
+        Dictionary with 'items' (userinfo objects), 'next_cursor', 'has_next'
+    """
+    if list_type == 'followers':
+        person_field = 'follower'
+        query = follow.objects.filter(following=userinfo_obj)
+    elif list_type == 'following':
+        person_field = 'following'
+        query = follow.objects.filter(follower=userinfo_obj)
+    elif list_type == 'mutuals':
+        person_field = 'following'
+        if viewer == userinfo_obj:
+            return {'items': [], 'next_cursor': None, 'has_next': False}
+        viewer_following = follow.objects.filter(follower=viewer).values('following_id')
+        query = follow.objects.filter(follower=userinfo_obj, following_id__in=viewer_following)
+    else:
+        raise ValueError(f'Unknown follow list type: {list_type}')
+
+    cursor_created_at, cursor_id = parse_follow_cursor(cursor)
+    if cursor_created_at is not None:
+        query = query.filter(
+            Q(created_at__lt=cursor_created_at) |
+            Q(created_at=cursor_created_at, id__lt=cursor_id)
+        )
+
+    # Fetch per_page + 1 to check if there are more rows
+    rows = list(
+        query
+        .select_related(f'{person_field}__user', f'{person_field}__coding_style')
+        .order_by('-created_at', '-id')
+        [:per_page + 1]
+    )
+
+    has_next = len(rows) > per_page
+    if has_next:
+        rows = rows[:per_page]
+
+    people = [getattr(row, person_field) for row in rows]
+
+    # One query for the viewer's follow state across the whole page
+    followed_ids = set(
+        follow.objects.filter(
+            follower=viewer,
+            following_id__in=[person.id for person in people]
+        ).values_list('following_id', flat=True)
+    ) if people else set()
+
+    for person in people:
+        person.is_followed_by_viewer = person.id in followed_ids
+
+    next_cursor = None
+    if has_next and rows:
+        last_row = rows[-1]
+        next_cursor = f"{last_row.created_at.isoformat()},{last_row.id}"
+
+    return {
+        'items': people,
+        'next_cursor': next_cursor,
+        'has_next': has_next,
+    }
@@ -0,0 +1,264 @@
+"""
+Offline Graph Recommendations
+Personalized PageRank (random walk with restart) over the follow graph, blended
+with skill and coding-style similarity, producing top-N candidates per user.
+
+The periodic compute_recommendations task (run_tasks) refreshes every active
+user each RECOMPUTE_INTERVAL; `manage.py compute_recommendations` runs it on
+demand. Results land in RecommendationCandidate and are read by
+get_recommended_developers, which ignores rows older than CANDIDATE_TTL.
+
+Scoring for user u and candidate c:
+    score = PPR_WEIGHT * ppr_u(c) / max(ppr_u) + SKILL_WEIGHT * cosine(skills_u, skills_c)
+            + STYLE_WEIGHT * [coding_style_u == coding_style_c]
+Self and users u already follows are excluded.
+
+All heavy lifting is NumPy/SciPy on arrays indexed by userinfo id; shards of
+users are scored in worker processes without database access.
+"""
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+import numpy as np
+from django.db import connections, transaction
+from scipy import sparse
+
+from myapp.utils.follow_graph import FollowGraph
+from myapp.utils.skill_index import SkillIndex
+
+logger = logging.getLogger(__name__)
+
+RESTART_PROBABILITY = 0.15
+PPR_ITERATIONS = 20
+PPR_WEIGHT = 0.6
+SKILL_WEIGHT = 0.25
+STYLE_WEIGHT = 0.15
+TOP_N = 100
+SHARD_SIZE = 500
+RECOMPUTE_INTERVAL = timedelta(days=1)
+# Stored candidates older than this (a missed run) fall back to live scoring
+CANDIDATE_TTL = 2 * RECOMPUTE_INTERVAL
+# Users walked together in one sparse x dense product
+WALK_BATCH_SIZE = 32
+
+
+class RecommendationInputs:
+    """Arrays shared with worker processes (picklable, no ORM objects)"""
+
+    def __init__(self, indptr, indices, skill_matrix, styles, eligible):
+        self.indptr = indptr
+        self.indices = indices
+        self.skill_matrix = skill_matrix  # csr, rows = userinfo id, L2-normalized
+        self.styles = styles  # coding_style_id per userinfo id (0 = none)
+        self.eligible = eligible  # bool per userinfo id: active user that may be recommended
+
+
+def load_inputs():
+    """Read the follow graph, skills and coding styles from the database"""
+    from myapp.models import userinfo
+
+    graph = FollowGraph.load()
+
+    users = np.array(
+        list(userinfo.objects.filter(user__is_active=True).values_list('id', 'coding_style_id')),
+        dtype=object,
+    ).reshape(-1, 2)
+    max_id = int(max(users[:, 0].max() if len(users) else 0, graph.num_nodes - 1, 0))
+    num_nodes = max_id + 1
+
+    eligible = np.zeros(num_nodes, dtype=bool)
+    styles = np.zeros(num_nodes, dtype=np.int64)
+    if len(users):
+        ids = users[:, 0].astype(np.int64)
+        eligible[ids] = True
+        styles[ids] = [style or 0 for style in users[:, 1]]
+
+    # Pad the CSR so every userinfo id has a row
+    indptr = graph.indptr
+    if len(indptr) - 1 < num_nodes:
+        indptr = np.concatenate([indptr, np.full(num_nodes - (len(indptr) - 1), indptr[-1], dtype=np.int64)])
+
+    skill_matrix = SkillIndex.load().matrix
+    skill_matrix.resize((num_nodes, skill_matrix.shape[1]))
+    # Binary rows: the row sum is the squared L2 norm
+    norms = np.sqrt(np.asarray(skill_matrix.sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    skill_matrix = sparse.diags(1.0 / norms).dot(skill_matrix).tocsr().astype(np.float32)
+
+    return RecommendationInputs(indptr, graph.indices, skill_matrix, styles, eligible)
+
+
+def transition_matrix_transposed(indptr, indices):
+    """
+    P^T for the row-stochastic follow transition matrix.
+
+    Returns:
+        (csr P^T, bool array of dangling nodes with no follows)
+    """
+    num_nodes = len(indptr) - 1
+    out_degree = np.diff(indptr)
+    weights = np.repeat(1.0 / np.maximum(out_degree, 1), out_degree).astype(np.float32)
+    transition = sparse.csr_matrix((weights, indices, indptr), shape=(num_nodes, num_nodes))
+    return transition.T.tocsr(), out_degree == 0
+
+
+def personalized_pagerank(transition_t, dangling, seeds, restart=RESTART_PROBABILITY, iterations=PPR_ITERATIONS):
+    """
+    Random walk with restart from each seed, all seeds at once.
+
+    Returns:
+        Dense (num_nodes, len(seeds)) array; column j is the visit distribution for seeds[j]
+    """
+    num_nodes = transition_t.shape[0]
+    columns = np.arange(len(seeds))
+    scores = np.zeros((num_nodes, len(seeds)), dtype=np.float32)
+    scores[seeds, columns] = 1.0
+
+    for _ in range(iterations):
+        # Walks stuck on accounts that follow nobody jump back to their seed
+        stuck = scores[dangling].sum(axis=0)
+        scores = (1.0 - restart) * (transition_t @ scores)
+        scores[seeds, columns] += restart + (1.0 - restart) * stuck
+    return scores
+
+
+_worker_state = {}
+
+
+def init_worker(inputs):
+    """ProcessPoolExecutor initializer: build per-process matrices once"""
+    _worker_state['inputs'] = inputs
+    _worker_state['graph'] = FollowGraph(inputs.indptr, inputs.indices)
+    _worker_state['transition_t'], _worker_state['dangling'] = transition_matrix_transposed(
+        inputs.indptr, inputs.indices
+    )
+
+
+def score_shard(user_ids, top_n=TOP_N):
+    """
+    Compute recommendations for a shard of users (runs in a worker process).
+
+    Returns:
+        List of (user_id, [(candidate_id, score, reason_code), ...]) in rank order
+    """
+    inputs = _worker_state['inputs']
+    graph = _worker_state['graph']
+    results = []
+
+    for start in range(0, len(user_ids), WALK_BATCH_SIZE):
+        batch = np.asarray(user_ids[start:start + WALK_BATCH_SIZE], dtype=np.int64)
+        ppr = personalized_pagerank(_worker_state['transition_t'], _worker_state['dangling'], batch)
+        skill_sims = (inputs.skill_matrix @ inputs.skill_matrix[batch].T).toarray()
+
+        for j, user_id in enumerate(batch.tolist()):
+            results.append((user_id, _rank_candidates(
+                user_id, ppr[:, j], skill_sims[:, j], inputs, graph, top_n
+            )))
+    return results
+
+
+def _rank_candidates(user_id, ppr, skill_sim, inputs, graph, top_n):
+    following = graph.neighbors(user_id)
+
+    allowed = inputs.eligible.copy()
+    allowed[user_id] = False
+    allowed[following[following < len(allowed)]] = False
+
+    ppr = np.where(allowed, ppr, 0.0)
+    peak = ppr.max()
+    if peak > 0:
+        ppr = ppr / peak
+
+    style = inputs.styles[user_id]
+    style_match = (inputs.styles == style) if style else np.zeros(len(allowed), dtype=bool)
+
+    score = PPR_WEIGHT * ppr + SKILL_WEIGHT * skill_sim + STYLE_WEIGHT * style_match
+    score = np.where(allowed, score, 0.0)
+
+    candidate_count = int(np.count_nonzero(score))
+    if candidate_count == 0:
+        return []
+    top = min(top_n, candidate_count)
+    picked = np.argpartition(-score, top - 1)[:top]
+    picked = picked[np.argsort(-score[picked], kind='stable')]
+
+    mutual_counts = graph.mutual_counts(user_id, picked)
+    ranked = []
+    for candidate_id, mutual_count in zip(picked.tolist(), mutual_counts.tolist()):
+        if mutual_count:
+            reason_code = f'mutual:{mutual_count}'
+        elif style_match[candidate_id]:
+            reason_code = 'style'
+        elif skill_sim[candidate_id] > 0:
+            reason_code = 'skills'
+        elif ppr[candidate_id] > 0:
+            reason_code = 'network'
+        else:
+            reason_code = ''
+        # Scores on the same 0-100 scale as the live scorer
+        ranked.append((candidate_id, round(float(score[candidate_id]) * 100, 2), reason_code))
+    return ranked
+
+
+def compute_recommendations(user_ids=None, workers=1, shard_size=SHARD_SIZE, top_n=TOP_N):
+    """
+    Score users in shards and replace their stored candidates.
+
+    Args:
+        user_ids: userinfo ids to score (defaults to all active users)
+        workers: Worker processes (1 = run inline)
+        shard_size: Users per shard
+        top_n: Candidates stored per user
+
+    Returns:
+        (users scored, candidates stored)
+    """
+    from myapp.models import userinfo
+
+    started = time.perf_counter()
+    inputs = load_inputs()
+
+    if user_ids is None:
+        user_ids = list(userinfo.objects.filter(user__is_active=True).order_by('id').values_list('id', flat=True))
+    shards = [user_ids[i:i + shard_size] for i in range(0, len(user_ids), shard_size)]
+    logger.info(
+        f'Scoring {len(user_ids)} users in {len(shards)} shards '
+        f'(graph loaded in {time.perf_counter() - started:.1f}s)'
+    )
+
+    written = 0
+    if workers <= 1:
+        init_worker(inputs)
+        for shard in shards:
+            written += store_candidates(score_shard(shard, top_n))
+    else:
+        # Workers only do array math; don't hand them open database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(inputs,)) as executor:
+            futures = [executor.submit(score_shard, shard, top_n) for shard in shards]
+            for future in as_completed(futures):
+                written += store_candidates(future.result())
+    return len(user_ids), written
+
+
+def store_candidates(shard_results):
+    """Replace each user's stored candidates with the new ranking"""
+    from myapp.models import RecommendationCandidate
+    from myapp.utils.recommendations import recommendation_cache
+
+    rows = [
+        RecommendationCandidate(user_id=user_id, candidate_id=candidate_id, rank=rank,
+                                score=score, reason_code=reason_code)
+        for user_id, ranked in shard_results
+        for rank, (candidate_id, score, reason_code) in enumerate(ranked)
+    ]
+    user_ids = [user_id for user_id, _ in shard_results]
+    with transaction.atomic():
+        RecommendationCandidate.objects.filter(user_id__in=user_ids).delete()
+        RecommendationCandidate.objects.bulk_create(rows, batch_size=2000)
+
+    # Next read picks up the new ranking
+    recommendation_cache.delete(*user_ids)
+    return len(rows)
@@ -0,0 +1,45 @@
+"""
+Bulk Hydration
+Turns cached id lists back into model objects for the page being displayed.
+
+Caches store compact tuples (ids, scores, reason codes) rather than pickled
+model instances; these helpers load only the rows and columns the developer
+card templates use, in a single query.
+"""
+from myapp.models import userinfo
+
+# Fields used by developer cards (recommended_developers.html, nearby_developers.html,
+# popular developer lists and the load-more recommendations JSON)
+DEVELOPER_CARD_FIELDS = (
+    'id',
+    'city',
+    'state',
+    'profile_image',
+    'profile_image_variants',
+    'updated_at',
+    'coding_style__id',
+    'coding_style__name',
+    'coding_style__logo',
+    'user__id',
+    'user__username',
+    'user__first_name',
+    'user__last_name',
+)
+
+
+def hydrate_developers(ids):
+    """
+    Load developer card data for a list of userinfo ids.
+
+    Args:
+        ids: userinfo ids in display order
+
+    Returns:
+        Dictionary of id -> userinfo; ids that no longer exist or belong to
+        deactivated accounts are missing
+    """
+    if not ids:
+        return {}
+    return userinfo.objects.filter(user__is_active=True).select_related(
+        'user', 'coding_style'
+    ).only(*DEVELOPER_CARD_FIELDS).in_bulk(list(ids))
@@ -0,0 +1,147 @@
+"""
+Responsive Image Pipeline
+Generates fixed-size WebP/JPEG renditions for profile images and log snapshots.
+
+Renditions are stored next to the original in the same storage backend
+(R2 via helpers.cloudflare.storages in production), named
+"<original-root>__w<width>.<ext>". The generated names are recorded on the
+model (profile_image_variants / snap_shot_variants) so templates can build
+srcset attributes without touching storage.
+"""
+import io
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Rendition sets
+# - avatar: square crops, displayed at 40-48px (96 for 2x screens)
+# - card: width-bound, aspect preserved, displayed at 192px in feed cards
+RENDITION_WIDTHS = {
+    'avatar': [48, 96],
+    'card': [192, 384, 768],
+}
+RENDITION_FORMATS = {
+    'webp': {'format': 'WEBP', 'ext': 'webp', 'options': {'quality': 80, 'method': 4}},
+    'jpeg': {'format': 'JPEG', 'ext': 'jpg', 'options': {'quality': 82, 'optimize': True, 'progressive': True}},
+}
+
+
+def rendition_name(name, width, fmt):
+    """Storage name for one rendition of an original file"""
+    root, _ = os.path.splitext(name)
+    return f"{root}__w{width}.{RENDITION_FORMATS[fmt]['ext']}"
+
+
+def _to_rgb(image):
+    """Flatten transparency onto white so JPEG output doesn't turn black"""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        return background
+    return image.convert('RGB')
+
+
+def _resize(image, width, kind):
+    if kind == 'avatar':
+        return ImageOps.fit(image, (width, width), Image.Resampling.LANCZOS)
+    if image.width <= width:
+        return image.copy()
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.Resampling.LANCZOS)
+
+
+def render_renditions(image_bytes, kind):
+    """
+    Resize raw image bytes into every rendition of a kind.
+
+    Args:
+        image_bytes: Original image content
+        kind: 'avatar' or 'card'
+
+    Returns:
+        List of (width, fmt, bytes) tuples
+    """
+    with Image.open(io.BytesIO(image_bytes)) as original:
+        image = _to_rgb(ImageOps.exif_transpose(original))
+
+    widths = RENDITION_WIDTHS[kind]
+    if kind == 'card':
+        # Don't upscale; keep the smallest width so every image has at least one rendition
+        widths = [w for w in widths if w <= image.width] or widths[:1]
+
+    outputs = []
+    for width in widths:
+        resized = _resize(image, width, kind)
+        for fmt, spec in RENDITION_FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, spec['format'], **spec['options'])
+            outputs.append((width, fmt, buffer.getvalue()))
+    return outputs
+
+
+def generate_renditions(field_file, kind, storage=None):
+    """
+    Generate and store all renditions for an image field file.
+
+    Args:
+        field_file: ImageFieldFile (e.g. userinfo.profile_image, Log.snap_shot)
+        kind: 'avatar' or 'card'
+        storage: Storage backend (defaults to default_storage)
+
+    Returns:
+        Variants dict: {'webp': {'48': name, ...}, 'jpeg': {...}}, empty on failure
+    """
+    storage = storage or default_storage
+    if not field_file or not field_file.name:
+        return {}
+
+    try:
+        with storage.open(field_file.name, 'rb') as fh:
+            image_bytes = fh.read()
+        return store_renditions(field_file.name, image_bytes, kind, storage=storage)
+    except Exception as e:
+        logger.error(f'Failed to generate {kind} renditions for {field_file.name}: {e}')
+        return {}
+
+
+def store_renditions(name, image_bytes, kind, storage=None):
+    """
+    Resize image bytes and save every rendition next to `name`.
+
+    Returns:
+        Variants dict: {'webp': {'48': name, ...}, 'jpeg': {...}}
+    """
+    storage = storage or default_storage
+    variants = {}
+    for width, fmt, data in render_renditions(image_bytes, kind):
+        # The storage may pick a different name if the target is taken
+        saved_name = storage.save(rendition_name(name, width, fmt), ContentFile(data))
+        variants.setdefault(fmt, {})[str(width)] = saved_name
+    return variants
+
+
+def iter_rendition_names(variants):
+    """Yield every stored rendition name in a variants dict"""
+    for by_width in (variants or {}).values():
+        yield from by_width.values()
+
+
+def pick_rendition(variants, width, fmt='jpeg'):
+    """
+    Pick the smallest stored rendition at least `width` wide.
+    Falls back to the largest available one, or None if there are none.
+    """
+    by_width = (variants or {}).get(fmt) or {}
+    if not by_width:
+        return None
+    widths = sorted(int(w) for w in by_width)
+    for w in widths:
+        if w >= width:
+            return by_width[str(w)]
+    return by_width[str(widths[-1])]
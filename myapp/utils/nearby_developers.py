@@ -4,9 +4,10 @@ Identifies and ranks geographically closest developers to a user for the Local t
 Includes diversity filtering to ensure varied results.
 """
 from django.db.models import Q, Count, Prefetch
-from django.core.cache import cache
 from myapp.models import userinfo, follow
 from myapp.algorithms import haversine_distance
+from myapp.utils.cache import CacheNamespace
+from myapp.utils.hydration import hydrate_developers
 from decimal import Decimal
 import logging
 
@@ -16,6 +17,9 @@ logger = logging.getLogger(__name__)
 MAX_DISTANCE_KM = 500  # Maximum distance to consider (km)
 CACHE_TTL_SECONDS = 600  # Cache results for 10 minutes
 
+# Compact (userinfo_id, distance_km) tuples per user/limit/exclude_following
+nearby_cache = CacheNamespace('nearby_dev_ids', ttl=CACHE_TTL_SECONDS)
+
 
 def get_nearby_developers(user, limit=10, exclude_following=False):
     """
@@ -38,16 +42,30 @@ def get_nearby_developers(user, limit=10, exclude_following=False):
         logger.debug(f'User {user.id} has no coordinates, returning empty list')
         return []
     
+    # Concurrent misses compute once; expired lists are served while refreshing
+    cache_key = f'{user.id}:{limit}:{exclude_following}'
+    ranked = nearby_cache.get_or_compute(
+        cache_key, lambda: _compute_nearby_developers(user, limit, exclude_following)
+    )
+    
+    developers = hydrate_developers([dev_id for dev_id, _ in ranked])
+    return [
+        (developers[dev_id], distance)
+        for dev_id, distance in ranked
+        if dev_id in developers
+    ]
+
+
+def _compute_nearby_developers(user, limit, exclude_following):
+    """
+    Rank candidates by distance and apply diversity filtering
+    
+    Returns:
+        List of compact (userinfo_id, distance_km) tuples
+    """
     user_lat = float(user.latitude)
     user_lon = float(user.longitude)
     
-    # Try cache first
-    cache_key = f'nearby_devs:{user.id}:{limit}:{exclude_following}'
-    cached = cache.get(cache_key)
-    if cached:
-        logger.debug(f'Cache hit for nearby developers: user {user.id}')
-        return cached
-    
     # Get candidate pool - users with coordinates
     candidates = _get_candidate_pool(user, exclude_following)
     
@@ -77,11 +95,8 @@ def get_nearby_developers(user, limit=10, exclude_following=False):
     # Take top results
     results = diverse_results[:limit]
     
-    # Cache results
-    cache.set(cache_key, results, CACHE_TTL_SECONDS)
-    
     logger.info(f'Found {len(results)} nearby developers for user {user.id}')
-    return results
+    return [(candidate.id, round(distance, 2)) for candidate, distance in results]
 
 
 def _get_candidate_pool(user, exclude_following=False):
@@ -93,11 +108,9 @@ def _get_candidate_pool(user, exclude_following=False):
         user__is_active=True,
         latitude__isnull=False,
         longitude__isnull=False
-    ).select_related(
-        'user',
-        'coding_style'
-    ).prefetch_related(
-        'skills'
+    ).only(
+        # Only what distance ranking and the diversity filter read; cards are hydrated later
+        'id', 'latitude', 'longitude', 'city', 'coding_style_id'
     )
     
     # Optionally exclude already following
@@ -130,7 +143,7 @@ def _apply_diversity_filter(scored_candidates, target_count):
     
     for candidate, distance in scored_candidates:
         # Check coding style diversity
-        style_id = candidate.coding_style_id if candidate.coding_style else None
+        style_id = candidate.coding_style_id
         style_count = seen_coding_styles.get(style_id, 0)
         
         # Check city diversity
@@ -172,9 +185,10 @@ def invalidate_nearby_cache(user):
         user = user.info
     
     # Clear all variants of the cache
-    for limit in [5, 10]:
-        for exclude in [True, False]:
-            cache_key = f'nearby_devs:{user.id}:{limit}:{exclude}'
-            cache.delete(cache_key)
+    nearby_cache.delete(*[
+        f'{user.id}:{limit}:{exclude}'
+        for limit in [5, 10]
+        for exclude in [True, False]
+    ])
     
     logger.debug(f'Invalidated nearby developers cache for user {user.id}')
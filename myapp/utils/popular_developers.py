@@ -1,38 +1,180 @@
 """
 Utility to fetch popular developers for empty feed state.
-Ranks developers by total log count.
+Ranks developers from the PopularDeveloper leaderboard by total logs, recent
+logs and followers.
+
+Freshness: log and follow signals move each developer's counters with F()
+updates (record_log_created/deleted, record_follower_change). The
+refresh_popular_developers task recomputes every row from grouped queries each
+REFRESH_INTERVAL so the recent-activity window slides and any drift is fixed.
 """
-from myapp.models import userinfo
-from logs.models import Log
-from django.db.models import Count
+from datetime import timedelta
+
+from django.db.models import Count, F, Max, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from myapp.models import PopularDeveloper, follow
+from myapp.utils.cache import CacheNamespace
+from myapp.utils.follow_graph import get_follow_graph
+from myapp.utils.hydration import hydrate_developers
+
+# Global ranking shared by every viewer: [(userinfo_id, log_count), ...]
+popular_cache = CacheNamespace('popular_developers', ttl=600)
+
+# Ranking depth kept in cache; enough to fill a page after removing who the viewer follows
+RANKING_SIZE = 200
+
+RECENT_DAYS = 30
+REFRESH_INTERVAL = timedelta(hours=1)
+
+# score = sum(weight * counter); a recent log counts three times an old one
+SCORE_WEIGHTS = {
+    'log_count': 1.0,
+    'recent_log_count': 2.0,
+    'follower_count': 0.5,
+}
 
 
 def get_popular_developers(current_user, limit=10):
     """
-    Get popular developers ranked by log count.
+    Get popular developers ranked by leaderboard score.
     Excludes current user and users already followed.
-    
+
     Args:
         current_user: User object of current user
         limit: Number of developers to return (default: 10)
-    
+
     Returns:
         List of userinfo objects with annotated log_count
     """
     # Get IDs of users current user follows
-    following_ids = current_user.info.get_following().values_list('id', flat=True)
-    
-    # Get popular developers
-    popular_devs = userinfo.objects.annotate(
-        log_count=Count('mind_logs')
-    ).filter(
+    me = current_user.info.id
+    excluded_ids = set(get_follow_graph().neighbors(me).tolist()) | {me}
+
+    ranking = popular_cache.get_or_compute('ranking', _compute_ranking)
+    picked = [(dev_id, log_count) for dev_id, log_count in ranking if dev_id not in excluded_ids][:limit]
+
+    if len(picked) < limit and len(ranking) >= RANKING_SIZE:
+        # Viewer follows most of the cached ranking: read further down the leaderboard
+        picked = list(_leaderboard().exclude(user_id__in=excluded_ids)[:limit])
+
+    # Hydrate the picked ids in one query, keeping rank order
+    devs = hydrate_developers([dev_id for dev_id, _ in picked])
+    popular_devs = []
+    for dev_id, log_count in picked:
+        dev = devs.get(dev_id)
+        if dev is not None:
+            dev.log_count = log_count
+            popular_devs.append(dev)
+    return popular_devs
+
+
+def _leaderboard():
+    return PopularDeveloper.objects.filter(
         log_count__gt=0  # Must have at least 1 log
-    ).exclude(
-        id=current_user.info.id  # Exclude self
-    ).exclude(
-        id__in=following_ids  # Exclude already followed
-    ).select_related(
-        'user', 'coding_style'
-    ).order_by('-log_count')[:limit]
-    
-    return list(popular_devs)
+    ).order_by('-score', 'user_id').values_list('user_id', 'log_count')
+
+
+def _compute_ranking():
+    return list(_leaderboard()[:RANKING_SIZE])
+
+
+# Incremental updates (called from log and follow signals)
+
+def record_log_created(user_id, timestamp):
+    _apply(user_id, {'log_count': 1, 'recent_log_count': 1}, last_log_at=timestamp)
+
+
+def record_log_deleted(user_id, timestamp):
+    recent = timestamp is not None and timestamp >= timezone.now() - timedelta(days=RECENT_DAYS)
+    _apply(user_id, {'log_count': -1, 'recent_log_count': -1 if recent else 0})
+
+
+def record_follower_change(user_id, delta):
+    _apply(user_id, {'follower_count': delta})
+
+
+def _apply(user_id, deltas, last_log_at=None):
+    """Adjust one developer's counters and score in a single UPDATE"""
+    if not any(deltas.values()):
+        return
+    # Counters never go below zero (a decrement can race the row's rebuild), and
+    # the score is derived from the clamped values so it stays consistent with them
+    counters = {
+        field: Greatest(F(field) + deltas[field], 0) if deltas.get(field) else F(field)
+        for field in SCORE_WEIGHTS
+    }
+    updates = {field: counters[field] for field, delta in deltas.items() if delta}
+    updates['score'] = sum(SCORE_WEIGHTS[field] * value for field, value in counters.items())
+    if last_log_at is not None:
+        updates['last_log_at'] = last_log_at
+
+    updated = PopularDeveloper.objects.filter(user_id=user_id).update(**updates)
+    # First activity for this developer: build the row from exact counts. Decrements
+    # never create rows (they also fire while a deleted user's rows are cascaded).
+    if not updated and any(delta > 0 for delta in deltas.values()):
+        refresh_leaderboard([user_id])
+
+
+# Full recomputation
+
+def refresh_leaderboard(user_ids=None, batch_size=1000):
+    """
+    Recompute leaderboard rows from grouped queries over logs and follows.
+
+    Args:
+        user_ids: Developers to refresh (defaults to all; rows for developers
+            without logs are then removed)
+
+    Returns:
+        Number of rows written
+    """
+    from logs.models import Log
+
+    started = timezone.now()
+    cutoff = started - timedelta(days=RECENT_DAYS)
+    logs = Log.objects.all()
+    follows = follow.objects.all()
+    if user_ids is not None:
+        logs = logs.filter(user_id__in=user_ids)
+        follows = follows.filter(following_id__in=user_ids)
+
+    log_stats = {
+        user_id: (total, recent, last_log_at)
+        for user_id, total, recent, last_log_at in logs.values_list('user_id').annotate(
+            total=Count('id'),
+            recent=Count('id', filter=Q(timestamp__gte=cutoff)),
+            last_log_at=Max('timestamp'),
+        ).order_by()
+    }
+    follower_counts = dict(follows.values_list('following_id').annotate(total=Count('id')).order_by())
+
+    # A full refresh ranks developers with logs; a targeted one keeps whoever was asked for
+    targets = set(log_stats) if user_ids is None else set(user_ids)
+    rows = []
+    for user_id in targets:
+        total, recent, last_log_at = log_stats.get(user_id, (0, 0, None))
+        counters = {
+            'log_count': total,
+            'recent_log_count': recent,
+            'follower_count': follower_counts.get(user_id, 0),
+        }
+        rows.append(PopularDeveloper(
+            user_id=user_id,
+            last_log_at=last_log_at,
+            score=sum(SCORE_WEIGHTS[field] * value for field, value in counters.items()),
+            **counters,
+        ))
+
+    PopularDeveloper.objects.bulk_create(
+        rows,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['log_count', 'recent_log_count', 'follower_count', 'score', 'last_log_at', 'updated_at'],
+    )
+    if user_ids is None:
+        # Rows not rewritten above belong to developers without logs
+        PopularDeveloper.objects.filter(updated_at__lt=started).delete()
+    return len(rows)
@@ -4,14 +4,23 @@ Provides personalized developer recommendations based on multiple factors
 """
 from django.db.models import Count, Q, F, Prefetch, Value, IntegerField
 from django.db.models.functions import Coalesce
-from django.core.cache import cache
 from django.utils import timezone
 from datetime import timedelta
+import numpy as np
 from myapp.models import userinfo, follow
+from myapp.utils.cache import CacheNamespace
+from myapp.utils.hydration import hydrate_developers
+from myapp.utils.follow_graph import get_follow_graph
+from myapp.utils.graph_recommendations import CANDIDATE_TTL
+from myapp.utils.sampling import sample_developer_ids
+from myapp.utils.skill_index import get_similar_developers, get_skill_index
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Full ranked list per user as compact (id, score, reason_code) tuples, sliced for pagination
+recommendation_cache = CacheNamespace('dev_recommendation_ids', ttl=3600)
+
 
 def get_recommended_developers(user, limit=10, offset=0, exclude_following=True, use_cache=True):
     """
@@ -31,71 +40,122 @@ def get_recommended_developers(user, limit=10, offset=0, exclude_following=True,
     if hasattr(user, 'info'):
         user = user.info
     
-    # Try cache first - cache stores ALL recommendations
-    cache_key = f'dev_recommendations:{user.id}'
-    
     if use_cache:
-        cached = cache.get(cache_key)
-        if cached:
-            logger.info(f'Cache hit for user {user.id}, offset={offset}, limit={limit}')
-            # Return slice based on offset and limit
-            return cached[offset:offset + limit]
+        # Cache stores ALL recommendations; concurrent misses compute once
+        ranked = recommendation_cache.get_or_compute(
+            user.id, lambda: _compute_recommendations(user, exclude_following)
+        )
+    else:
+        ranked = _compute_recommendations(user, exclude_following)
+    
+    # Hydrate only the requested slice
+    page = ranked[offset:offset + limit]
+    developers = hydrate_developers([dev_id for dev_id, _, _ in page])
+    
+    recommendations = []
+    for dev_id, score, reason_code in page:
+        developer = developers.get(dev_id)
+        if developer is not None:  # Skip users deleted since the list was cached
+            recommendations.append((developer, score, reason_text(reason_code, developer)))
+    return recommendations
+
+
+def _compute_recommendations(user, exclude_following=True):
+    """
+    Score and rank the full recommendation list for a user (up to 100 entries)
+    
+    Returns:
+        List of compact (userinfo_id, score, reason_code) tuples
+    """
+    # Precomputed graph recommendations (compute_recommendations task) when fresh
+    precomputed = _get_precomputed_recommendations(user, exclude_following)
+    if precomputed:
+        return precomputed
     
-    # Get candidate pool
-    candidates = _get_candidate_pool(user, exclude_following)
+    # Fallback for users not covered by the offline job yet: live scoring
+    # Get candidate pool and load it as columns
+    candidate_ids = _get_candidate_pool(user, exclude_following)
+    features = _load_candidate_features(user, candidate_ids)
     
-    # Score each candidate
-    scored_candidates = []
-    for candidate in candidates:
-        score, reason = _calculate_recommendation_score(user, candidate)
-        if score > 0:  # Only include if there's some match
-            scored_candidates.append((candidate, score, reason))
+    # Score every candidate in one vectorized pass
+    scores, reason_kinds = _score_candidates(user, features)
     
-    # Sort by score (descending) and add diversity
-    scored_candidates.sort(key=lambda x: x[1], reverse=True)
+    # Only include candidates with some match, highest score first (ties keep pool order)
+    order = np.flatnonzero(scores > 0)
+    order = order[np.argsort(-scores[order], kind='stable')]
     
     # Apply diversity filter - get more results for pagination
     # Generate up to 100 diverse recommendations to support pagination
     max_recommendations = 100
-    diverse_recommendations = _apply_diversity(scored_candidates, max_recommendations)
-    
-    # Cache ALL results
-    if use_cache:
-        cache.set(cache_key, diverse_recommendations, 3600)  # 1 hour TTL
+    order = _apply_diversity(order, features.coding_styles, features.cities, max_recommendations)
     
-    logger.info(f'Generated {len(diverse_recommendations)} total recommendations for user {user.id}')
+    logger.info(f'Generated {len(order)} total recommendations for user {user.id}')
+    return [
+        (int(features.ids[i]), int(scores[i]), _reason_code(reason_kinds[i], features, i))
+        for i in order.tolist()
+    ]
+
+
+def _get_precomputed_recommendations(user, exclude_following=True):
+    """
+    Read the stored top-N for a user in rank order (one indexed query).
+    Rows older than CANDIDATE_TTL are ignored (live scoring takes over) and
+    users followed since the job ran are dropped.
+    """
+    from myapp.models import RecommendationCandidate
     
-    # Return slice based on offset and limit
-    return diverse_recommendations[offset:offset + limit]
+    ranked = list(
+        RecommendationCandidate.objects.filter(user=user, computed_at__gte=timezone.now() - CANDIDATE_TTL)
+        .order_by('rank')
+        .values_list('candidate_id', 'score', 'reason_code')
+    )
+    if ranked and exclude_following:
+        following = set(get_follow_graph().neighbors(user.id).tolist())
+        ranked = [row for row in ranked if row[0] not in following]
+    return ranked
 
 
+def reason_text(reason_code, developer):
+    """
+    Render a reason code from _score_candidates for display.
+    City, state and coding style come from the hydrated developer.
+    """
+    kind, _, value = reason_code.partition(':')
+    if kind == 'mutual':
+        count = int(value)
+        return f"{count} mutual connection{'s' if count > 1 else ''}"
+    if kind == 'city' and developer.city:
+        return f"From {developer.city}"
+    if kind == 'state' and developer.state:
+        return f"From {developer.state}"
+    if kind == 'active':
+        return "Active developer"
+    if kind == 'style' and developer.coding_style:
+        return f"Same coding style: {developer.coding_style.name}"
+    if kind == 'skills':
+        if value:
+            count = int(value)
+            return f"{count} shared skill{'s' if count > 1 else ''}"
+        return "Similar skills"
+    if kind == 'network':
+        return "In your extended network"
+    return "Suggested for you"
+
 
 def _get_candidate_pool(user, exclude_following=True):
     """
-    Get pool of candidate developers to recommend
+    Get pool of candidate developer ids to recommend
     
     Strategy:
     1. Same coding style users
     2. Same location users
-    3. Users with mutual connections
-    4. Active users
+    3. Users with the most similar skills (skill index)
+    4. Random active users for diversity (myapp.utils.sampling)
     
-    Optimized with select_related and prefetch_related
+    Only ids are read here; features come from _load_candidate_features
     """
-    # Base queryset - exclude self
-    # Annotate follower/following counts to avoid N+1 queries
-    candidates = userinfo.objects.exclude(id=user.id).filter(
-        user__is_active=True
-    ).select_related(
-        'user',
-        'coding_style'
-    ).prefetch_related(
-        Prefetch('followers', queryset=follow.objects.select_related('follower')),
-        Prefetch('following', queryset=follow.objects.select_related('following'))
-    ).annotate(
-        follower_count=Count('followers', distinct=True),
-        following_count=Count('following', distinct=True)
-    )
+    # Base queryset - active users other than self
+    candidates = userinfo.objects.exclude(id=user.id).filter(user__is_active=True)
     
     # Exclude already following
     if exclude_following:
@@ -108,196 +168,223 @@ def _get_candidate_pool(user, exclude_following=True):
                    Q(state=user.state)
     
     # Get users with commonality first (up to 200)
-    priority_candidates = list(candidates.filter(base_filters)[:200])
+    pool = list(candidates.filter(base_filters).values_list('id', flat=True)[:200])
     
-    # Add some random diverse candidates (up to 50)
-    diverse_candidates = list(candidates.exclude(
-        id__in=[c.id for c in priority_candidates]
-    ).order_by('?')[:50])
+    # Add the closest skill matches not already in the pool (up to 50)
+    pool_ids = set(pool)
+    similar_ids = [dev_id for dev_id, _ in get_similar_developers(user.id) if dev_id not in pool_ids]
+    pool += list(candidates.filter(id__in=similar_ids).values_list('id', flat=True))
+    pool_ids.update(pool)
     
-    return priority_candidates + diverse_candidates
+    # Add some random diverse candidates (up to 50) from the sample pool
+    # (already-followed ids are excluded via the follow graph, self via pool_ids)
+    pool_ids.add(user.id)
+    if exclude_following:
+        pool_ids.update(get_follow_graph().neighbors(user.id).tolist())
+    pool += sample_developer_ids(50, exclude=pool_ids)
+    return pool
+
 
+class CandidateFeatures:
+    """Columnar features for a candidate pool; row i describes ids[i]"""
+    
+    def __init__(self, ids, cities, states, countries, coding_styles, profile_complete, last_login,
+                 follower_counts, following_counts, active_30d, mutual_counts, shared_skills, skill_similarity):
+        self.ids = ids
+        self.cities = cities  # location strings ('' when unset)
+        self.states = states
+        self.countries = countries
+        self.coding_styles = coding_styles  # coding_style_id (0 when unset)
+        self.profile_complete = profile_complete
+        self.last_login = last_login  # epoch seconds (NaN when never logged in)
+        self.follower_counts = follower_counts
+        self.following_counts = following_counts
+        self.active_30d = active_30d  # has logs in the last 30 days
+        self.mutual_counts = mutual_counts
+        self.shared_skills = shared_skills
+        self.skill_similarity = skill_similarity
 
-def _calculate_recommendation_score(current_user, candidate):
+
+def _load_candidate_features(user, candidate_ids):
+    """
+    Load the candidate pool as NumPy columns with a fixed number of queries:
+    one for profile fields, one per follow direction and one for recent logs.
+    Mutual counts and skill overlap come from the in-memory graph and skill index.
     """
-    Calculate recommendation score based on multiple factors
+    from logs.models import Log
+    
+    rows = {
+        row[0]: row for row in userinfo.objects.filter(id__in=candidate_ids).values_list(
+            'id', 'city', 'state', 'country', 'coding_style_id', 'bio', 'profile_image', 'user__last_login'
+        )
+    }
+    # Keep pool order (it breaks score ties), skipping users deleted meanwhile
+    rows = [rows[dev_id] for dev_id in candidate_ids if dev_id in rows]
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    id_list = ids.tolist()
+    
+    follower_counts = dict(
+        follow.objects.filter(following_id__in=id_list)
+        .values_list('following_id').annotate(total=Count('id')).order_by()
+    )
+    following_counts = dict(
+        follow.objects.filter(follower_id__in=id_list)
+        .values_list('follower_id').annotate(total=Count('id')).order_by()
+    )
+    thirty_days_ago = timezone.now() - timedelta(days=30)
+    active_ids = set(
+        Log.objects.filter(user_id__in=id_list, timestamp__gte=thirty_days_ago)
+        .values_list('user_id', flat=True).distinct()
+    )
+    
+    skill_index = get_skill_index()
+    return CandidateFeatures(
+        ids=ids,
+        cities=np.array([row[1] or '' for row in rows], dtype=object),
+        states=np.array([row[2] or '' for row in rows], dtype=object),
+        countries=np.array([row[3] or '' for row in rows], dtype=object),
+        coding_styles=np.array([row[4] or 0 for row in rows], dtype=np.int64),
+        profile_complete=np.array([bool(row[5] and row[1] and row[4] and row[6]) for row in rows], dtype=bool),
+        last_login=np.array([row[7].timestamp() if row[7] else np.nan for row in rows], dtype=np.float64),
+        follower_counts=np.array([follower_counts.get(dev_id, 0) for dev_id in id_list], dtype=np.int64),
+        following_counts=np.array([following_counts.get(dev_id, 0) for dev_id in id_list], dtype=np.int64),
+        active_30d=np.isin(ids, np.fromiter(active_ids, dtype=np.int64, count=len(active_ids))),
+        mutual_counts=get_follow_graph().mutual_counts(user.id, ids),
+        shared_skills=skill_index.shared_counts(user.id, ids),
+        skill_similarity=skill_index.similarity(user.id, ids),
+    )
+
+
+# Reason kinds in priority order; the first that applies is shown
+REASON_KINDS = ('', 'mutual', 'city', 'state', 'active', 'style', 'skills')
+
+
+def _score_candidates(current_user, features):
+    """
+    Calculate recommendation scores for the whole pool
+    
+    Points: mutual connections 25, location 20, 30-day activity 15, coding style 10,
+    profile completeness 10, recent login 10, balanced network 10, skill similarity 10
     
     Returns:
-        (score, reason_text) tuple
+        (int scores capped at 100, index into REASON_KINDS per candidate)
     """
-    score = 0
-    reasons = []
+    f = features
+    score = np.zeros(len(f.ids), dtype=np.int64)
     
     # 1. Mutual Connections (25 points) - Highest priority
-    mutual_count = _get_mutual_connections_count(current_user, candidate)
-    if mutual_count > 0:
-        mutual_score = min(mutual_count * 5, 25)
-        score += mutual_score
-        reasons.append(f"{mutual_count} mutual connection{'s' if mutual_count > 1 else ''}")
+    has_mutual = f.mutual_counts > 0
+    score += np.minimum(f.mutual_counts * 5, 25)
     
     # 2. Location Proximity (20 points)
-    # Only score location if both users have location data
-    if candidate.city and current_user.city:
-        if candidate.city == current_user.city:
-            score += 20
-            reasons.append(f"From {candidate.city}")
-    elif candidate.state and current_user.state:
-        if candidate.state == current_user.state:
-            score += 15
-            reasons.append(f"From {candidate.state}")
-    elif candidate.country and current_user.country:
-        if candidate.country == current_user.country:
-            score += 10
+    # Only score location if both users have location data; the most specific shared field decides
+    has_city = (f.cities != '') & bool(current_user.city)
+    has_state = ~has_city & (f.states != '') & bool(current_user.state)
+    has_country = ~has_city & ~has_state & (f.countries != '') & bool(current_user.country)
+    same_city = has_city & (f.cities == (current_user.city or ''))
+    same_state = has_state & (f.states == (current_user.state or ''))
+    same_country = has_country & (f.countries == (current_user.country or ''))
+    score += 20 * same_city + 15 * same_state + 10 * same_country
     
     # 3. Activity Similarity (15 points)
-    if _is_active_user(candidate):
-        score += 15
-        reasons.append("Active developer")
+    score += 15 * f.active_30d
     
     # 4. Coding Style Match (10 points)
-    if candidate.coding_style and current_user.coding_style:
-        if candidate.coding_style == current_user.coding_style:
-            score += 10
-            reasons.append(f"Same coding style: {candidate.coding_style.name}")
+    same_style = (f.coding_styles != 0) & (f.coding_styles == (current_user.coding_style_id or -1))
+    score += 10 * same_style
     
     # 5. Profile Completeness (10 points)
-    if _is_profile_complete(candidate):
-        score += 10
-    
-    # 6. Recent Activity (10 points)
-    if _is_recently_active(candidate):
-        score += 10
-    
-    # 7. Balanced Network (10 points)
-    if _has_balanced_network(candidate):
-        score += 10
-    
-    # Generate reason text
-    reason_text = reasons[0] if reasons else "Suggested for you"
-    
-    return min(score, 100), reason_text
-
-
-def _get_mutual_connections_count(user1, user2):
-    """
-    Count mutual connections between two users
-    Uses prefetched data to avoid N+1 queries
-    
-    Mutual connections = people that both user1 and user2 are following
-    """
-    # Cache user1's following set to avoid repeated queries
-    if not hasattr(user1, '_following_cache'):
-        user1._following_cache = set(user1.following.values_list('following_id', flat=True))
-    
-    # Use prefetched data if available, otherwise query
-    if hasattr(user2, '_prefetched_objects_cache') and 'following' in user2._prefetched_objects_cache:
-        # Use prefetched follow objects
-        user2_following = {f.following_id for f in user2.following.all()}
-    else:
-        # Fallback to query (should be cached by select_related)
-        user2_following = set(user2.following.values_list('following_id', flat=True))
-    
-    # Count intersection
-    return len(user1._following_cache & user2_following)
-
-
-def _is_active_user(user):
-    """Check if user is active (has logs in last 30 days)"""
-    if not hasattr(user, '_activity_checked'):
-        from logs.models import Log
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        user._is_active = Log.objects.filter(
-            user=user,
-            timestamp__gte=thirty_days_ago
-        ).exists()
-        user._activity_checked = True
-    return getattr(user, '_is_active', False)
-
-
-def _is_profile_complete(user):
-    """Check if profile has key fields filled"""
-    return all([
-        user.bio,
-        user.city,
-        user.coding_style,
-        user.profile_image
-    ])
+    score += 10 * f.profile_complete
+    
+    # 6. Recent Activity (10 points) - logged in within 7 days
+    seven_days_ago = (timezone.now() - timedelta(days=7)).timestamp()
+    with np.errstate(invalid='ignore'):
+        score += 10 * (f.last_login >= seven_days_ago)
+    
+    # 7. Balanced Network (10 points) - follower/following ratio in [0.5, 2], or not a spam account
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = f.follower_counts / f.following_counts
+    balanced = np.where(f.following_counts == 0, f.follower_counts < 100, (ratio >= 0.5) & (ratio <= 2.0))
+    score += 10 * balanced
+    
+    # 8. Skill Similarity (10 points) - cosine over skill sets, from the skill index
+    has_skills = f.skill_similarity > 0
+    score += np.rint(f.skill_similarity * 10).astype(np.int64)
+    
+    # Top reason (rendered by reason_text)
+    reason_kinds = np.select(
+        [has_mutual, same_city, same_state, f.active_30d, same_style, has_skills],
+        np.arange(1, len(REASON_KINDS)),
+        default=0,
+    )
+    return np.minimum(score, 100), reason_kinds
 
 
-def _is_recently_active(user):
-    """Check if user was active in last 7 days"""
-    if user.user.last_login:
-        seven_days_ago = timezone.now() - timedelta(days=7)
-        return user.user.last_login >= seven_days_ago
-    return False
+def _reason_code(kind_index, features, i):
+    """Compact reason code, e.g. "mutual:3", "city", "style", "skills:4" or """""
+    kind = REASON_KINDS[kind_index]
+    if kind == 'mutual':
+        return f"mutual:{features.mutual_counts[i]}"
+    if kind == 'skills':
+        return f"skills:{features.shared_skills[i]}"
+    return kind
 
 
-def _has_balanced_network(user):
-    """Check if user has a balanced follower/following ratio"""
-    # Use annotated counts if available (from main query)
-    if hasattr(user, 'follower_count') and hasattr(user, 'following_count'):
-        follower_count = user.follower_count
-        following_count = user.following_count
-    else:
-        # Fallback to direct count (for backwards compatibility)
-        follower_count = user.followers.count()
-        following_count = user.following.count()
-    
-    if following_count == 0:
-        return follower_count < 100  # Not a spam account
-    
-    ratio = follower_count / following_count
-    return 0.5 <= ratio <= 2.0  # Reasonable ratio
-
-
-def _apply_diversity(scored_candidates, limit):
+def _apply_diversity(order, coding_styles, cities, limit):
     """
     Apply diversity to recommendations to avoid echo chamber
     Ensures variety in coding styles, locations, etc.
+    
+    Args:
+        order: Candidate row indices, best first
+        coding_styles, cities: Feature columns (0 / '' when unset)
+    
+    Returns:
+        Up to `limit` row indices
     """
-    if len(scored_candidates) <= limit:
-        return scored_candidates
+    if len(order) <= limit:
+        return order
     
-    diverse_list = []
+    picked = []
+    taken = np.zeros(len(coding_styles), dtype=bool)
     seen_coding_styles = set()
     seen_cities = set()
     
     # First pass: pick diverse candidates with high scores
-    for candidate, score, reason in scored_candidates:
-        if len(diverse_list) >= limit:
+    for i in order.tolist():
+        if len(picked) >= limit:
             break
         
-        coding_style = candidate.coding_style.id if candidate.coding_style else None
-        city = candidate.city
+        coding_style = int(coding_styles[i]) or None
+        city = cities[i] or None
         
         # Prefer candidates with unseen attributes
         is_diverse = (coding_style not in seen_coding_styles) or (city not in seen_cities)
         
-        if is_diverse or len(diverse_list) < limit // 2:
-            diverse_list.append((candidate, score, reason))
+        if is_diverse or len(picked) < limit // 2:
+            picked.append(i)
+            taken[i] = True
             if coding_style:
                 seen_coding_styles.add(coding_style)
             if city:
                 seen_cities.add(city)
     
     # Second pass: fill remaining slots with highest scores
-    for candidate, score, reason in scored_candidates:
-        if len(diverse_list) >= limit:
-            break
-        if (candidate, score, reason) not in diverse_list:
-            diverse_list.append((candidate, score, reason))
+    if len(picked) < limit:
+        remaining = order[~taken[order]]
+        picked.extend(remaining[:limit - len(picked)].tolist())
     
-    return diverse_list
+    return np.array(picked, dtype=np.int64)
 
 
 def invalidate_recommendation_cache(user):
     """
-    Invalidate recommendation cache for a user
-    Call this after follow/unfollow actions
+    Invalidate recommendation cache for a user (User, userinfo or userinfo id)
+    Called by the follow.created/follow.deleted event handlers
     """
     if hasattr(user, 'info'):
         user = user.info
+    user_id = getattr(user, 'id', user)
     
-    cache_key = f'dev_recommendations:{user.id}'
-    cache.delete(cache_key)
-    logger.info(f'Invalidated recommendation cache for user {user.id}')
+    recommendation_cache.delete(user_id)
+    logger.info(f'Invalidated recommendation cache for user {user_id}')
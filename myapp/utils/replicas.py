@@ -0,0 +1,268 @@
+"""
+Read Replicas
+Sends opted-in read-only queries to the replica databases (DB_REPLICA_URLS,
+aliases listed in settings.DATABASE_REPLICAS). Everything else uses 'default'.
+
+Usage:
+    from myapp.utils.replicas import read_from_replica, use_replica, replica
+
+    @login_required
+    @read_from_replica                          # GET/HEAD requests of a view
+    def notification_page(request):
+        ...
+
+    with use_replica():                         # a block of code
+        logs = list(Log.objects.filter(user=userinfo_obj))
+
+    replica(Log.objects.filter(user=userinfo_obj))   # a single queryset
+
+ReplicaRouter only routes reads to a replica inside one of these opt-ins, and
+never inside a transaction on 'default'. Replicas lag behind the primary, so:
+
+- Read-your-writes: a request that writes (any non-GET/HEAD request, or a write
+  inside an opt-in) sets a short-lived cookie (REPLICA_STICKY_SECONDS, default 5)
+  and that browser's reads stay on the primary until it expires. A write inside
+  an opt-in also sends the rest of that request's reads to the primary.
+- Replicas whose replay lag exceeds REPLICA_MAX_LAG_SECONDS (PostgreSQL only) or
+  that can't be reached are skipped; with none left, reads use the primary. Lag
+  is checked in a background thread, at most every LAG_CHECK_INTERVAL_SECONDS per
+  process, and requests use the last result (a replica is only used once its
+  first check has passed).
+
+Cache and session tables are always read from and written to the primary.
+"""
+import functools
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+STICKY_COOKIE_NAME = 'db_primary_until'
+DEFAULT_STICKY_SECONDS = 5
+DEFAULT_MAX_LAG_SECONDS = 30
+LAG_CHECK_INTERVAL_SECONDS = 10
+
+# Read and written on the primary only: the database cache backend and sessions
+PRIMARY_ONLY_APPS = {'django_cache', 'sessions'}
+
+# Requests that read only: they may use replicas and don't pin the browser to the primary
+SAFE_METHODS = ('GET', 'HEAD')
+
+_LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+# alias -> (checked_at, healthy), per process; a replica is unused until its first check
+_health = {}
+_probing = set()
+_health_lock = threading.Lock()
+
+
+class _Scope:
+    """Replica state of the current request (or use_replica block)"""
+
+    def __init__(self, pinned=False):
+        self.enabled = False
+        self.pinned = pinned
+        self.wrote = False
+
+
+_scope = ContextVar('replica_scope', default=None)
+
+
+def get_replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def _replica_lag(alias):
+    """Replay lag of a replica in seconds (0 when caught up or not a standby)"""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(_LAG_SQL)
+        lag = cursor.fetchone()[0]
+    return float(lag or 0)
+
+
+def _is_healthy(alias):
+    """
+    Last known health of a replica. A stale result triggers a check in a
+    background thread, so a slow or unreachable replica never blocks a request.
+    """
+    now = time.monotonic()
+    with _health_lock:
+        checked_at, healthy = _health.get(alias, (None, False))
+        if (checked_at is None or now - checked_at >= LAG_CHECK_INTERVAL_SECONDS) and alias not in _probing:
+            _probing.add(alias)
+            threading.Thread(target=check_replica, args=(alias,), name=f'replica-check-{alias}', daemon=True).start()
+    return healthy
+
+
+def check_replica(alias):
+    """
+    Measure a replica's lag and record whether reads may use it.
+
+    Returns:
+        True if the replica is reachable and within REPLICA_MAX_LAG_SECONDS
+    """
+    max_lag = getattr(settings, 'REPLICA_MAX_LAG_SECONDS', DEFAULT_MAX_LAG_SECONDS)
+    try:
+        lag = _replica_lag(alias)
+        healthy = lag <= max_lag
+        if not healthy:
+            logger.warning(f'Replica {alias} is {lag:.1f}s behind, reading from the primary')
+    except Exception as e:
+        healthy = False
+        logger.warning(f'Replica {alias} unavailable, reading from the primary: {e}')
+    finally:
+        # The connection belongs to this (checking) thread
+        connections[alias].close()
+
+    with _health_lock:
+        _health[alias] = (time.monotonic(), healthy)
+        _probing.discard(alias)
+    return healthy
+
+
+def choose_replica():
+    """
+    Pick a healthy replica for a read.
+
+    Returns:
+        Replica alias, or None if there is no usable replica
+    """
+    replicas = [alias for alias in get_replicas() if _is_healthy(alias)]
+    return random.choice(replicas) if replicas else None
+
+
+def _read_alias():
+    scope = _scope.get()
+    if scope is None or not scope.enabled or scope.pinned or scope.wrote:
+        return None
+    # Reads inside a transaction must see its writes
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return None
+    return choose_replica()
+
+
+class ReplicaRouter:
+    """
+    Database router: opted-in reads go to a replica, everything else to 'default'.
+    Only 'default' is migrated; replicas get their schema through replication.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+        return _read_alias() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        scope = _scope.get()
+        if scope is not None and scope.enabled and model._meta.app_label not in PRIMARY_ONLY_APPS:
+            scope.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_replicas():
+            return False
+        return None
+
+
+@contextmanager
+def request_scope(pinned=False):
+    """
+    Track replica state for one request (see ReplicaStickinessMiddleware).
+
+    Yields:
+        The scope; its `wrote` attribute tells whether an opted-in block wrote
+    """
+    scope = _Scope(pinned=pinned)
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
+
+
+@contextmanager
+def use_replica():
+    """Send the reads of this block to a replica (subject to stickiness and transactions)"""
+    scope = _scope.get()
+    token = None
+    if scope is None:
+        # Outside a request (commands, tasks): a scope just for this block
+        scope = _Scope()
+        token = _scope.set(scope)
+    previous = scope.enabled
+    scope.enabled = True
+    try:
+        yield scope
+    finally:
+        scope.enabled = previous
+        if token is not None:
+            _scope.reset(token)
+
+
+def read_from_replica(view_func):
+    """View decorator: SAFE_METHODS (GET and HEAD) requests read from a replica"""
+    @functools.wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return view_func(request, *args, **kwargs)
+        with use_replica():
+            return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def replica(queryset):
+    """
+    Evaluate one queryset on a replica.
+    Returns the queryset unchanged when the current request is pinned to the primary
+    or no replica is usable.
+    """
+    scope = _scope.get()
+    if scope is not None and (scope.pinned or scope.wrote):
+        return queryset
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return queryset
+    alias = choose_replica()
+    return queryset.using(alias) if alias else queryset
+
+
+def is_pinned(request):
+    """True if this browser wrote recently and must read from the primary"""
+    try:
+        return float(request.COOKIES.get(STICKY_COOKIE_NAME, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def pin(response):
+    """Keep this browser's reads on the primary for REPLICA_STICKY_SECONDS"""
+    seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS)
+    response.set_cookie(
+        STICKY_COOKIE_NAME,
+        str(int(time.time() + seconds) + 1),
+        max_age=seconds,
+        httponly=True,
+        samesite='Lax',
+        secure=settings.SESSION_COOKIE_SECURE,
+    )
+    return response
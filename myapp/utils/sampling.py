@@ -0,0 +1,101 @@
+"""
+Random Developer Sampling
+Random suggestions without ORDER BY random() over the whole userinfo table.
+
+    from myapp.utils.sampling import sample_developer_ids
+    sample_developer_ids(7, exclude={me.id, *following_ids})
+
+A shuffled pool of active userinfo ids is kept in the shared cache and rebuilt
+every POOL_TTL_SECONDS. Small sites load every id; larger ones fill the pool by
+probing random id ranges (an indexed range scan each), so a rebuild costs
+O(POOL_SIZE) rows no matter how big the table is. Each request starts at a random
+offset in the pool and walks forward past excluded ids: O(k + excluded).
+
+Trade-offs: suggestions come from the current pool only (a new pool every few
+minutes), and range probing slightly favours ids that follow gaps in the
+sequence.
+"""
+import logging
+import random
+
+from django.db.models import Max, Min
+
+from myapp.utils.cache import CacheNamespace
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = 2000
+POOL_TTL_SECONDS = 600
+# Consecutive ids read per random probe
+PROBE_SIZE = 50
+# Probes per pool rebuild, before giving up on a sparse id range
+MAX_PROBES = 4 * POOL_SIZE // PROBE_SIZE
+
+sample_pool_cache = CacheNamespace('developer_sample_pool', ttl=POOL_TTL_SECONDS)
+
+
+def _eligible():
+    from myapp.models import userinfo
+
+    return userinfo.objects.filter(user__is_active=True)
+
+
+def build_sample_pool(size=POOL_SIZE):
+    """
+    Collect up to `size` random active userinfo ids.
+
+    Returns:
+        Shuffled list of ids
+    """
+    eligible = _eligible()
+    bounds = eligible.aggregate(low=Min('id'), high=Max('id'))
+    low, high = bounds['low'], bounds['high']
+    if low is None:
+        return []
+
+    if high - low < size:
+        # The whole id range fits in the pool: one indexed scan
+        ids = list(eligible.values_list('id', flat=True))
+    else:
+        found = set()
+        for _ in range(MAX_PROBES):
+            if len(found) >= size:
+                break
+            start = random.randint(low, high)
+            found.update(eligible.filter(id__gte=start).order_by('id').values_list('id', flat=True)[:PROBE_SIZE])
+        ids = list(found)
+
+    random.shuffle(ids)
+    return ids[:size]
+
+
+def get_sample_pool():
+    """The current shuffled pool, rebuilt on one worker when it expires"""
+    return sample_pool_cache.get_or_compute('ids', build_sample_pool)
+
+
+def sample_developer_ids(k, exclude=()):
+    """
+    Pick up to `k` random active userinfo ids.
+
+    Args:
+        k: Number of ids wanted
+        exclude: Ids to skip (self, already followed, already shown)
+
+    Returns:
+        List of at most `k` distinct ids in random order
+    """
+    pool = get_sample_pool()
+    if not pool or k <= 0:
+        return []
+
+    exclude = exclude if isinstance(exclude, (set, frozenset)) else set(exclude)
+    start = random.randrange(len(pool))
+    picked = []
+    for offset in range(len(pool)):
+        dev_id = pool[(start + offset) % len(pool)]
+        if dev_id not in exclude:
+            picked.append(dev_id)
+            if len(picked) >= k:
+                break
+    return picked
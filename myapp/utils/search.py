@@ -5,6 +5,8 @@ Provides fuzzy search with intelligent ranking based on search relevance and net
 from django.db.models import Q, Count, Case, When, IntegerField, Value
 from django.contrib.postgres.search import TrigramSimilarity
 from myapp.models import userinfo
+from myapp.utils.follow_graph import get_follow_graph
+from myapp.utils.skill_index import get_skill_index
 import re
 
 
@@ -33,17 +35,12 @@ def search_developers(query, current_user, limit=20):
     if not query or len(query) < 2:
         return []
     
-    # Get user's following for mutual connection calculation
-    current_following = set(current_userinfo.following.values_list('following_id', flat=True))
-    
     # Perform fuzzy search using trigram similarity
     candidates = userinfo.objects.exclude(
         id=current_userinfo.id  # Exclude self
     ).select_related(
         'user',
         'coding_style'
-    ).prefetch_related(
-        'following__following'
     ).annotate(
         # Trigram similarity for username
         username_sim=TrigramSimilarity('user__username', query),
@@ -64,21 +61,29 @@ def search_developers(query, current_user, limit=20):
         Q(bio__icontains=query)
     )[:100]  # Limit initial candidates for performance
     
+    candidates = list(candidates)
+    
+    # Mutual connection counts for every candidate in one vectorized pass
+    mutual_counts = get_follow_graph().mutual_counts(current_userinfo.id, [c.id for c in candidates])
+    
+    # Skill names come from the skill index instead of a query per candidate
+    skill_index = get_skill_index()
+    
     # Score and rank results
     scored_results = []
     
-    for candidate in candidates:
+    for candidate, mutual_count in zip(candidates, mutual_counts.tolist()):
         # Calculate search relevance score (0-100)
         search_score = calculate_search_relevance(
             candidate, query,
             candidate.username_sim,
             candidate.first_name_sim,
             candidate.last_name_sim,
-            candidate.bio_sim
+            candidate.bio_sim,
+            skill_names=skill_index.skill_names(candidate.id)
         )
         
         # Calculate network score (0-100)
-        mutual_count = calculate_mutual_connections(candidate, current_following)
         network_score = calculate_network_score(candidate, current_userinfo, mutual_count)
         
         # Composite score: 60% search relevance + 40% network score
@@ -106,10 +111,13 @@ def sanitize_query(query):
     return query.strip()
 
 
-def calculate_search_relevance(candidate, query, username_sim, first_name_sim, last_name_sim, bio_sim):
+def calculate_search_relevance(candidate, query, username_sim, first_name_sim, last_name_sim, bio_sim,
+                               skill_names=None):
     """
     Calculate search relevance score (0-100)
     
+    skill_names: Lowercase skill names (read from candidate.skills when omitted)
+    
     Weights:
     - Username: 40%
     - Full name: 30%
@@ -152,8 +160,8 @@ def calculate_search_relevance(candidate, query, username_sim, first_name_sim, l
             score += bio_sim * 15
     
     # Skills matching (10 points max)
-    skills = candidate.skills.all()
-    skill_names = [s.name.lower() for s in skills]
+    if skill_names is None:
+        skill_names = [s.name.lower() for s in candidate.skills.all()]
     if any(query_lower in skill for skill in skill_names):
         score += 10
     elif any(query_lower == skill for skill in skill_names):
@@ -168,11 +176,9 @@ def calculate_search_relevance(candidate, query, username_sim, first_name_sim, l
     return min(score, 100)
 
 
-def calculate_mutual_connections(candidate, current_following):
+def calculate_mutual_connections(candidate, current_userinfo):
     """Calculate number of mutual connections"""
-    candidate_following = set(candidate.following.values_list('following_id', flat=True))
-    mutual = current_following & candidate_following
-    return len(mutual)
+    return len(get_follow_graph().mutuals(current_userinfo.id, candidate.id))
 
 
 def calculate_network_score(candidate, current_user, mutual_count):
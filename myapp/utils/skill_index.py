@@ -0,0 +1,362 @@
+"""
+Skill Index
+Process-local sparse user x skill matrix for skill overlap and similarity.
+
+    index = get_skill_index()
+    index.skill_ids(user_id)                      # sorted skill ids
+    index.skill_names(user_id)                    # lowercase skill names
+    index.shared_counts(user_id, candidate_ids)   # skills in common per candidate
+    index.similarity(user_id, candidate_ids)      # cosine (or metric='jaccard') per candidate
+    get_similar_developers(user_id)               # precomputed top-k [(userinfo_id, similarity), ...]
+
+Layout: binary CSR with one row per userinfo id and one column per skill id.
+
+Freshness: skill edits (EditSkillForm, admin) fire m2m_changed. After commit the
+editor's row is spliced into this worker's index, a shared version is bumped so
+other workers reload within VERSION_CHECK_SECONDS, and the editor's top-k list
+is recomputed in the background. Top-k lists live in the shared cache; they are
+precomputed in batches by `manage.py build_skill_index` and computed on demand
+(one sparse product) when missing.
+"""
+import logging
+import threading
+import time
+
+import numpy as np
+from django.db import transaction
+from scipy import sparse
+
+from myapp.utils.cache import CacheNamespace
+
+logger = logging.getLogger(__name__)
+
+TOP_K = 50
+# Users scored per sparse product when precomputing top-k lists
+BATCH_SIZE = 256
+VERSION_CHECK_SECONDS = 30
+# Reloads triggered by other workers' edits happen at most this often
+MIN_RELOAD_SECONDS = 60
+METRICS = ('cosine', 'jaccard')
+
+# Shared index version (bumped on every skill edit)
+skill_index_state = CacheNamespace('skill_index', ttl=7 * 24 * 3600)
+# userinfo id -> [(userinfo_id, similarity), ...] most similar first
+similar_developers_cache = CacheNamespace('similar_developers', ttl=24 * 3600)
+
+_EMPTY = np.zeros(0, dtype=np.int64)
+
+
+class SkillIndex:
+    """Binary user x skill CSR; edits since the load are spliced into the arrays"""
+
+    def __init__(self, matrix, names, version=None):
+        self.names = names  # skill id -> lowercase name
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.last_check = self.loaded_at
+        self._lock = threading.Lock()
+        self._set_matrix(matrix.tocsr().astype(np.float32))
+
+    def _set_matrix(self, matrix):
+        # Swapped as one tuple so readers never pair a matrix with another's row sizes
+        self._state = (matrix, np.diff(matrix.indptr))
+
+    @property
+    def matrix(self):
+        return self._state[0]
+
+    @property
+    def row_sizes(self):
+        return self._state[1]
+
+    @property
+    def num_users(self):
+        return self.matrix.shape[0]
+
+    @property
+    def num_skills(self):
+        return self.matrix.shape[1]
+
+    @classmethod
+    def from_pairs(cls, user_ids, skill_ids, names=None, num_users=None, version=None):
+        """
+        Build an index from parallel arrays of userinfo and skill ids.
+        """
+        rows = np.asarray(user_ids, dtype=np.int64)
+        cols = np.asarray(skill_ids, dtype=np.int64)
+        names = names or {}
+        if num_users is None:
+            num_users = int(rows.max()) + 1 if len(rows) else 0
+        num_skills = max(int(cols.max()) + 1 if len(cols) else 0, max(names, default=-1) + 1)
+
+        matrix = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(num_users, num_skills),
+        )
+        # Duplicate pairs would sum above 1
+        matrix.data[:] = 1.0
+        matrix.sort_indices()
+        return cls(matrix, names, version)
+
+    @classmethod
+    def load(cls, version=None):
+        """Build from the userinfo.skills table"""
+        from django.db.models import Max
+        from myapp.models import skill, userinfo
+
+        started = time.perf_counter()
+        through = userinfo.skills.through
+        pairs = np.array(
+            list(through.objects.values_list('userinfo_id', 'skill_id').iterator(chunk_size=20000)),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        names = {skill_id: name.lower() for skill_id, name in skill.objects.values_list('id', 'name')}
+        num_users = max(
+            (userinfo.objects.aggregate(max_id=Max('id'))['max_id'] or 0) + 1,
+            int(pairs[:, 0].max()) + 1 if len(pairs) else 0,
+        )
+
+        index = cls.from_pairs(pairs[:, 0], pairs[:, 1], names, num_users, version)
+        logger.info(
+            f'Loaded skill index: {len(pairs)} user skills, {index.num_users} users, '
+            f'{index.num_skills} skills in {time.perf_counter() - started:.2f}s'
+        )
+        return index
+
+    # Updates
+
+    def set_user_skills(self, user_id, skill_ids, names=None):
+        """
+        Replace one user's row in place of a full reload (O(nnz) array splice).
+
+        Args:
+            names: skill id -> name for skills created since the load
+        """
+        row = np.unique(np.asarray(list(skill_ids), dtype=np.int64))
+        with self._lock:
+            if names:
+                self.names.update({skill_id: name.lower() for skill_id, name in names.items()})
+            matrix = self.matrix
+            indptr = matrix.indptr.astype(np.int64)
+            num_users = max(matrix.shape[0], user_id + 1)
+            num_skills = max(matrix.shape[1], int(row.max()) + 1 if len(row) else 0)
+            if num_users > matrix.shape[0]:
+                indptr = np.concatenate([indptr, np.full(num_users - matrix.shape[0], indptr[-1])])
+
+            start, end = indptr[user_id], indptr[user_id + 1]
+            indices = np.concatenate([matrix.indices[:start], row, matrix.indices[end:]])
+            indptr[user_id + 1:] += len(row) - (end - start)
+            self._set_matrix(sparse.csr_matrix(
+                (np.ones(len(indices), dtype=np.float32), indices, indptr),
+                shape=(num_users, num_skills),
+            ))
+
+    # Reads
+
+    def skill_ids(self, user_id):
+        """Sorted skill ids for a user"""
+        return _row(self.matrix, user_id)
+
+    def skill_names(self, user_id):
+        """Lowercase skill names for a user"""
+        return [self.names[skill_id] for skill_id in self.skill_ids(user_id).tolist() if skill_id in self.names]
+
+    def _overlap(self, user_id, candidates):
+        """
+        Returns:
+            (shared skill count per candidate, skill count per candidate, the user's skill count)
+        """
+        matrix, row_sizes = self._state
+        candidates = np.asarray(candidates, dtype=np.int64)
+        mine = _row(matrix, user_id)
+        shared = np.zeros(len(candidates), dtype=np.int64)
+        sizes = np.zeros(len(candidates), dtype=np.int64)
+
+        in_range = (candidates >= 0) & (candidates < matrix.shape[0])
+        if in_range.any():
+            sizes[in_range] = row_sizes[candidates[in_range]]
+            if len(mine):
+                vector = np.zeros(matrix.shape[1], dtype=np.float32)
+                vector[mine] = 1.0
+                shared[in_range] = np.rint(matrix[candidates[in_range]] @ vector).astype(np.int64)
+        return shared, sizes, len(mine)
+
+    def shared_counts(self, user_id, candidates):
+        """
+        Count the skills `user_id` shares with each candidate.
+
+        Returns:
+            int64 array aligned with `candidates`
+        """
+        return self._overlap(user_id, candidates)[0]
+
+    def similarity(self, user_id, candidates, metric='cosine'):
+        """
+        Skill-set similarity between `user_id` and each candidate.
+
+        Args:
+            metric: 'cosine' (|A∩B| / sqrt(|A||B|)) or 'jaccard' (|A∩B| / |A∪B|)
+
+        Returns:
+            float array in [0, 1] aligned with `candidates`
+        """
+        shared, sizes, own_size = self._overlap(user_id, candidates)
+        return _similarity(shared, sizes, own_size, metric)
+
+    def top_k(self, user_ids, k=TOP_K, metric='cosine'):
+        """
+        Most similar users for each of `user_ids`, with one sparse product for the batch.
+
+        Returns:
+            List aligned with `user_ids` of [(userinfo_id, similarity), ...], most similar first
+        """
+        matrix, row_sizes = self._state
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        in_range = user_ids[(user_ids >= 0) & (user_ids < matrix.shape[0])]
+        queries = matrix[in_range]
+        # (batch x users) shared skill counts; only users sharing a skill are stored
+        overlaps = (queries @ matrix.T).tocsr()
+        positions = {user_id: i for i, user_id in enumerate(in_range.tolist())}
+
+        results = []
+        for user_id in user_ids.tolist():
+            i = positions.get(user_id)
+            if i is None:
+                results.append([])
+                continue
+            start, end = overlaps.indptr[i], overlaps.indptr[i + 1]
+            others = overlaps.indices[start:end].astype(np.int64)
+            shared = np.rint(overlaps.data[start:end]).astype(np.int64)
+            keep = others != user_id
+            others, shared = others[keep], shared[keep]
+            if len(others) == 0:
+                results.append([])
+                continue
+
+            scores = _similarity(shared, row_sizes[others], int(row_sizes[user_id]), metric)
+            top = min(k, len(others))
+            picked = np.argpartition(-scores, top - 1)[:top]
+            # Ties broken by id so repeated runs give the same list
+            picked = picked[np.lexsort((others[picked], -scores[picked]))]
+            results.append([(int(others[j]), round(float(scores[j]), 4)) for j in picked])
+        return results
+
+
+def _row(matrix, user_id):
+    if 0 <= user_id < matrix.shape[0]:
+        return matrix.indices[matrix.indptr[user_id]:matrix.indptr[user_id + 1]].astype(np.int64)
+    return _EMPTY
+
+
+def _similarity(shared, sizes, own_size, metric):
+    if metric not in METRICS:
+        raise ValueError(f'Unknown similarity metric: {metric}')
+    shared = shared.astype(np.float64)
+    if metric == 'cosine':
+        denominator = np.sqrt(sizes * float(own_size))
+    else:
+        denominator = sizes + own_size - shared
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, shared / denominator, 0.0)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _shared_version():
+    return skill_index_state.get('version', 0)
+
+
+def get_skill_index():
+    """
+    This worker's skill index, loading it or reloading it after edits elsewhere.
+    """
+    global _index
+    index = _index
+    now = time.monotonic()
+
+    if index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SkillIndex.load(_shared_version())
+            return _index
+
+    if now - index.last_check > VERSION_CHECK_SECONDS:
+        index.last_check = now
+        if _shared_version() != index.version and now - index.loaded_at > MIN_RELOAD_SECONDS:
+            with _index_lock:
+                if _index is index:
+                    try:
+                        _index = SkillIndex.load(_shared_version())
+                    except Exception as e:
+                        logger.warning(f'Skill index reload failed: {e}')
+            return _index
+    return index
+
+
+def get_similar_developers(user_id, k=TOP_K):
+    """
+    The users whose skills are most similar to `user_id`'s (cosine).
+
+    Returns:
+        List of (userinfo_id, similarity) tuples, most similar first
+    """
+    similar = similar_developers_cache.get(user_id)
+    if similar is None:
+        similar = get_skill_index().top_k([user_id])[0]
+        similar_developers_cache.set(user_id, similar)
+    return similar[:k]
+
+
+def precompute_similar_developers(user_ids=None, batch_size=BATCH_SIZE):
+    """
+    Compute and cache top-k lists in batches.
+
+    Args:
+        user_ids: userinfo ids to refresh (defaults to every user with skills)
+
+    Returns:
+        Number of lists written
+    """
+    index = get_skill_index()
+    if user_ids is None:
+        user_ids = np.flatnonzero(index.row_sizes).tolist()
+
+    written = 0
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        similar_developers_cache.set_many(dict(zip(batch, index.top_k(batch))))
+        written += len(batch)
+    return written
+
+
+def record_skills_change(user_id):
+    """
+    Propagate a user's skill edit once the surrounding transaction commits.
+    """
+    from myapp.models import userinfo
+    from myapp.utils.tasks import enqueue
+
+    def publish():
+        skills = dict(
+            userinfo.skills.through.objects.filter(userinfo_id=user_id).values_list('skill_id', 'skill__name')
+        )
+        index = _index
+        previous = _shared_version()
+        version = _new_version()
+        skill_index_state.set('version', version)
+        if index is not None:
+            index.set_user_skills(user_id, skills, names=skills)
+            # Only an index that had every earlier edit may claim the new version;
+            # one that missed another worker's edit stays stale and reloads
+            if index.version == previous:
+                index.version = version
+        similar_developers_cache.delete(user_id)
+        enqueue('refresh_similar_developers', {'user_ids': [user_id]})
+
+    transaction.on_commit(publish)
+
+
+def _new_version():
+    return int(time.time() * 1000)
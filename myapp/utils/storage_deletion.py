@@ -0,0 +1,147 @@
+"""
+Storage Deletion Queue
+Deletes files from the default storage in batches, outside the request.
+
+Usage:
+    from myapp.utils.storage_deletion import queue_storage_deletion
+    queue_storage_deletion(['uploads/a.jpg', 'uploads/a__w192.webp'])
+
+Names are written to PendingStorageDeletion in the caller's transaction. Queue
+them after the write that drops the reference (post_save/post_delete, or after
+the update()), never before it: requests run in autocommit, so a queue row
+written first is committed even if the write that should follow it fails.
+The `drain_storage_deletions` task claims due rows (SKIP LOCKED, like
+claim_tasks) and removes them with DeleteObjects requests of up to 1000 keys
+(helpers.cloudflare.storages.MediaFileStorage.delete_many); storages without
+batch deletes (local development) fall back to one delete() per file. Failed
+names are retried with exponential backoff.
+"""
+import logging
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# One DeleteObjects request
+CLAIM_BATCH_SIZE = 1000
+RETRY_BASE_DELAY_SECONDS = 60
+# Rows stuck in 'deleting' this long (crashed worker) are claimed again
+DELETING_TIMEOUT_SECONDS = 600
+
+
+def queue_storage_deletion(names):
+    """
+    Queue files for deletion from the default storage.
+
+    Returns:
+        Number of names queued
+    """
+    from myapp.models import PendingStorageDeletion
+
+    names = [name for name in dict.fromkeys(names) if name]
+    if not names:
+        return 0
+    PendingStorageDeletion.objects.bulk_create([PendingStorageDeletion(name=name) for name in names])
+    schedule_drain()
+    return len(names)
+
+
+def schedule_drain():
+    """Queue a drain task unless one is already due"""
+    from myapp.models import BackgroundTask
+    from myapp.utils.tasks import enqueue
+
+    if not BackgroundTask.objects.filter(
+        name='drain_storage_deletions', status='pending', run_at__lte=timezone.now()
+    ).exists():
+        enqueue('drain_storage_deletions')
+
+
+def claim_deletions(limit=CLAIM_BATCH_SIZE):
+    """
+    Claim due rows for this worker.
+    Claimed rows get a lease via next_attempt_at so a crashed worker's rows come back.
+    """
+    from myapp.models import PendingStorageDeletion
+
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            PendingStorageDeletion.objects
+            .select_for_update(skip_locked=True)
+            .filter(Q(status='queued') | Q(status='deleting'), next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:limit]
+        )
+        if rows:
+            PendingStorageDeletion.objects.filter(id__in=[row.id for row in rows]).update(
+                status='deleting',
+                attempts=F('attempts') + 1,
+                next_attempt_at=now + timedelta(seconds=DELETING_TIMEOUT_SECONDS),
+            )
+            for row in rows:
+                row.status = 'deleting'
+                row.attempts += 1
+    return rows
+
+
+def delete_files(names, storage=None):
+    """
+    Delete files from `storage`, batched when the backend supports it.
+
+    Returns:
+        Dictionary of name -> error message for the files that were not deleted
+    """
+    storage = storage or default_storage
+    if hasattr(storage, 'delete_many'):
+        return storage.delete_many(names)
+
+    failures = {}
+    for name in names:
+        try:
+            storage.delete(name)
+        except Exception as e:
+            failures[name] = str(e)
+    return failures
+
+
+def drain_pending(limit=CLAIM_BATCH_SIZE):
+    """
+    Claim and delete up to `limit` queued files.
+
+    Returns:
+        Number of rows processed (deleted, retried or failed)
+    """
+    from myapp.models import PendingStorageDeletion
+
+    rows = claim_deletions(limit)
+    if not rows:
+        return 0
+
+    failures = delete_files([row.name for row in rows])
+
+    now = timezone.now()
+    deleted, retried, failed = [], [], []
+    for row in rows:
+        error = failures.get(row.name)
+        if error is None:
+            deleted.append(row.id)
+        elif row.attempts < row.max_attempts:
+            row.status = 'queued'
+            row.next_attempt_at = now + timedelta(seconds=RETRY_BASE_DELAY_SECONDS * (2 ** (row.attempts - 1)))
+            row.last_error = error
+            retried.append(row)
+        else:
+            row.status = 'failed'
+            row.last_error = error
+            failed.append(row)
+
+    PendingStorageDeletion.objects.filter(id__in=deleted).delete()
+    PendingStorageDeletion.objects.bulk_update(retried + failed, ['status', 'next_attempt_at', 'last_error'])
+
+    if retried or failed:
+        logger.warning(f'Storage deletion: {len(deleted)} deleted, {len(retried)} retrying, {len(failed)} failed')
+    return len(rows)
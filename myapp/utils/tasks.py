@@ -0,0 +1,434 @@
+"""
+Background Task Queue
+Lightweight database-backed task runner (no external broker required).
+
+Usage:
+    from myapp.utils.tasks import task, enqueue
+
+    @task('delete_storage_files')
+    def delete_storage_files(names):
+        ...
+
+    @task('prune_background_tasks', every=timedelta(days=1))   # periodic
+    def prune_background_tasks():
+        ...
+
+    enqueue('delete_storage_files', {'names': ['a.jpg']})
+    enqueue('send_digest', run_at=tomorrow)                      # scheduled
+
+Handlers live in each app's `tasks.py` and are registered on startup.
+Workers run with `python manage.py run_tasks`, optionally as a pool of threads
+or processes (`--workers 4 --pool process`). Workers claim due rows with
+SELECT ... FOR UPDATE SKIP LOCKED, so any number of them can poll the table.
+
+Failed tasks are retried with exponential backoff. A claimed task holds a lease
+of `lease` seconds; rows still 'running' past it (crashed or hung worker) are
+released as a failed attempt and retried. The lease is not a timeout: a hung
+handler is not stopped and may still be running when its retry starts, so
+handlers must be idempotent (safe to run twice, or concurrently with a retry).
+Outcomes are only written while the claim still holds, so a run that finishes
+after its lease was released cannot overwrite the retry's state. Periodic tasks keep one row each: the workers'
+scheduler creates it when none is queued, and each run puts it back to
+'pending' for its next run when it finishes, so frequent sweeps don't add a row
+per run. Per-task outcomes and durations of recent runs are computed from the
+task rows by get_task_metrics() (`run_tasks --stats`); a periodic task reports
+its latest run.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Max, Min, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+logger = logging.getLogger(__name__)
+
+# name -> {'func', 'max_attempts', 'on_failure', 'keep_payload', 'lease', 'every'}
+TASK_REGISTRY = {}
+
+RETRY_BASE_DELAY_SECONDS = 30
+DEFAULT_LEASE_SECONDS = 600
+
+# Window of finished runs summarized by get_task_metrics()
+METRICS_WINDOW = timedelta(hours=1)
+
+
+def task(name=None, max_attempts=3, on_failure=None, keep_payload=True, lease=DEFAULT_LEASE_SECONDS, every=None):
+    """
+    Register a function as a background task handler.
+
+    Args:
+        name: Task name (defaults to the function name)
+        max_attempts: Attempts before the task is marked failed
+        on_failure: Optional callback(**payload) run once the task has failed for good
+        keep_payload: Set False for bulky payloads (e.g. image data) to clear them once done
+        lease: Seconds a claimed run holds its row; after that it is released as a failed
+            attempt and retried, while the original run may still be going (not a timeout)
+        every: timedelta for periodic tasks; the scheduler keeps one run queued that far apart
+    """
+    def decorator(func):
+        TASK_REGISTRY[name or func.__name__] = {
+            'func': func,
+            'max_attempts': max_attempts,
+            'on_failure': on_failure,
+            'keep_payload': keep_payload,
+            'lease': lease,
+            'every': every,
+        }
+        return func
+    return decorator
+
+
+def autodiscover():
+    """Import every installed app's tasks module so handlers get registered"""
+    autodiscover_modules('tasks')
+
+
+def enqueue(name, payload=None, run_at=None, max_attempts=None):
+    """
+    Queue a task for a worker.
+
+    The row is written in the caller's transaction, so a task is only visible
+    to workers once the surrounding work has been committed.
+
+    Returns:
+        BackgroundTask object
+    """
+    from myapp.models import BackgroundTask
+
+    if name not in TASK_REGISTRY:
+        raise ValueError(f'Unknown background task: {name}')
+
+    background_task = BackgroundTask.objects.create(
+        name=name,
+        payload=payload or {},
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or TASK_REGISTRY[name]['max_attempts'],
+    )
+
+    if getattr(settings, 'BACKGROUND_TASKS_EAGER', False) and run_at is None:
+        # Development convenience: run right after commit instead of waiting for a worker.
+        # Delayed tasks (retries, scheduled work) are left for `run_tasks`
+        transaction.on_commit(lambda: _run_eagerly(background_task))
+
+    return background_task
+
+
+def _run_eagerly(background_task):
+    """Claim a just-committed task and run it in this process"""
+    from myapp.models import BackgroundTask
+
+    now = timezone.now()
+    if BackgroundTask.objects.filter(pk=background_task.pk, status='pending').update(status='running', started_at=now):
+        background_task.status = 'running'
+        background_task.started_at = now
+        run_task(background_task)
+
+
+def schedule_periodic():
+    """
+    Queue the next run of every periodic task that has none pending or running.
+    The first run is due immediately, later ones `every` after the previous run started.
+
+    Returns:
+        Number of runs queued
+    """
+    from myapp.models import BackgroundTask
+
+    periodic = {name: entry['every'] for name, entry in TASK_REGISTRY.items() if entry['every']}
+    if not periodic:
+        return 0
+
+    queued = set(
+        BackgroundTask.objects.filter(name__in=periodic, status__in=['pending', 'running'])
+        .values_list('name', flat=True)
+    )
+    last_runs = dict(
+        BackgroundTask.objects.filter(name__in=periodic).exclude(started_at=None)
+        .values_list('name').annotate(last=Max('started_at')).order_by()
+    )
+    scheduled = 0
+    for name, every in periodic.items():
+        if name in queued:
+            continue
+        last = last_runs.get(name)
+        if _queue_periodic(name, last + every if last else timezone.now()):
+            scheduled += 1
+    return scheduled
+
+
+def _queue_periodic(name, run_at):
+    """
+    Queue a run of a periodic task.
+    The unique_queued_periodic_task constraint rejects it when a run is already queued.
+
+    Returns:
+        True if a run was queued
+    """
+    from myapp.models import BackgroundTask
+
+    try:
+        with transaction.atomic():
+            BackgroundTask.objects.create(
+                name=name,
+                run_at=run_at,
+                max_attempts=TASK_REGISTRY[name]['max_attempts'],
+                periodic=True,
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+def requeue_stale():
+    """
+    Release tasks whose worker died or hung: rows 'running' for longer than
+    their task's lease are retried (or failed) like a run that raised. The
+    original run is not stopped.
+
+    Returns:
+        Number of tasks released
+    """
+    from myapp.models import BackgroundTask
+
+    now = timezone.now()
+    shortest = min((entry['lease'] for entry in TASK_REGISTRY.values()), default=DEFAULT_LEASE_SECONDS)
+    candidates = BackgroundTask.objects.filter(status='running', started_at__lt=now - timedelta(seconds=shortest))
+
+    released = 0
+    for background_task in candidates:
+        lease = TASK_REGISTRY.get(background_task.name, {}).get('lease', DEFAULT_LEASE_SECONDS)
+        if background_task.started_at >= now - timedelta(seconds=lease):
+            continue
+        error = f'Lease expired after {lease}s (worker lost or hung)'
+        # Guarded on the claim: the worker may have finished it in the meantime
+        if _record_failure(background_task, error):
+            logger.warning(f'Task {background_task} released: {error}')
+            _queue_next_run(background_task, TASK_REGISTRY.get(background_task.name) or {})
+            released += 1
+    return released
+
+
+def claim_tasks(limit=10):
+    """
+    Claim due tasks for this worker.
+    SKIP LOCKED lets several workers poll the table without blocking each other.
+    """
+    from myapp.models import BackgroundTask
+
+    now = timezone.now()
+    with transaction.atomic():
+        tasks = list(
+            BackgroundTask.objects
+            .select_for_update(skip_locked=True)
+            .filter(status='pending', run_at__lte=now)
+            .order_by('run_at', 'id')[:limit]
+        )
+        if tasks:
+            BackgroundTask.objects.filter(id__in=[t.id for t in tasks]).update(status='running', started_at=now)
+            for t in tasks:
+                t.status = 'running'
+                t.started_at = now
+    return tasks
+
+
+def _record_failure(background_task, error):
+    """
+    Schedule a retry or mark the task failed for good (running on_failure).
+
+    The update is guarded on the claim (status 'running' with the same started_at),
+    so a run whose lease was already released cannot overwrite the row's newer state.
+
+    Returns:
+        True if the row was updated (False if the claim had been released)
+    """
+    entry = TASK_REGISTRY.get(background_task.name) or {}
+    attempts = background_task.attempts + 1
+    updates = {'attempts': attempts, 'last_error': error}
+    if attempts < background_task.max_attempts:
+        delay = RETRY_BASE_DELAY_SECONDS * (2 ** (attempts - 1))
+        updates.update(status='pending', run_at=timezone.now() + timedelta(seconds=delay))
+        logger.warning(f'Task {background_task} failed (attempt {attempts}), retrying in {delay}s: {error}')
+    else:
+        updates.update(status='failed', finished_at=timezone.now())
+        logger.error(f'Task {background_task} failed permanently: {error}')
+
+    updated = _claimed(background_task).update(**updates)
+    if not updated:
+        logger.warning(f'Task {background_task} lease was released before it failed; outcome discarded')
+        return False
+    for field, value in updates.items():
+        setattr(background_task, field, value)
+    if updates['status'] == 'failed' and entry.get('on_failure'):
+        try:
+            entry['on_failure'](**background_task.payload)
+        except Exception as hook_error:
+            logger.error(f'on_failure hook for {background_task.name} raised: {hook_error}')
+    return True
+
+
+def _claimed(background_task):
+    """The task's row, as long as it is still held by this claim"""
+    from myapp.models import BackgroundTask
+
+    return BackgroundTask.objects.filter(
+        pk=background_task.pk, status='running', started_at=background_task.started_at
+    )
+
+
+def run_task(background_task):
+    """
+    Execute one claimed task and record the outcome.
+    Failed tasks are retried with exponential backoff until max_attempts.
+
+    Returns:
+        True if the task succeeded
+    """
+    entry = TASK_REGISTRY.get(background_task.name)
+
+    if entry is None:
+        error = f'No handler registered for {background_task.name}'
+        _claimed(background_task).update(
+            status='failed', attempts=background_task.attempts + 1, last_error=error, finished_at=timezone.now()
+        )
+        logger.error(error)
+        return False
+
+    try:
+        entry['func'](**background_task.payload)
+    except Exception as e:
+        _record_failure(background_task, f'{type(e).__name__}: {e}')
+        _queue_next_run(background_task, entry)
+        return False
+
+    updates = {'status': 'done', 'attempts': background_task.attempts + 1, 'finished_at': timezone.now()}
+    if background_task.periodic:
+        # The row is reused for the next run; its last_error describes the latest run
+        updates['last_error'] = ''
+    if not entry['keep_payload']:
+        updates['payload'] = {}
+    if not _claimed(background_task).update(**updates):
+        # requeue_stale released this run after its lease; the row belongs to the retry now
+        logger.warning(f'Task {background_task} finished after its lease was released; outcome discarded')
+        return True
+    for field, value in updates.items():
+        setattr(background_task, field, value)
+    _queue_next_run(background_task, entry)
+    return True
+
+
+def _queue_next_run(background_task, entry):
+    """
+    Put a finished periodic run's row back to 'pending' for the next run (the
+    scheduler is the fallback). The row keeps the finished run's timings and
+    error for get_task_metrics().
+    """
+    from myapp.models import BackgroundTask
+
+    if not (background_task.periodic and entry.get('every') and background_task.status in ('done', 'failed')):
+        return
+    run_at = background_task.started_at + entry['every']
+    BackgroundTask.objects.filter(
+        pk=background_task.pk, status=background_task.status, started_at=background_task.started_at
+    ).update(status='pending', run_at=run_at, attempts=0)
+
+
+def run_pending(limit=10):
+    """
+    Claim and run up to `limit` due tasks.
+
+    Returns:
+        Number of tasks processed
+    """
+    tasks = claim_tasks(limit)
+    for background_task in tasks:
+        run_task(background_task)
+    return len(tasks)
+
+
+def work(stop, batch_size=10, sleep=2.0, once=False):
+    """
+    Worker loop: run due tasks until `stop` (a threading/multiprocessing Event) is set.
+    One loop per pool thread or process.
+
+    Returns:
+        Number of tasks processed
+    """
+    processed = 0
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            count = run_pending(limit=batch_size)
+            processed += count
+            if count == 0:
+                if once:
+                    break
+                stop.wait(sleep)
+    finally:
+        close_old_connections()
+    return processed
+
+
+def get_task_metrics(window=METRICS_WINDOW):
+    """
+    Task queue metrics for monitoring, computed from the task rows so every
+    process (and `run_tasks --stats`) sees the same numbers.
+
+    Args:
+        window: timedelta of finished runs to summarize
+
+    Returns:
+        Dictionary with 'tasks' (per task name: runs, succeeded, failed and the
+        avg/max duration of runs finished within `window`, plus 'retrying', the
+        tasks currently waiting for a retry), 'queue' (row counts by status) and
+        'lag_seconds' (how long the oldest due task has been waiting)
+    """
+    from myapp.models import BackgroundTask
+
+    now = timezone.now()
+    duration = ExpressionWrapper(F('finished_at') - F('started_at'), output_field=DurationField())
+    # A pending periodic row with finished_at set holds its previous run
+    run_failed = Q(status='failed') | Q(periodic=True, status='pending', attempts=0) & ~Q(last_error='')
+    finished = (
+        BackgroundTask.objects
+        .filter(
+            Q(status__in=['done', 'failed']) | Q(periodic=True, status='pending', attempts=0),
+            finished_at__gte=now - window,
+        )
+        .values('name')
+        .annotate(
+            runs=Count('id'),
+            succeeded=Count('id', filter=~run_failed),
+            failed=Count('id', filter=run_failed),
+            avg_duration=Avg(duration),
+            max_duration=Max(duration),
+        )
+        .order_by()
+    )
+    tasks = {}
+    for row in finished:
+        tasks[row['name']] = {
+            'runs': row['runs'],
+            'succeeded': row['succeeded'],
+            'failed': row['failed'],
+            'retrying': 0,
+            'avg_seconds': row['avg_duration'].total_seconds() if row['avg_duration'] else 0.0,
+            'max_seconds': row['max_duration'].total_seconds() if row['max_duration'] else 0.0,
+        }
+    retrying = (
+        BackgroundTask.objects.filter(status='pending', attempts__gt=0)
+        .values_list('name').annotate(total=Count('id')).order_by()
+    )
+    for name, total in retrying:
+        tasks.setdefault(name, {
+            'runs': 0, 'succeeded': 0, 'failed': 0, 'avg_seconds': 0.0, 'max_seconds': 0.0,
+        })['retrying'] = total
+
+    oldest = BackgroundTask.objects.filter(status='pending', run_at__lte=now).aggregate(oldest=Min('run_at'))['oldest']
+    return {
+        'tasks': tasks,
+        'queue': dict(BackgroundTask.objects.values_list('status').annotate(total=Count('id')).order_by()),
+        'lag_seconds': (now - oldest).total_seconds() if oldest else 0.0,
+    }
@@ -1,6 +1,4 @@
 from django.views.decorators.http import require_POST
-import base64
-from django.core.files.base import ContentFile
 from django.utils import timezone
 from django.utils.timezone import now, localtime
 from datetime import timedelta
@@ -15,11 +13,13 @@ from logs.forms import LogForm
 from django.contrib.auth.models import User
 from .models import userinfo, user_status, education, experience, CodingStyle
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.core.paginator import Paginator, PageNotAnInteger
 from django.db.models import Q
 from django.template.loader import render_to_string
 from itertools import groupby
 from .algorithms import get_explore_users, get_personalized_feed, top_skills_list
+from .utils.replicas import read_from_replica
 from allauth.account.views import PasswordChangeView
 from django.contrib import messages
 from datetime import date, timedelta
@@ -124,6 +124,7 @@ def contribute_page(request):
 def feedback_page(request):
     return render(request, 'myapp/feedback.html')
 
+@read_from_replica
 def home_page(request):
     if not request.user.is_authenticated:
         return render(request, 'myapp/landing_page.html')
@@ -176,6 +177,7 @@ def home_page(request):
     return render(request, 'myapp/home.html', context)
 
 @login_required
+@read_from_replica
 def load_more_feed(request):
     if not request.user.is_authenticated:
         return JsonResponse({'error': 'Unauthorized'}, status=401)
@@ -200,6 +202,7 @@ def load_more_feed(request):
     })
 
 @login_required
+@read_from_replica
 def view_log_in_feed(request, log_sig):
     """
     Display a specific log in the home feed with highlighting
@@ -250,8 +253,9 @@ def view_log_in_feed(request, log_sig):
 
 #profile-page
 @login_required
+@read_from_replica
 def user_profile(request, user_name):
-    userinfo_obj = get_object_or_404(userinfo, user__username = user_name)
+    userinfo_obj = get_object_or_404(userinfo, user__username = user_name, user__is_active = True)
     link_available = open_exp_flag = open_edu_flag = open_editprofile_flag =editprofile_form = edu_form = exp_form = skill_form  = False
     social_links = { 
     'github': userinfo_obj.github if userinfo_obj.github else None,
@@ -332,11 +336,11 @@ def user_profile(request, user_name):
     
     # Calculate mutual count efficiently (only for authenticated users viewing other profiles)
     if request.user.is_authenticated and request.user != userinfo_obj.user:
-        my_following_ids = request.user.info.get_following().values_list('id', flat=True)
-        mutuals_queryset = userinfo_obj.get_following().filter(id__in=my_following_ids)
-        mutuals_count = mutuals_queryset.count()
+        from .utils.follow_graph import get_follow_graph
+        mutual_ids = get_follow_graph().mutuals(request.user.info.id, userinfo_obj.id).tolist()
+        mutuals_count = len(mutual_ids)
         # Fetch first 3 mutual connections for preview display (Instagram/LinkedIn style)
-        mutuals_preview = list(mutuals_queryset[:3])
+        mutuals_preview = list(userinfo_obj.get_following().filter(id__in=mutual_ids)[:3]) if mutual_ids else []
     else:
         mutuals_count = 0
         mutuals_preview = []
@@ -387,18 +391,27 @@ def user_profile(request, user_name):
                 if state: userinfo_obj.state = state
                 if country: userinfo_obj.country = country
                 
+                # Decoding, resizing and uploading happen in a background task;
+                # the current image stays up as a placeholder until it finishes
                 cropped_image_data = request.POST.get('croppedImage', '')
+                queue_profile_image = False
                 if cropped_image_data:
-                    try:
-                        format, imgstr = cropped_image_data.split(';base64,')
-                        ext = format.split('/')[-1]
-                        image_data = base64.b64decode(imgstr)
-                        file_name = f"{request.user.username}_profile.{ext}"
-                        userinfo_obj.profile_image = ContentFile(image_data, name=file_name)
-                    except (ValueError, base64.binascii.Error):
+                    header = cropped_image_data[:40].split(';base64,', 1)[0]
+                    ext = header.split('/')[-1]
+                    if header.startswith('data:image/') and ';base64,' in cropped_image_data and ext.isalnum():
+                        userinfo_obj.profile_image_processing = True
+                        queue_profile_image = True
+                    else:
                         editprofile_form.add_error(None, "Invalid image data. Please upload a valid image.")
                         open_editprofile_flag = True
                 userinfo_obj.save()
+                if queue_profile_image:
+                    from .utils.tasks import enqueue
+                    enqueue('process_profile_image', {
+                        'userinfo_id': userinfo_obj.id,
+                        'image_data': cropped_image_data,
+                        'file_name': f"{request.user.username}_profile.{ext}",
+                    })
                 redirect_url = reverse("user_profile", args=[request.user.username])
                 return redirect(redirect_url)
             else:
@@ -520,38 +533,21 @@ def quick_follow_user(request):
         return JsonResponse({"status": "error", "message": str(e)}, status=500)
     
 @login_required
+@read_from_replica
 def follow_list(request, username):
-        userinfo_obj = userinfo.objects.get(user__username = username) #user-profile list
+        from .utils.follows import FOLLOW_LIST_TYPES, get_follow_page
+        
+        userinfo_obj = get_object_or_404(userinfo, user__username = username) #user-profile list
         l = request.GET.get('list')
         grp = False
-        if l == None:
+        if l not in FOLLOW_LIST_TYPES:
+            # Missing or invalid list type, default to followers
             return HttpResponseRedirect(f'{request.path}?list=followers')
         
-        # Pre-calculate following IDs for mutuals check (lazy queryset)
-        # Using 'id' (userinfo PK) is cleaner than 'user__id'
         is_self = request.user == userinfo_obj.user
-        my_following_ids = []
-        if not is_self:
-            my_following_ids = request.user.info.get_following().values_list('id', flat=True)
-
-        if l == 'followers':
-            list = userinfo_obj.get_followers()
-        elif l == 'following':   
-            list = userinfo_obj.get_following()
-        elif l == 'mutuals':
-            if is_self:
-                list = userinfo.objects.none()
-            else:
-                # Get users that userinfo_obj follows AND are in my_following_ids
-                list = userinfo_obj.get_following().filter(id__in=my_following_ids)
-        else:
-            # Invalid list type, default to followers
-            return HttpResponseRedirect(f'{request.path}?list=followers')
         
-        print(list)
-        p = Paginator(list, 25)
-        page_number = request.GET.get('page')
-        page_obj = p.get_page(page_number)
+        # Keyset pagination on (follow.created_at, id)
+        page = get_follow_page(userinfo_obj, l, request.user.info, cursor=request.GET.get('cursor'), per_page=25)
         
         # Calculate counts for context
         followers_count = userinfo_obj.get_followers().count()
@@ -560,11 +556,14 @@ def follow_list(request, username):
         if is_self:
             mutuals_count = 0
         else:
-            mutuals_count = userinfo_obj.get_following().filter(id__in=my_following_ids).count()
+            from .utils.follow_graph import get_follow_graph
+            mutuals_count = len(get_follow_graph().mutuals(request.user.info.id, userinfo_obj.id))
 
         context = {
             'userinfo_obj': userinfo_obj,
-            'user_list': page_obj,
+            'user_list': page['items'],
+            'next_cursor': page['next_cursor'],
+            'has_next': page['has_next'],
             'l': l,
             'grp': grp,
             'followers_count': followers_count,
@@ -575,6 +574,32 @@ def follow_list(request, username):
         
         return render(request, 'myapp/followList.html', context)
 
+@login_required
+@read_from_replica
+def load_more_follow_list(request, username):
+    """
+    Infinite-scroll endpoint for follower/following/mutual lists.
+    Uses the same (created_at, id) cursor as the initial page.
+    """
+    from .utils.follows import FOLLOW_LIST_TYPES, get_follow_page
+    
+    userinfo_obj = get_object_or_404(userinfo, user__username=username)
+    list_type = request.GET.get('list', 'followers')
+    if list_type not in FOLLOW_LIST_TYPES:
+        return JsonResponse({'error': 'Invalid list type'}, status=400)
+    
+    page = get_follow_page(userinfo_obj, list_type, request.user.info, cursor=request.GET.get('cursor'), per_page=25)
+    
+    html = render_to_string('myapp/follow_list_items.html', {
+        'user_list': page['items'],
+    }, request=request)
+    
+    return JsonResponse({
+        'html': html,
+        'has_next': page['has_next'],
+        'next_cursor': page['next_cursor']
+    })
+
 #explore page:
 @login_required
 def explore_dev(request):
@@ -659,6 +684,7 @@ def load_more_recommendations(request):
 
 
 @login_required
+@read_from_replica
 def search_developers_api(request):
     """
     API endpoint for developer search with fuzzy matching and network ranking
@@ -751,7 +777,7 @@ def settings_page(request):
         from django.shortcuts import redirect
         if new_timezone in pytz.all_timezones:
             userinfo_obj.timezone = new_timezone
-            userinfo_obj.save()
+            userinfo_obj.save(update_fields=['timezone', 'updated_at'])
             messages.success(request, 'Timezone updated successfully!')
         else:
             messages.error(request, 'Invalid timezone selected.')
@@ -784,10 +810,12 @@ def delete_data(request):
 
 @login_required
 def delete_account(request, uuid):
-    print(True)
+    from .utils.account_deletion import start_account_deletion
+
     user = request.user
     if uuid == user.info.uuid:
-        user.delete()
+        # Deactivates the account now; its data is purged in the background
+        start_account_deletion(user)
         logout(request)
     return redirect('/')
 
@@ -808,7 +836,7 @@ def update_banner(request):
     
     if banner_name in allowed_banners:
         request.user.info.banner_image = f'banners/{banner_name}'
-        request.user.info.save()
+        request.user.info.save(update_fields=['banner_image', 'updated_at'])
         return JsonResponse({'success': True, 'banner_url': request.user.info.banner_image})
     
     return JsonResponse({'success': False, 'error': 'Invalid banner selection'})
@@ -826,7 +854,7 @@ def update_coding_style(request):
     try:
         coding_style = CodingStyle.objects.get(id=style_id)
         request.user.info.coding_style = coding_style
-        request.user.info.save()
+        request.user.info.save(update_fields=['coding_style', 'updated_at'])
         
         return JsonResponse({
             'success': True,
@@ -857,6 +885,7 @@ def get_coding_styles(request):
 # ============= NOTIFICATION VIEWS =============
 
 @login_required
+@read_from_replica
 def notification_page(request):
     """
     Display notifications page with grouped notifications and pagination
@@ -912,6 +941,7 @@ def mark_all_read(request):
 
 
 @login_required
+@read_from_replica
 def get_notification_count_api(request):
     """
     AJAX endpoint to get real-time notification count for badge
@@ -951,6 +981,7 @@ def mark_notification_read(request, notification_id):
 
 
 @login_required
+@read_from_replica
 def load_more_notifications(request):
     """
     AJAX endpoint to load more notifications for pagination
@@ -1101,3 +1132,14 @@ def set_permission_denied(request):
             'error': str(e)
         }, status=500)
 
+
+
+@staff_member_required
+def cache_metrics_api(request):
+    """
+    Cache hit/miss, stale-serve and recompute-time counters for the worker
+    process that serves this request.
+    """
+    from .utils.cache import get_cache_metrics
+
+    return JsonResponse(get_cache_metrics())
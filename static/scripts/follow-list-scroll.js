@@ -0,0 +1,67 @@
+/**
+ * Follow List - Infinite Scroll
+ * Loads more followers/following/mutuals using the (created_at, id) cursor
+ */
+
+document.addEventListener('DOMContentLoaded', function () {
+    const listContainer = document.getElementById('follow-list-container');
+    const loadMoreBox = document.getElementById('follow-list-load-more');
+    const loadMoreBtn = document.getElementById('follow-list-load-more-btn');
+    const loadingSpinner = document.getElementById('follow-list-loading');
+
+    if (!listContainer || !loadMoreBox) return; // Single page, nothing to load
+
+    let nextCursor = listContainer.dataset.nextCursor || null;
+    let hasNext = listContainer.dataset.hasNext === 'True';
+    let isLoading = false;
+
+    async function loadMore() {
+        if (isLoading || !hasNext || !nextCursor) return;
+        isLoading = true;
+
+        loadMoreBtn.classList.add('hidden');
+        loadingSpinner.classList.remove('hidden');
+        loadingSpinner.classList.add('flex');
+
+        try {
+            const url = `${listContainer.dataset.loadUrl}&cursor=${encodeURIComponent(nextCursor)}`;
+            const response = await fetch(url, {
+                headers: { 'X-Requested-With': 'XMLHttpRequest' }
+            });
+            const data = await response.json();
+
+            if (data.html) {
+                const tempDiv = document.createElement('div');
+                tempDiv.innerHTML = data.html;
+                while (tempDiv.firstChild) {
+                    listContainer.appendChild(tempDiv.firstChild);
+                }
+            }
+
+            hasNext = data.has_next;
+            nextCursor = data.next_cursor;
+        } catch (error) {
+            console.error('Error loading more connections:', error);
+        } finally {
+            isLoading = false;
+            loadingSpinner.classList.add('hidden');
+            loadingSpinner.classList.remove('flex');
+            if (hasNext) {
+                loadMoreBtn.classList.remove('hidden');
+            } else {
+                loadMoreBox.remove();
+            }
+        }
+    }
+
+    loadMoreBtn.addEventListener('click', function (event) {
+        event.preventDefault();
+        loadMore();
+    });
+
+    listContainer.addEventListener('scroll', function () {
+        if (listContainer.scrollHeight - listContainer.scrollTop - listContainer.clientHeight < 200) {
+            loadMore();
+        }
+    });
+});
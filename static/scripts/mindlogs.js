@@ -328,6 +328,90 @@ window.toggleReactionPicker = toggleReactionPicker;
 function toggleComments(sig) {
   const container = $(`#comments-container-${sig}`);
   container.toggleClass('hidden');
+
+  // The thread is fetched the first time it is opened
+  const list = $(`#comments-list-${sig}`);
+  if (!container.hasClass('hidden') && list.attr('data-loaded') === 'false') {
+    list.attr('data-loaded', 'true');
+    loadComments(sig);
+  }
+}
+
+/**
+ * Append the next page of a paginated comment list.
+ * The "more" button carries the cursor for the following page.
+ */
+function loadCommentPage(url, list, moreButton) {
+  const cursor = moreButton.data('cursor');
+  moreButton.prop('disabled', true);
+
+  $.ajax({
+    type: "GET",
+    url: url,
+    data: cursor ? { cursor: cursor } : {},
+    success: function (response) {
+      list.append(response.html);
+      if (response.has_next) {
+        moreButton.data('cursor', response.cursor).removeClass('hidden');
+      } else {
+        moreButton.addClass('hidden');
+      }
+    },
+    error: function (xhr) {
+      console.error('Error loading comments:', xhr.responseText);
+    },
+    complete: function () {
+      moreButton.prop('disabled', false);
+    }
+  });
+}
+
+/**
+ * Load the next page of top-level comments for a log
+ */
+function loadComments(sig) {
+  loadCommentPage(`/logs/comments/${sig}/`, $(`#comments-list-${sig}`), $(`#comments-more-${sig}`));
+}
+
+/**
+ * Load the next page of replies to a comment
+ */
+function loadReplies(commentId) {
+  const moreButton = $(`#replies-more-${commentId}`);
+  if (!moreButton.data('cursor')) {
+    // First page: the button becomes "show more replies"
+    moreButton.text('Show more replies');
+  }
+  loadCommentPage(`/logs/comment/replies/${commentId}/`, $(`#replies-${commentId}`), moreButton);
+}
+
+/**
+ * Like or unlike a comment
+ */
+function toggleCommentLike(commentId, buttonElement) {
+  const btn = $(buttonElement);
+  if (btn.prop('disabled')) return;
+  btn.prop('disabled', true);
+
+  $.ajax({
+    type: "POST",
+    url: `/logs/comment/like/${commentId}/`,
+    data: {
+      'csrfmiddlewaretoken': getCSRFToken()
+    },
+    success: function (response) {
+      btn.attr('data-liked', response.liked ? 'true' : 'false');
+      btn.toggleClass('text-red-400', response.liked).toggleClass('text-gray-500', !response.liked);
+      btn.find('i').toggleClass('fa-heart', response.liked).toggleClass('fa-heart-o', !response.liked);
+      btn.find('.like-count').text(response.like_count);
+    },
+    error: function (xhr) {
+      console.error('Error toggling comment like:', xhr.responseText);
+    },
+    complete: function () {
+      btn.prop('disabled', false);
+    }
+  });
 }
 
 /**
@@ -447,20 +531,6 @@ function cancelReply(commentId) {
   $(`#reply-input-${commentId}`).val('');
 }
 
-/**
- * Parse @mentions in text and convert to profile links
- * Matches the Django template filter pattern
- */
-function parseMentions(text) {
-  if (!text) return text;
-
-  // Match @username patterns (alphanumeric, underscores, and dots)
-  // This matches the pattern used in the Django template filter
-  const pattern = /@([a-zA-Z0-9_.]+)/g;
-
-  return text.replace(pattern, '<a href="/user-profile/$1/" class="text-blue-400 hover:text-blue-300 transition-colors font-semibold">@$1</a>');
-}
-
 /**
  * Prepend a new comment to the DOM
  */
@@ -517,7 +587,7 @@ function prependComment(commentData, sig, parentId) {
 
         <!-- Comment Content -->
         <div class="${contentPadding}">
-          <p class="text-sm text-gray-300 whitespace-pre-wrap leading-relaxed">${parseMentions(commentData.content)}</p>
+          <p class="text-sm text-gray-300 whitespace-pre-wrap leading-relaxed">${commentData.content_html}</p>
         </div>
 
         <!-- Comment Actions -->
@@ -526,6 +596,12 @@ function prependComment(commentData, sig, parentId) {
                   class="text-xs font-medium text-gray-500 hover:text-green-400 transition-colors flex items-center gap-1.5 py-1 px-2 -ml-2 rounded-md hover:bg-[#58a6ff]/10">
             <i class="fa fa-reply"></i>Reply
           </button>
+          <button onclick="toggleCommentLike(${commentData.comment_id}, this)"
+                  class="comment-like-btn text-xs font-medium text-gray-500 hover:text-red-400 transition-colors flex items-center gap-1.5 py-1 px-2 rounded-md"
+                  data-liked="false">
+            <i class="fa fa-heart-o"></i>
+            <span class="like-count">0</span>
+          </button>
         </div>
 
         <!-- Reply Form (Hidden by default) -->
@@ -580,6 +656,9 @@ function updateCommentCount(sig, delta) {
 
 // Export comment functions
 window.toggleComments = toggleComments;
+window.loadComments = loadComments;
+window.loadReplies = loadReplies;
+window.toggleCommentLike = toggleCommentLike;
 window.addComment = addComment;
 window.deleteComment = deleteComment;
 window.showReplyForm = showReplyForm;
@@ -25,11 +25,34 @@ function copyCurrentURL() {
         });
 }
 
+function fetchSnippet(sig) {
+    return fetch(`/logs/snippet/${sig}/`).then(response => {
+        if (!response.ok) throw new Error(`Snippet request failed: ${response.status}`);
+        return response.json();
+    });
+}
+
 function copySnippet(sig) {
     const codeElement = document.getElementById(`code-snippet-${sig}`);
-    const text = codeElement.innerText;
-    navigator.clipboard.writeText(text).then(() => {
+    // Long snippets only ship a preview: copy the full source
+    const text = codeElement.dataset.truncated === 'true'
+        ? fetchSnippet(sig).then(data => data.code)
+        : Promise.resolve(codeElement.innerText);
+    text.then(code => navigator.clipboard.writeText(code)).then(() => {
         alert('Snippet copied!');
+    }).catch(err => console.error('Failed to copy snippet: ', err));
+}
+
+function expandSnippet(sig, button) {
+    const codeElement = document.getElementById(`code-snippet-${sig}`);
+    button.disabled = true;
+    fetchSnippet(sig).then(data => {
+        codeElement.querySelector('code').innerHTML = data.html;
+        codeElement.dataset.truncated = 'false';
+        button.remove();
+    }).catch(err => {
+        console.error('Failed to load snippet: ', err);
+        button.disabled = false;
     });
 }
 
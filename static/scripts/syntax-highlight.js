@@ -61,6 +61,8 @@ class SyntaxHighlighter {
      */
     highlightElement(element) {
         if (!element || this.highlightedElements.has(element)) return;
+        // Highlighted on the server (logs.utils.code_snippets)
+        if (element.classList.contains('hljs')) return;
 
         // Get the code content
         const code = element.textContent || element.innerText;